@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""
+Ein-/Ausgabe-Backends für KVM over Network
+
+Erfassung (Server):  PynputCapture (echte Hardware), SyntheticCapture (Generator/Aufzeichnung)
+Simulation (Client): PyAutoGUIInjector (echte Eingabe), RecordingInjector (zeichnet nur auf),
+                     unter Linux direkt XTestInjector/UInputInjector (linux_input.py)
+
+Die Hardware-Backends importieren pynput/pyautogui erst beim Start, damit Server
+und Client mit den Ersatz-Backends auch ohne Display (z.B. in CI) laufen. pyautogui
+(zieht PIL, pyscreeze, mouseinfo usw. nach) braucht nur der Client für die Maus -
+die Bildschirmgröße kommt direkt vom System, und der Client lädt pyautogui im
+Hintergrund, während er sich verbindet.
+"""
+import json
+import math
+import random
+import sys
+import threading
+import time
+
+from keymap import build_key_table, resolve_key
+from pointer import ScrollAccumulator
+
+
+def native_screen_size():
+    """Größe des Hauptbildschirms ohne pyautogui, None wenn nicht ermittelbar"""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            user32 = ctypes.windll.user32
+            user32.SetProcessDPIAware()     # Wie pyautogui: echte Pixel statt skalierter
+            return int(user32.GetSystemMetrics(0)), int(user32.GetSystemMetrics(1))
+        if sys.platform == 'darwin':
+            # pyobjc-Quartz ist unter macOS ohnehin Abhängigkeit von pynput
+            import Quartz
+            bounds = Quartz.CGDisplayBounds(Quartz.CGMainDisplayID())
+            return int(bounds.size.width), int(bounds.size.height)
+        # X11: python-xlib bringt pynput unter Linux mit
+        from Xlib import display
+        connection = display.Display()
+        try:
+            screen = connection.screen()
+            return int(screen.width_in_pixels), int(screen.height_in_pixels)
+        finally:
+            connection.close()
+    except Exception:
+        return None
+
+
+# ---------- Erfassung ----------
+
+class CaptureBackend:
+    """Basisklasse: liefert Events an die on_*-Methoden des Servers"""
+
+    def start(self, sink):
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def screen_size(self):
+        """Größe des lokalen Bildschirms als (Breite, Höhe), None wenn unbekannt"""
+        return None
+
+    def warp(self, x, y):
+        """Lokalen Cursor versetzen"""
+        pass
+
+    def client_connected(self):
+        """Ein Client hat sich verbunden"""
+        pass
+
+
+class PynputCapture(CaptureBackend):
+    """Tastatur/Maus über pynput-Listener abfangen"""
+
+    def __init__(self):
+        self.mouse_listener = None
+        self.keyboard_listener = None
+        self.mouse_controller = None
+
+    def start(self, sink):
+        from pynput import mouse, keyboard
+
+        # Maus-Listener
+        self.mouse_listener = mouse.Listener(
+            on_move=sink.on_mouse_move,
+            on_click=lambda x, y, button, pressed: sink.on_mouse_click(x, y, button.name, pressed),
+            on_scroll=sink.on_mouse_scroll
+        )
+
+        # Tastatur-Listener
+        self.keyboard_listener = keyboard.Listener(
+            on_press=sink.on_key_press,
+            on_release=sink.on_key_release
+        )
+
+        self.mouse_listener.start()
+        self.keyboard_listener.start()
+
+    def stop(self):
+        # Listener sind Threads: stoppen und warten, bis sie wirklich beendet sind
+        for listener in (self.mouse_listener, self.keyboard_listener):
+            if listener:
+                listener.stop()
+        for listener in (self.mouse_listener, self.keyboard_listener):
+            if listener and listener.is_alive():
+                listener.join(timeout=1.0)
+
+    def screen_size(self):
+        # pynput kennt keine Bildschirmgröße, pyautogui nur laden, wenn das System sie nicht liefert
+        size = native_screen_size()
+        if size is not None:
+            return size
+        try:
+            import pyautogui
+            width, height = pyautogui.size()
+            return int(width), int(height)
+        except Exception:
+            return None
+
+    def warp(self, x, y):
+        if self.mouse_controller is None:
+            from pynput import mouse
+            self.mouse_controller = mouse.Controller()
+        self.mouse_controller.position = (x, y)
+
+
+def synthetic_events(seed=0, width=1920, height=1080):
+    """Endloser, reproduzierbarer Event-Strom im Nachrichtenformat des Servers
+
+    Überwiegend Mausbewegungen, dazwischen Klicks, Scrolls und Tastendrücke -
+    ungefähr die Mischung einer normalen Sitzung.
+    """
+    rng = random.Random(seed)
+    keys = 'abcdefghijklmnopqrstuvwxyz '
+    i = 0
+    while True:
+        angle = i / 200.0
+        x = int(width / 2 + math.cos(angle) * width / 3)
+        y = int(height / 2 + math.sin(angle) * height / 3)
+        yield {'type': 'mouse_move', 'x': x, 'y': y}
+        roll = rng.random()
+        if roll < 0.01:
+            yield {'type': 'mouse_click', 'x': x, 'y': y, 'button': 'left', 'pressed': True}
+            yield {'type': 'mouse_click', 'x': x, 'y': y, 'button': 'left', 'pressed': False}
+        elif roll < 0.03:
+            yield {'type': 'mouse_scroll', 'x': x, 'y': y, 'dx': 0, 'dy': rng.choice((-1, 1))}
+        elif roll < 0.06:
+            key = rng.choice(keys)
+            yield {'type': 'key_press', 'key': key}
+            yield {'type': 'key_release', 'key': key}
+        i += 1
+
+
+def load_events(path):
+    """Aufgezeichnete Events laden: binäres Event-Log (recorder.py) oder JSON-Lines"""
+    from recorder import is_event_log, read_event_log
+    if is_event_log(path):
+        return [event for _, event in read_event_log(path)]
+
+    events = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                events.append(json.loads(line))
+    return events
+
+
+class SyntheticCapture(CaptureBackend):
+    """Spielt einen Event-Strom mit fester Rate in einem eigenen Thread ab
+
+    rate: Events pro Sekunde (0 = so schnell wie möglich)
+    count/duration: Abbruch nach so vielen Events bzw. Sekunden
+    autostart: bei False wartet die Wiedergabe auf play()
+    screen: simulierte Bildschirmgröße
+    """
+
+    def __init__(self, events=None, rate=1000.0, count=None, duration=None, autostart=True,
+                 screen=(1920, 1080)):
+        self.events = events if events is not None else synthetic_events(width=screen[0], height=screen[1])
+        self.screen = screen
+        self.rate = rate
+        self.count = count
+        self.duration = duration
+        self.emitted = 0
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+        self._go = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        if autostart:
+            self._go.set()
+
+    def start(self, sink):
+        self._thread = threading.Thread(target=self._run, args=(sink,), daemon=True)
+        self._thread.start()
+
+    def screen_size(self):
+        return self.screen
+
+    def play(self):
+        """Wiedergabe freigeben (bei autostart=False)"""
+        self._go.set()
+
+    def stop(self):
+        self._stop.set()
+        self._go.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def _dispatch(self, sink, event):
+        event_type = event.get('type')
+        if event_type == 'mouse_move':
+            sink.on_mouse_move(event['x'], event['y'])
+        elif event_type == 'mouse_click':
+            sink.on_mouse_click(event.get('x', 0), event.get('y', 0), event['button'], event['pressed'])
+        elif event_type == 'mouse_scroll':
+            sink.on_mouse_scroll(event.get('x', 0), event.get('y', 0), event.get('dx', 0), event.get('dy', 0))
+        elif event_type == 'key_press':
+            sink.on_key_press(event['key'])
+        elif event_type == 'key_release':
+            sink.on_key_release(event['key'])
+        else:
+            return False
+        return True
+
+    def _run(self, sink):
+        self._go.wait()
+        interval = 1.0 / self.rate if self.rate else 0.0
+        self.started_at = time.perf_counter()
+        deadline = self.started_at
+        try:
+            for event in self.events:
+                if self._stop.is_set():
+                    break
+                if self.count is not None and self.emitted >= self.count:
+                    break
+                now = time.perf_counter()
+                if self.duration is not None and now - self.started_at >= self.duration:
+                    break
+                if interval:
+                    deadline += interval
+                    # Nur schlafen, wenn wir vorne liegen - sonst aufholen
+                    if deadline > now:
+                        time.sleep(deadline - now)
+                if self._dispatch(sink, event):
+                    self.emitted += 1
+        finally:
+            self.finished_at = time.perf_counter()
+            self.done.set()
+
+
+# ---------- Simulation ----------
+
+class InjectionBackend:
+    """Basisklasse: simuliert empfangene Events lokal"""
+
+    def screen_size(self):
+        """Größe des lokalen Bildschirms als (Breite, Höhe)"""
+        raise NotImplementedError
+
+    def move_to(self, x, y):
+        raise NotImplementedError
+
+    def move_rel(self, dx, dy):
+        raise NotImplementedError
+
+    def mouse_button(self, button, pressed):
+        raise NotImplementedError
+
+    def scroll(self, dx, dy):
+        raise NotImplementedError
+
+    def key(self, code, pressed):
+        raise NotImplementedError
+
+    def flush(self):
+        """Gesammelte Events abschicken - der Client ruft das einmal pro empfangenem Frame auf"""
+
+
+# Raststufen pro empfangener Raststufe, wie bisher pyautogui.scroll(dy * 3) unter X11/macOS.
+# Windows scrollt in WHEEL_DELTA-Einheiten und bekommt die Raststufen 1:1.
+SCROLL_SCALE = 1.0 if sys.platform == 'win32' else 3.0
+
+
+class PyAutoGUIInjector(InjectionBackend):
+    """Echte Eingabe über pyautogui (Maus) und pynput (Tastatur)"""
+
+    def __init__(self, scroll_scale=SCROLL_SCALE):
+        from pynput import keyboard, mouse
+
+        # pyautogui im Hintergrund laden, die Verbindung zum Server wartet nicht darauf
+        self._pyautogui = None
+        self._pyautogui_error = None
+        self._loader = threading.Thread(target=self._load_pyautogui, name='pyautogui-import', daemon=True)
+        self._loader.start()
+
+        # Tastatur-Controller und einmalig aufgebaute Tabelle Code → pynput-Taste
+        self.keyboard_controller = keyboard.Controller()
+        self.KeyCode = keyboard.KeyCode
+        self.key_table = build_key_table(keyboard.Key)
+
+        # Scrollen über den nativen Controller, beide Achsen. Windows kennt Bruchteile
+        # einer Raststufe (WHEEL_DELTA = 120), X11 und macOS nur ganze Schritte - dort
+        # wird der Rest für das nächste Scroll-Event aufgehoben
+        self.mouse_controller = mouse.Controller()
+        self.scroll_rest = ScrollAccumulator(1 / 120 if sys.platform == 'win32' else 1.0)
+        self.scroll_scale = scroll_scale
+
+    def _load_pyautogui(self):
+        try:
+            import pyautogui
+            # PyAutoGUI Einstellungen
+            pyautogui.FAILSAFE = False  # Deaktiviert Fail-Safe
+            pyautogui.PAUSE = 0.01     # Minimale Pause zwischen Aktionen
+            self._pyautogui = pyautogui
+        except Exception as e:
+            self._pyautogui_error = e
+
+    @property
+    def pyautogui(self):
+        """pyautogui, wartet beim ersten Maus-Event ggf. auf den Import"""
+        if self._pyautogui is None:
+            self._loader.join()
+            if self._pyautogui is None:
+                raise RuntimeError(f"pyautogui nicht verfügbar: {self._pyautogui_error}")
+        return self._pyautogui
+
+    def screen_size(self):
+        size = native_screen_size()
+        if size is not None:
+            return size
+        width, height = self.pyautogui.size()
+        return int(width), int(height)
+
+    def move_to(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def move_rel(self, dx, dy):
+        self.pyautogui.moveRel(dx, dy)
+
+    def mouse_button(self, button, pressed):
+        button_map = {
+            'left': 'left',
+            'right': 'right',
+            'middle': 'middle'
+        }
+
+        button = button_map.get(button, 'left')
+
+        if pressed:
+            self.pyautogui.mouseDown(button=button)
+        else:
+            self.pyautogui.mouseUp(button=button)
+
+    def scroll(self, dx, dy):
+        self.scroll_rest.add(dx * self.scroll_scale, dy * self.scroll_scale)
+        steps_x, steps_y = self.scroll_rest.take()
+        if steps_x or steps_y:
+            self.mouse_controller.scroll(steps_x, steps_y)
+
+    def key(self, code, pressed):
+        """Tastendruck simulieren (code aus keymap)"""
+        key = self.key_table.get(code)
+        if key is None:
+            key = resolve_key(self.key_table, self.KeyCode, code)
+            if key is None:
+                return
+        if pressed:
+            self.keyboard_controller.press(key)
+        else:
+            self.keyboard_controller.release(key)
+
+
+class RecordingInjector(InjectionBackend):
+    """Führt nichts aus, sondern zeichnet alle Aufrufe mit Zeitstempel auf"""
+
+    def __init__(self, screen=(1920, 1080)):
+        self.events = []
+        self.screen = screen
+
+    def _record(self, *args):
+        self.events.append((time.time(),) + args)
+
+    def screen_size(self):
+        return self.screen
+
+    def move_to(self, x, y):
+        self._record('mouse_move', x, y)
+
+    def move_rel(self, dx, dy):
+        self._record('mouse_delta', dx, dy)
+
+    def mouse_button(self, button, pressed):
+        self._record('mouse_click', button, pressed)
+
+    def scroll(self, dx, dy):
+        self._record('mouse_scroll', dx, dy)
+
+    def key(self, code, pressed):
+        self._record('key_press' if pressed else 'key_release', code)
+
+
+INJECTORS = ('auto', 'uinput', 'xtest', 'pyautogui')
+
+
+def create_injector(kind='auto', scroll_scale=SCROLL_SCALE):
+    """Eingabe-Backend für den Client erzeugen
+
+    auto: unter Linux zuerst /dev/uinput (geht auch unter Wayland), dann XTest,
+    sonst bzw. auf anderen Systemen pyautogui/pynput. Bei einem ausdrücklich
+    gewählten Backend wird ein Fehler nicht abgefangen.
+    scroll_scale: Faktor für Scroll-Deltas (Standard wie bisher 3 Raststufen pro Raststufe).
+    """
+    if kind == 'pyautogui':
+        return PyAutoGUIInjector(scroll_scale)
+    if kind in ('uinput', 'xtest'):
+        import linux_input
+        injector = linux_input.UInputInjector if kind == 'uinput' else linux_input.XTestInjector
+        return injector(scroll_scale=scroll_scale)
+    if kind != 'auto':
+        raise ValueError(f"Unbekanntes Eingabe-Backend: {kind}")
+    if sys.platform.startswith('linux'):
+        for candidate in ('uinput', 'xtest'):
+            try:
+                injector = create_injector(candidate, scroll_scale)
+            except Exception as e:
+                print(f"Eingabe über {candidate} nicht möglich: {e}")
+                continue
+            print(f"✓ Eingabe über {candidate}")
+            return injector
+    return PyAutoGUIInjector(scroll_scale)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Lasttest für KVM over Network - Server und Client über Loopback-WebSocket
+
+Läuft ohne echte Eingabegeräte: der Server bekommt einen synthetischen oder
+aufgezeichneten Event-Strom (SyntheticCapture), der Client zeichnet nur auf
+(RecordingInjector). Gemessen werden Durchsatz, Verlustrate und Latenz-Perzentile.
+
+Beispiele:
+    python bench.py                              # 1000 Events/s für 5 Sekunden
+    python bench.py --rate 5000 --duration 10
+    python bench.py --rate 0 --count 100000      # so schnell wie möglich
+    python bench.py --events sitzung.jsonl       # aufgezeichneten Strom abspielen
+    python bench.py --no-delta                   # Bandbreite mit JSON statt Delta-Kodierung
+    python bench.py --tls                        # verschlüsselt (wss + PSK) zum Vergleich
+"""
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+
+from backends import SyntheticCapture, RecordingInjector, synthetic_events, load_events
+from latency import LatencyHistogram
+import security
+from server import KVMServer
+from client import KVMClient
+
+
+async def run_benchmark(rate=1000.0, duration=5.0, count=None, events=None,
+                        host='127.0.0.1', port=8799, drain_timeout=5.0, udp=False, codec=True, tls=None):
+    """Einen Lauf durchführen und die Kennzahlen als Dictionary zurückgeben
+
+    tls: Ordner mit cert.pem/key.pem (wird bei Bedarf erzeugt) - dann wss mit PSK
+    """
+    capture = SyntheticCapture(events if events is not None else synthetic_events(),
+                               rate=rate, count=count, duration=duration, autostart=False)
+    cert = security.generate_certificate(tls) if tls else None
+    psk = security.new_psk().encode() if tls else None
+    # Ohne Randwechsel: der synthetische Strom würde den Remote-Bildschirm sonst verlassen
+    server = KVMServer(host, port, capture=capture, edge=None, udp=udp, codec=codec, tls=cert, psk=psk)
+    server.capturing = True
+    injector = RecordingInjector()
+    client = KVMClient(host, port, stats_interval=0, injector=injector, udp=udp, codec=codec,
+                       tls=bool(tls), cafile=cert[0] if cert else None, psk=psk)
+
+    server_task = asyncio.create_task(server.start_server())
+    client_task = None
+    try:
+        # Warten bis der Server lauscht und der Client verbunden ist
+        deadline = time.monotonic() + 5.0
+        while not server.clients:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Client konnte sich nicht verbinden")
+            if client_task is None or client_task.done():
+                client_task = asyncio.create_task(client.connect_to_server())
+            await asyncio.sleep(0.05)
+        # Uhren-Abgleich (und ggf. UDP-Kanal) abwarten
+        while not client.clock.synced and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        while udp and not server.udp_peers and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+
+        capture.play()
+        while not capture.done.is_set():
+            await asyncio.sleep(0.05)
+
+        # Restliche Events beim Client ankommen lassen
+        deadline = time.monotonic() + drain_timeout
+        while ((server.event_queue.qsize() or len(injector.events) < server.seq)
+               and time.monotonic() < deadline):
+            await asyncio.sleep(0.01)
+    finally:
+        stale_count = client.udp_protocol.stale if client.udp_protocol else 0
+        if client_task is not None:
+            client_task.cancel()
+        # Geordnet beenden wie bei Ctrl+C, notfalls abbrechen
+        server.stop("Lasttest beendet")
+        await asyncio.wait([server_task], timeout=5.0)
+        server_task.cancel()
+        await asyncio.gather(server_task, *([client_task] if client_task else []),
+                             return_exceptions=True)
+
+    # Gezählt werden Nachrichten auf der Leitung: Mausbewegungen unter einem
+    # Pixel erzeugen z.B. keine eigene Nachricht
+    sent = server.seq
+    received = len(injector.events)
+    # Über UDP überholte Pakete werden absichtlich verworfen
+    stale = stale_count
+    elapsed = capture.finished_at - capture.started_at
+    if injector.events:
+        recv_span = injector.events[-1][0] - injector.events[0][0]
+    else:
+        recv_span = 0.0
+
+    overall = LatencyHistogram()
+    per_type = {}
+    for (event_type, stage), histogram in client.stats.histograms.items():
+        if stage == 'total':
+            overall.merge(histogram)
+            per_type[event_type] = histogram.summary()
+
+    return {
+        'rate': rate,
+        'captured': capture.emitted,
+        'sent': sent,
+        'received': received,
+        'stale': stale,
+        'dropped': sent - received - stale,
+        'drop_rate': (sent - received - stale) / sent if sent else 0.0,
+        'send_duration': elapsed,
+        'throughput': received / max(recv_span, elapsed) if received else 0.0,
+        'codec': codec,
+        'tls': bool(tls),
+        'bytes_sent': server.bytes_sent,
+        'bytes_per_event': server.bytes_sent / sent if sent else 0.0,
+        'latency_ms': overall.summary(),
+        'latency_ms_by_type': per_type,
+        'clock': {'offset_ms': client.clock.offset * 1000.0,
+                  'rtt_ms': client.clock.rtt * 1000.0 if client.clock.rtt is not None else None},
+    }
+
+
+def print_report(result):
+    lat = result['latency_ms']
+    print(f"\n{'='*50}")
+    print(f"Rate (Soll):   {result['rate']:.0f} Events/s" if result['rate'] else "Rate (Soll):   maximal")
+    print(f"Erfasst:       {result['captured']}")
+    print(f"Gesendet:      {result['sent']}")
+    print(f"Empfangen:     {result['received']}")
+    print(f"Verlustrate:   {result['drop_rate'] * 100:.2f}%")
+    if result['stale']:
+        print(f"Veraltet (UDP): {result['stale']}")
+    print(f"Durchsatz:     {result['throughput']:.0f} Events/s")
+    print(f"Bytes:         {result['bytes_sent']} ({result['bytes_per_event']:.1f} B/Event, "
+          f"{'Delta' if result['codec'] else 'JSON'}, vor Deflate{' und TLS' if result['tls'] else ''})")
+    if lat.get('count'):
+        print(f"Latenz (ms):   p50={lat['p50']:.2f} p90={lat['p90']:.2f} "
+              f"p99={lat['p99']:.2f} max={lat['max']:.2f}")
+    for event_type, s in sorted(result['latency_ms_by_type'].items()):
+        print(f"  {event_type:<12} n={s['count']:<7} p50={s['p50']:.2f} p99={s['p99']:.2f}")
+    print(f"{'='*50}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="KVM Lasttest über Loopback")
+    parser.add_argument('--rate', type=float, default=1000.0, help="Events pro Sekunde (0 = maximal)")
+    parser.add_argument('--duration', type=float, default=5.0, help="Dauer in Sekunden")
+    parser.add_argument('--count', type=int, help="Anzahl Events (statt Dauer)")
+    parser.add_argument('--events', help="Aufgezeichnete Events (JSON-Lines) abspielen")
+    parser.add_argument('--port', type=int, default=8799)
+    parser.add_argument('--udp', action='store_true', help="Mausbewegungen über den UDP-Kanal senden")
+    parser.add_argument('--no-delta', action='store_true', help="Events als JSON statt binär senden")
+    parser.add_argument('--tls', action='store_true',
+                        help="Verschlüsselt (wss + PSK) mit einem temporär erzeugten Zertifikat")
+    parser.add_argument('--json', action='store_true', help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args()
+
+    events = load_events(args.events) if args.events else None
+    duration = None if args.count else args.duration
+    with tempfile.TemporaryDirectory() as cert_dir:
+        result = asyncio.run(run_benchmark(args.rate, duration, args.count, events, port=args.port,
+                                           udp=args.udp, codec=not args.no_delta,
+                                           tls=cert_dir if args.tls else None))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
+    # Exit-Code ungleich 0 bei Verlusten, damit CI den Lauf als fehlgeschlagen markiert
+    sys.exit(1 if result['dropped'] else 0)
+
+
+if __name__ == "__main__":
+    main()
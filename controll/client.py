@@ -5,45 +5,189 @@ KVM Client (Laptop B) - Empfängt Events und simuliert sie lokal
 import asyncio
 import websockets
 import json
-import pyautogui
-from pynput.keyboard import Key, Listener as KeyboardListener
-from pynput import keyboard
+import os
+import random
+import socket
+import time
+
+from backends import INJECTORS, SCROLL_SCALE, create_injector
+from codec import CODEC_NAME, FRAME_EVENTS, EventDecoder
+from keymap import encode_key
+from latency import ClockSync, LatencyStats
+import security
+from transport import MAGIC, REGISTER, PointerClientProtocol
+from transfer import TransferManager, ClipboardWatcher, OutboxWatcher
 
 class KVMClient:
-    def __init__(self, server_host='localhost', server_port=8765):
+    def __init__(self, server_host='localhost', server_port=8765,
+                 stats_interval=10.0, stats_file=None, sync_interval=5.0, injector=None, udp=True,
+                 clipboard=False, inbox=None, outbox=None, codec=True, deflate=True, name=None,
+                 tls=False, cafile=None, psk=None):
         self.server_host = server_host
         self.server_port = server_port
-        self.uri = f"ws://{server_host}:{server_port}"
+        self.name = name or socket.gethostname()   # Unter diesem Namen führt der Server den Host
+        
+        # Verschlüsselung und Authentifizierung (security.py); der TLS-Kontext merkt sich
+        # die Sitzung, ein Reconnect spart so den vollständigen Handshake
+        self.ssl_context = security.client_context(cafile) if tls or cafile else None
+        self.psk = psk                  # Gemeinsamer Schlüssel (bytes)
+        self.auth_timeout = 5.0
+        if self.ssl_context is not None and udp:
+            udp = False                 # Die UDP-Datagramme wären unverschlüsselt
+        
+        self.uri = f"{'wss' if self.ssl_context else 'ws'}://{server_host}:{server_port}"
         self.connected = False
         
-        # PyAutoGUI Einstellungen
-        pyautogui.FAILSAFE = False  # Deaktiviert Fail-Safe
-        pyautogui.PAUSE = 0.01     # Minimale Pause zwischen Aktionen
+        # Wiederverbinden: Sitzung fortsetzen, Backoff mit Jitter
+        self.session_token = None
+        self.backoff_base = 0.25
+        self.backoff_max = 5.0
+        self.release_timeout = 1.0    # Gedrückte Tasten loslassen, wenn so lange keine Verbindung
+        self.release_task = None
+        
+        # Lokal simulierte, noch gedrückte Tasten/Maustasten
+        self.held_keys = set()
+        self.held_buttons = set()
+        
+        # Latenz-Messung: Uhren-Abgleich mit dem Server und Histogramme
+        self.clock = ClockSync()
+        self.stats = LatencyStats()
+        self.stats_interval = stats_interval  # Sekunden zwischen Log-Ausgaben (0 = aus)
+        self.stats_file = stats_file          # JSON-Lines Export für Vergleiche
+        self.sync_interval = sync_interval
+        
+        # UDP-Kanal für Mausbewegungen (transport.py), wird beim Verbinden ausgehandelt
+        self.udp = udp
+        self.udp_transport = None
+        self.udp_protocol = None
+        self.udp_ready = None
+        
+        # Binäre Delta-Kodierung der Events (codec.py) und permessage-deflate anbieten
+        self.codec = codec
+        self.deflate = deflate
         
-        # Tastatur-Controller für spezielle Tasten
-        self.keyboard_controller = keyboard.Controller()
+        # Zwischenablage und Dateien (transfer.py), eine TransferManager-Instanz pro Verbindung
+        self.clipboard = ClipboardWatcher(self.share_clipboard) if clipboard else None
+        self.inbox = inbox
+        self.outbox = outbox
+        self.transfer = None
+        
+        # Eingabe-Simulation: uinput/XTest/pyautogui oder z.B. RecordingInjector für Tests
+        self.injector = injector if injector is not None else create_injector()
         
         print(f"KVM Client - Verbinde zu {self.uri}")
     
     async def connect_to_server(self):
-        """Mit Server verbinden und Events empfangen"""
+        """Mit Server verbinden und Events empfangen
+
+        Gibt True zurück, wenn eine Verbindung zustande kam.
+        """
+        established = False
         try:
-            async with websockets.connect(self.uri) as websocket:
+            async with websockets.connect(self.uri, compression='deflate' if self.deflate else None,
+                                          ssl=self.ssl_context) as websocket:
+                tls = security.ssl_object(websocket)
+                if tls is not None and tls.session_reused:
+                    print("✓ TLS-Sitzung fortgesetzt")
+                # Gegenbeweis des Servers steht noch aus, vorher wird nichts verarbeitet
+                server_proof = await self.authenticate(websocket) if self.psk is not None else None
+                
                 self.connected = True
+                established = True
                 print("✓ Verbunden mit KVM Server")
                 print("Bereit zum Empfangen von Remote-Events")
                 
-                async for message in websocket:
-                    try:
-                        data = json.loads(message)
-                        await self.handle_event(data)
-                    except json.JSONDecodeError:
-                        print(f"Ungültiges JSON empfangen: {message}")
-                    except Exception as e:
-                        print(f"Fehler beim Verarbeiten des Events: {e}")
+                # Bildschirm-Geometrie melden, damit der Server relative Bewegungen skalieren kann
+                await websocket.send(json.dumps({
+                    'type': 'hello',
+                    'name': self.name,
+                    'screen': list(self.injector.screen_size()),
+                    'udp': self.udp,
+                    'codecs': [CODEC_NAME] if self.codec else [],
+                    'session': self.session_token
+                }))
+                
+                # Zustand der Delta-Kodierung gilt nur für diese Verbindung
+                decoder = EventDecoder()
+                
+                self.transfer = TransferManager(
+                    websocket,
+                    inbox=self.inbox,
+                    on_clipboard=self.clipboard.set if self.clipboard else None
+                )
+                
+                tasks = [asyncio.create_task(self.clock_sync_loop(websocket))]
+                if self.stats_interval:
+                    tasks.append(asyncio.create_task(self.stats_loop()))
+                
+                try:
+                    async for message in websocket:
+                        received = time.time()
+                        if server_proof is not None:
+                            self.check_server_proof(message, server_proof)
+                            server_proof = None
+                            # TLS-Ticket ist inzwischen angekommen, für den nächsten Reconnect merken
+                            if self.ssl_context is not None:
+                                self.ssl_context.remember(tls)
+                            continue
+                        try:
+                            if isinstance(message, bytes):
+                                if message[0] == FRAME_EVENTS:
+                                    events = decoder.decode(message)
+                                    for data in events:
+                                        await self.handle_event(data)
+                                    # Ein Flush pro Frame statt pro Event
+                                    self.injector.flush()
+                                    done = time.time()
+                                    for data in events:
+                                        self.stats.record_event(data, received, done, self.clock)
+                                else:
+                                    await self.transfer.handle_chunk(message)
+                                continue
+                            data = json.loads(message)
+                            if await self.transfer.handle_message(data):
+                                continue
+                            if data.get('type') == 'pong':
+                                self.clock.add_sample(data['t0'], data['t1'], data['t2'], received)
+                                continue
+                            if data.get('type') == 'session':
+                                self.resume_session(data)
+                                if self.ssl_context is not None:
+                                    self.ssl_context.remember(tls)
+                                continue
+                            if data.get('type') == 'udp_offer':
+                                tasks.append(asyncio.create_task(self.open_udp_channel(data)))
+                                continue
+                            if data.get('type') == 'udp_ready':
+                                self.udp_ready.set()
+                                print("✓ UDP-Kanal für Mausbewegungen aktiv")
+                                continue
+                            await self.handle_event(data)
+                            self.injector.flush()
+                            self.stats.record_event(data, received, time.time(), self.clock)
+                        except json.JSONDecodeError:
+                            print(f"Ungültiges JSON empfangen: {message}")
+                        except Exception as e:
+                            print(f"Fehler beim Verarbeiten des Events: {e}")
+                    # Regulär geschlossen, z.B. weil der Server beendet wird
+                    if websocket.close_reason:
+                        print(f"✗ Server hat die Verbindung beendet: {websocket.close_reason}")
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    self.close_udp_channel()
+                    self.transfer.close()
+                    self.transfer = None
                         
-        except websockets.exceptions.ConnectionClosed:
-            print("✗ Verbindung zum Server verloren")
+        except security.AuthenticationError as e:
+            established = False     # Mit Backoff erneut versuchen
+            print(f"✗ Authentifizierung fehlgeschlagen: {e}")
+        except websockets.exceptions.ConnectionClosed as e:
+            if e.rcvd is not None and e.rcvd.code == security.CLOSE_AUTH_FAILED:
+                established = False
+                print("✗ Server hat die Authentifizierung abgelehnt (falscher oder fehlender --psk?)")
+            else:
+                print("✗ Verbindung zum Server verloren")
         except ConnectionRefusedError:
             print("✗ Kann keine Verbindung zum Server herstellen")
             print("  Stellen Sie sicher, dass der Server läuft")
@@ -51,6 +195,156 @@ class KVMClient:
             print(f"✗ Verbindungsfehler: {e}")
         finally:
             self.connected = False
+            self.export_stats()
+            if established and (self.held_keys or self.held_buttons):
+                # Nicht ewig gedrückt lassen, falls die Sitzung nicht fortgesetzt wird
+                self.release_task = asyncio.create_task(self.release_held_after(self.release_timeout))
+        return established
+    
+    async def authenticate(self, websocket):
+        """Challenge des Servers beantworten, gibt die Werte für den Gegenbeweis zurück
+        
+        Beweis und hello gehen ohne Warten hintereinander raus, geprüft wird der
+        Gegenbeweis mit der ersten Nachricht des Servers.
+        """
+        try:
+            data = json.loads(await asyncio.wait_for(websocket.recv(), self.auth_timeout))
+            server_nonce = bytes.fromhex(data['nonce'])
+        except asyncio.TimeoutError:
+            raise security.AuthenticationError("Server verlangt keinen gemeinsamen Schlüssel")
+        except (json.JSONDecodeError, TypeError, KeyError, ValueError):
+            raise security.AuthenticationError("Unerwartete Antwort des Servers")
+        if data.get('type') != 'auth_challenge' or data.get('method') != security.AUTH_NAME:
+            raise security.AuthenticationError("Server verlangt keinen gemeinsamen Schlüssel")
+        client_nonce = security.new_nonce()
+        binding = security.peer_binding(websocket)
+        await websocket.send(json.dumps({
+            'type': 'auth',
+            'nonce': client_nonce.hex(),
+            'proof': security.proof(self.psk, b'client', server_nonce, client_nonce, binding)
+        }))
+        return server_nonce, client_nonce, binding
+    
+    def check_server_proof(self, message, challenge):
+        """Erste Nachricht nach dem Beweis muss auth_ok mit passendem Gegenbeweis sein"""
+        try:
+            data = json.loads(message)
+        except (json.JSONDecodeError, TypeError, UnicodeDecodeError):
+            data = {}
+        received = data.get('proof') if isinstance(data, dict) and data.get('type') == 'auth_ok' else None
+        if not security.check_proof(self.psk, b'server', *challenge, received):
+            raise security.AuthenticationError("Server kennt den gemeinsamen Schlüssel nicht")
+    
+    def resume_session(self, data):
+        """Sitzungs-Token merken und Tastenzustand mit dem Server abgleichen"""
+        if self.release_task is not None:
+            self.release_task.cancel()
+            self.release_task = None
+        if data.get('resumed'):
+            print("✓ Sitzung fortgesetzt")
+        self.session_token = data['token']
+        self.release_held(keep_keys=data.get('keys', ()), keep_buttons=data.get('buttons', ()))
+    
+    def release_held(self, keep_keys=(), keep_buttons=()):
+        """Alle gedrückten Tasten loslassen, die der Server nicht mehr als gedrückt führt"""
+        for code in self.held_keys - set(keep_keys):
+            try:
+                self.injector.key(code, False)
+            except Exception as e:
+                print(f"Fehler beim Loslassen der Taste '{code}': {e}")
+            self.held_keys.discard(code)
+        for button in self.held_buttons - set(keep_buttons):
+            try:
+                self.injector.mouse_button(button, False)
+            except Exception as e:
+                print(f"Fehler beim Loslassen der Maustaste '{button}': {e}")
+            self.held_buttons.discard(button)
+        self.injector.flush()
+    
+    async def release_held_after(self, delay):
+        await asyncio.sleep(delay)
+        self.release_task = None
+        if self.held_keys or self.held_buttons:
+            print("Verbindung unterbrochen - gedrückte Tasten werden losgelassen")
+            self.release_held()
+    
+    async def share_clipboard(self, text):
+        """Geänderte Zwischenablage an den Server senden"""
+        if self.transfer is not None:
+            await self.transfer.send_clipboard(text)
+    
+    async def send_file(self, path):
+        """Datei an den Server senden, True wenn sie vollständig angekommen ist"""
+        if self.transfer is None:
+            return False
+        return await self.transfer.send_file(path)
+    
+    async def open_udp_channel(self, offer):
+        """UDP-Kanal öffnen und beim Server registrieren"""
+        loop = asyncio.get_running_loop()
+        self.udp_ready = asyncio.Event()
+        try:
+            self.udp_transport, self.udp_protocol = await loop.create_datagram_endpoint(
+                lambda: PointerClientProtocol(self), remote_addr=(self.server_host, offer['port']))
+        except OSError as e:
+            print(f"UDP-Kanal nicht verfügbar ({e}), Mausbewegungen laufen über den WebSocket")
+            return
+        
+        # Registrierung wiederholen, falls ein Datagramm verloren geht
+        registration = REGISTER.pack(MAGIC, offer['token'])
+        for _ in range(10):
+            self.udp_transport.sendto(registration)
+            try:
+                await asyncio.wait_for(self.udp_ready.wait(), 0.2)
+                return
+            except asyncio.TimeoutError:
+                pass
+        print("UDP-Kanal nicht erreichbar, Mausbewegungen laufen über den WebSocket")
+    
+    def close_udp_channel(self):
+        if self.udp_transport is not None:
+            self.udp_transport.close()
+            self.udp_transport = None
+            self.udp_protocol = None
+    
+    def handle_pointer_datagram(self, event):
+        """Zeiger-Paket aus dem UDP-Kanal simulieren"""
+        received = time.time()
+        try:
+            self.injector.move_to(event['x'], event['y'])
+            self.injector.flush()
+        except Exception as e:
+            print(f"Fehler beim Simulieren des Events mouse_move: {e}")
+            return
+        self.stats.record_event(event, received, time.time(), self.clock)
+    
+    async def clock_sync_loop(self, websocket):
+        """Regelmäßig Pings für den Uhren-Abgleich senden"""
+        # Kurze Serie beim ersten Verbindungsaufbau für eine schnelle erste Schätzung,
+        # nach einem Reconnect genügt ein Ping
+        for _ in range(1 if self.clock.synced else 5):
+            await websocket.send(json.dumps({'type': 'ping', 't0': time.time()}))
+            await asyncio.sleep(0.05)
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            await websocket.send(json.dumps({'type': 'ping', 't0': time.time()}))
+    
+    async def stats_loop(self):
+        """Latenz-Statistik periodisch ausgeben und exportieren"""
+        while True:
+            await asyncio.sleep(self.stats_interval)
+            report = self.stats.format_report(self.clock)
+            if report:
+                print(f"Latenz (ms):\n{report}")
+            self.export_stats()
+    
+    def export_stats(self):
+        """Latenz-Snapshot in die Statistik-Datei schreiben (falls konfiguriert)"""
+        if self.stats_file and self.stats.histograms:
+            try:
+                self.stats.export(self.stats_file, self.clock, label=self.uri)
+            except OSError as e:
+                print(f"Konnte Latenz-Statistik nicht schreiben: {e}")
     
     async def handle_event(self, data):
         """Empfangenes Event verarbeiten"""
@@ -58,26 +352,20 @@ class KVMClient:
         
         try:
             if event_type == 'mouse_move':
-                pyautogui.moveTo(data['x'], data['y'])
+                self.injector.move_to(data['x'], data['y'])
                 
-            elif event_type == 'mouse_click':
-                button_map = {
-                    'left': 'left',
-                    'right': 'right', 
-                    'middle': 'middle'
-                }
-                
-                button = button_map.get(data['button'], 'left')
+            elif event_type == 'mouse_delta':
+                self.injector.move_rel(data['dx'], data['dy'])
                 
+            elif event_type == 'mouse_click':
+                self.injector.mouse_button(data['button'], data['pressed'])
                 if data['pressed']:
-                    pyautogui.mouseDown(button=button)
+                    self.held_buttons.add(data['button'])
                 else:
-                    pyautogui.mouseUp(button=button)
+                    self.held_buttons.discard(data['button'])
                     
             elif event_type == 'mouse_scroll':
-                # Scroll-Richtung umkehren für natürliches Scrolling
-                scroll_amount = data['dy'] * 3  # Scroll-Geschwindigkeit anpassen
-                pyautogui.scroll(scroll_amount)
+                self.injector.scroll(data.get('dx', 0), data['dy'])
                 
             elif event_type == 'key_press':
                 await self.simulate_key_press(data['key'], True)
@@ -88,82 +376,109 @@ class KVMClient:
         except Exception as e:
             print(f"Fehler beim Simulieren des Events {event_type}: {e}")
     
-    async def simulate_key_press(self, key_data, pressed):
+    async def simulate_key_press(self, code, pressed):
         """Tastendruck simulieren"""
         try:
-            # Spezielle Tasten behandeln
-            special_keys = {
-                'Key.alt': Key.alt,
-                'Key.alt_l': Key.alt_l,
-                'Key.alt_r': Key.alt_r,
-                'Key.ctrl': Key.ctrl,
-                'Key.ctrl_l': Key.ctrl_l,
-                'Key.ctrl_r': Key.ctrl_r,
-                'Key.shift': Key.shift,
-                'Key.shift_l': Key.shift_l,
-                'Key.shift_r': Key.shift_r,
-                'Key.cmd': Key.cmd,
-                'Key.cmd_l': Key.cmd_l,
-                'Key.cmd_r': Key.cmd_r,
-                'Key.space': Key.space,
-                'Key.enter': Key.enter,
-                'Key.tab': Key.tab,
-                'Key.backspace': Key.backspace,
-                'Key.delete': Key.delete,
-                'Key.esc': Key.esc,
-                'Key.up': Key.up,
-                'Key.down': Key.down,
-                'Key.left': Key.left,
-                'Key.right': Key.right,
-                'Key.home': Key.home,
-                'Key.end': Key.end,
-                'Key.page_up': Key.page_up,
-                'Key.page_down': Key.page_down,
-            }
-            
-            if key_data in special_keys:
-                key = special_keys[key_data]
-                if pressed:
-                    self.keyboard_controller.press(key)
-                else:
-                    self.keyboard_controller.release(key)
+            if isinstance(code, str):
+                # Ältere Server senden Tastennamen statt Codes
+                code = encode_key(code)
+                if code is None:
+                    return
+            self.injector.key(code, pressed)
+            if pressed:
+                self.held_keys.add(code)
             else:
-                # Normale Zeichen
-                if len(key_data) == 1:
-                    if pressed:
-                        self.keyboard_controller.press(key_data)
-                    else:
-                        self.keyboard_controller.release(key_data)
-                        
+                self.held_keys.discard(code)
         except Exception as e:
-            print(f"Fehler beim Simulieren der Taste '{key_data}': {e}")
+            print(f"Fehler beim Simulieren der Taste '{code}': {e}")
     
     async def run(self):
-        """Client dauerhaft laufen lassen mit Reconnect"""
+        """Client dauerhaft laufen lassen mit Reconnect
+
+        Nach einem Verbindungsabbruch wird sofort neu verbunden, danach mit
+        exponentiell wachsender Wartezeit (mit Jitter, damit nicht alle Clients
+        gleichzeitig anklopfen).
+        """
+        # Zwischenablage/Ausgang laufen über Reconnects hinweg weiter
+        if self.clipboard:
+            asyncio.create_task(self.clipboard.run())
+        if self.outbox:
+            asyncio.create_task(OutboxWatcher(self.outbox, self.send_file).run())
+        
+        attempt = 0
         while True:
             try:
-                await self.connect_to_server()
+                if await self.connect_to_server():
+                    attempt = 0
             except KeyboardInterrupt:
                 print("\nClient wird beendet...")
                 break
             
-            if not self.connected:
-                print("Versuche Reconnect in 5 Sekunden...")
-                await asyncio.sleep(5)
+            if attempt == 0:
+                delay = 0.0
+            else:
+                delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+                delay = random.uniform(delay / 2, delay)
+                print(f"Versuche Reconnect in {delay:.1f} Sekunden...")
+            attempt += 1
+            await asyncio.sleep(delay)
 
 def main():
-    import sys
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="KVM Client - empfängt Events vom Server")
+    parser.add_argument('host', nargs='?', default='localhost', help="Server-Adresse")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--name', help="Name dieses Hosts für die Bildschirm-Anordnung (Standard: Rechnername)")
+    parser.add_argument('--stats-interval', type=float, default=10.0,
+                        help="Sekunden zwischen Latenz-Ausgaben (0 = aus)")
+    parser.add_argument('--stats-file', help="Latenz-Snapshots als JSON-Lines exportieren")
+    parser.add_argument('--injector', choices=INJECTORS, default='auto',
+                        help="Eingabe-Backend (Standard: auto = uinput, dann XTest, sonst pyautogui)")
+    parser.add_argument('--scroll-scale', type=float, default=SCROLL_SCALE,
+                        help=f"Faktor für Scroll-Deltas (Standard: {SCROLL_SCALE:g}, wie bisher)")
+    parser.add_argument('--record', help="Simulierte Events zusätzlich in ein Event-Log schreiben")
+    parser.add_argument('--no-udp', action='store_true',
+                        help="Mausbewegungen nur über den WebSocket empfangen")
+    parser.add_argument('--clipboard', action='store_true', help="Zwischenablage mit dem Server teilen")
+    parser.add_argument('--inbox', help="Ordner für empfangene Dateien")
+    parser.add_argument('--outbox', help="Dateien in diesem Ordner an den Server senden")
+    parser.add_argument('--no-delta', action='store_true', help="Events als JSON statt binär empfangen")
+    parser.add_argument('--no-deflate', action='store_true', help="permessage-deflate nicht anbieten")
+    parser.add_argument('--tls', action='store_true', help="Verschlüsselt verbinden (wss)")
+    parser.add_argument('--ca', help="Server-Zertifikat (PEM), dem vertraut wird (impliziert --tls)")
+    parser.add_argument('--psk', default=os.environ.get('KVM_PSK'),
+                        help="Gemeinsamer Schlüssel oder Datei damit (Standard: Umgebungsvariable KVM_PSK)")
+    args = parser.parse_args()
     
-    server_host = 'localhost'
-    if len(sys.argv) > 1:
-        server_host = sys.argv[1]
+    try:
+        psk = security.load_psk(args.psk) if args.psk else None
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+    if (args.tls or args.ca) and psk is None and not args.ca:
+        print("Warnung: Server-Zertifikat wird weder über --ca noch über --psk geprüft")
+    
+    try:
+        injector = create_injector(args.injector, args.scroll_scale)
+    except Exception as e:
+        parser.error(f"Eingabe-Backend {args.injector} nicht verfügbar: {e}")
+    if args.record:
+        from recorder import LogInjector
+        injector = LogInjector(args.record, inner=injector)
     
-    client = KVMClient(server_host)
+    client = KVMClient(args.host, args.port, stats_interval=args.stats_interval,
+                       stats_file=args.stats_file, injector=injector, udp=not args.no_udp,
+                       clipboard=args.clipboard, inbox=args.inbox, outbox=args.outbox,
+                       codec=not args.no_delta, deflate=not args.no_deflate, name=args.name,
+                       tls=args.tls, cafile=args.ca, psk=psk)
     
     try:
         asyncio.run(client.run())
     except KeyboardInterrupt:
         print("\nProgramm beendet.")
+    finally:
+        if args.record:
+            injector.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Kompakte Binär-Kodierung für Eingabe-Events
+
+Statt JSON ({"type": "mouse_delta", "dx": 3, ...} ≈ 110 Bytes) geht jedes Event
+als binärer WebSocket-Frame mit Varints raus, kodiert als Differenz zum vorigen
+Event derselben Verbindung:
+
+    Frame:    FRAME_EVENTS + ein oder mehrere Events
+    Event:    Typ (1 Byte, wie im Event-Log) + Δseq + Δtimestamp (µs) + sent-timestamp (µs) + Nutzdaten
+    mouse_move/click/scroll:  Δx, Δy zur letzten absoluten Position
+    mouse_delta:              dx, dy
+    mouse_scroll:             dx, dy in 1/120 Rasterstufen
+    key_press/release:        Tastencode
+
+Alle Zahlen als Zigzag-Varint (kleine Beträge → 1 Byte). Encoder und Decoder
+halten den Zustand pro Verbindung und beginnen nach jedem (Re-)Connect neu.
+Ausgehandelt wird über hello ('codecs') und session ('codec').
+
+Bandbreite vergleichen:
+    python codec.py                      # synthetischer Strom
+    python codec.py --events sitzung.kvmlog
+"""
+import json
+import zlib
+
+from recorder import TYPE_IDS, RECORD_TYPES, BUTTONS, BUTTON_IDS
+
+CODEC_NAME = 'delta1'
+
+# Erstes Byte binärer Frames; Datenblöcke der Dateiübertragung beginnen mit FRAME_CHUNK (transfer.py)
+FRAME_EVENTS = 0xE1
+
+# Scroll-Schritte in 1/120 (WHEEL_DELTA unter Windows), ganze Rasterstufen bleiben exakt
+SCROLL_UNITS = 120
+
+
+def write_varint(out, value):
+    """Vorzeichenbehaftete Zahl als Zigzag-Varint anhängen"""
+    value = (value << 1) ^ (value >> 63)
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    """Gibt (Wert, neuer Offset) zurück"""
+    result = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            break
+        shift += 7
+    return (result >> 1) ^ -(result & 1), offset
+
+
+def _micros(seconds):
+    return int(round((seconds or 0.0) * 1e6))
+
+
+class EventEncoder:
+    """Server-Seite, eine Instanz pro Verbindung"""
+
+    def __init__(self):
+        self.seq = 0
+        self.timestamp = 0
+        self.x = 0
+        self.y = 0
+
+    def encode(self, message):
+        """Ein Event als fertigen Frame"""
+        out = bytearray((FRAME_EVENTS,))
+        self.encode_into(out, message)
+        return bytes(out)
+
+    def encode_into(self, out, message):
+        event_type = message['type']
+        out.append(TYPE_IDS[event_type])
+
+        seq = message.get('seq', self.seq)
+        write_varint(out, seq - self.seq)
+        self.seq = seq
+        timestamp = _micros(message.get('timestamp'))
+        write_varint(out, timestamp - self.timestamp)
+        self.timestamp = timestamp
+        write_varint(out, _micros(message.get('sent')) - timestamp)
+
+        if event_type == 'mouse_delta':
+            write_varint(out, int(message['dx']))
+            write_varint(out, int(message['dy']))
+            return
+        if event_type in ('key_press', 'key_release'):
+            write_varint(out, message['key'])
+            return
+
+        x = int(round(message['x']))
+        y = int(round(message['y']))
+        write_varint(out, x - self.x)
+        write_varint(out, y - self.y)
+        self.x = x
+        self.y = y
+        if event_type == 'mouse_click':
+            out.append(BUTTON_IDS.get(message['button'], 0) << 1 | (1 if message['pressed'] else 0))
+        elif event_type == 'mouse_scroll':
+            write_varint(out, int(round(message.get('dx', 0) * SCROLL_UNITS)))
+            write_varint(out, int(round(message['dy'] * SCROLL_UNITS)))
+
+
+class EventDecoder:
+    """Client-Seite, eine Instanz pro Verbindung"""
+
+    def __init__(self):
+        self.seq = 0
+        self.timestamp = 0
+        self.x = 0
+        self.y = 0
+
+    def decode(self, frame):
+        """Alle Events eines Frames als Dictionaries im JSON-Format des Servers"""
+        if not frame or frame[0] != FRAME_EVENTS:
+            raise ValueError("Kein Event-Frame")
+        events = []
+        offset = 1
+        while offset < len(frame):
+            event, offset = self.decode_event(frame, offset)
+            events.append(event)
+        return events
+
+    def decode_event(self, data, offset):
+        record = RECORD_TYPES.get(data[offset])
+        if record is None:
+            raise ValueError(f"Unbekannter Event-Typ {data[offset]}")
+        event_type = record[0]
+        offset += 1
+
+        delta, offset = read_varint(data, offset)
+        self.seq += delta
+        delta, offset = read_varint(data, offset)
+        self.timestamp += delta
+        sent, offset = read_varint(data, offset)
+        event = {
+            'type': event_type,
+            'seq': self.seq,
+            'timestamp': self.timestamp / 1e6,
+            'sent': (self.timestamp + sent) / 1e6
+        }
+
+        if event_type == 'mouse_delta':
+            event['dx'], offset = read_varint(data, offset)
+            event['dy'], offset = read_varint(data, offset)
+            return event, offset
+        if event_type in ('key_press', 'key_release'):
+            event['key'], offset = read_varint(data, offset)
+            return event, offset
+
+        dx, offset = read_varint(data, offset)
+        dy, offset = read_varint(data, offset)
+        self.x += dx
+        self.y += dy
+        event['x'] = self.x
+        event['y'] = self.y
+        if event_type == 'mouse_click':
+            flags = data[offset]
+            offset += 1
+            button = flags >> 1
+            event['button'] = BUTTONS[button] if button < len(BUTTONS) else 'unknown'
+            event['pressed'] = bool(flags & 1)
+        elif event_type == 'mouse_scroll':
+            scroll_x, offset = read_varint(data, offset)
+            scroll_y, offset = read_varint(data, offset)
+            event['dx'] = scroll_x / SCROLL_UNITS
+            event['dy'] = scroll_y / SCROLL_UNITS
+        return event, offset
+
+
+class DeflateMeter:
+    """Größe nach permessage-deflate abschätzen (Kontext bleibt über Nachrichten erhalten)
+
+    Gleiche Einstellungen wie websockets.serve: 12 Bit Fenster, memLevel 5.
+    """
+
+    def __init__(self, window_bits=12, mem_level=5):
+        self.compressor = zlib.compressobj(wbits=-window_bits, memLevel=mem_level)
+
+    def size(self, payload):
+        if isinstance(payload, str):
+            payload = payload.encode('utf-8')
+        data = self.compressor.compress(payload) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        # Die abschließenden 00 00 ff ff werden laut RFC 7692 nicht übertragen
+        return len(data) - 4
+
+
+def frame_size(payload_size):
+    """Payload plus WebSocket-Frame-Kopf (Server → Client, unmaskiert)"""
+    if payload_size < 126:
+        return payload_size + 2
+    if payload_size < 65536:
+        return payload_size + 4
+    return payload_size + 10
+
+
+def measure(messages):
+    """Bytes auf der Leitung für JSON bzw. Delta-Kodierung, jeweils mit und ohne Deflate"""
+    encoder = EventEncoder()
+    json_deflate = DeflateMeter()
+    delta_deflate = DeflateMeter()
+    totals = {'json': 0, 'json+deflate': 0, 'delta': 0, 'delta+deflate': 0}
+    count = 0
+    for message in messages:
+        text = json.dumps(message)
+        frame = encoder.encode(message)
+        totals['json'] += frame_size(len(text.encode('utf-8')))
+        totals['json+deflate'] += frame_size(json_deflate.size(text))
+        totals['delta'] += frame_size(len(frame))
+        totals['delta+deflate'] += frame_size(delta_deflate.size(frame))
+        count += 1
+    return count, totals
+
+
+def wire_messages(events, start=None, interval=0.001):
+    """Events aus backends/recorder so aufbereiten, wie sie der Server sendet"""
+    from keymap import encode_key
+    timestamp = start if start is not None else 1.7e9
+    remote_x, remote_y = 960, 540
+    for seq, event in enumerate(events):
+        message = dict(event)
+        if 'key' in message:
+            message['key'] = encode_key(message['key'])
+        if message['type'] == 'mouse_move' and seq:
+            # Der Server sendet im Remote-Modus relative Bewegungen
+            message = {'type': 'mouse_delta', 'dx': event['x'] - remote_x, 'dy': event['y'] - remote_y}
+        if 'x' in event:
+            remote_x, remote_y = event['x'], event['y']
+        timestamp += interval
+        message['timestamp'] = timestamp
+        message['sent'] = timestamp + 0.00005
+        message['seq'] = seq
+        yield message
+
+
+def main():
+    import argparse
+    import itertools
+    from backends import synthetic_events, load_events
+
+    parser = argparse.ArgumentParser(description="Bandbreite: JSON vs. Delta-Kodierung")
+    parser.add_argument('--events', help="Event-Log oder JSON-Lines statt synthetischem Strom")
+    parser.add_argument('--count', type=int, default=20000)
+    args = parser.parse_args()
+
+    events = load_events(args.events) if args.events else synthetic_events()
+    count, totals = measure(wire_messages(itertools.islice(events, args.count)))
+    base = totals['json']
+    print(f"{count} Events")
+    for name, total in totals.items():
+        print(f"  {name:<14} {total:>10} Bytes  {total / count:6.1f} B/Event  {total / base * 100:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
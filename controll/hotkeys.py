@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Hotkey-Erkennung für den KVM Server
+
+Jede Taste wird auf einen normalisierten Namen abgebildet (ctrl_l/ctrl_r → ctrl,
+Ctrl+S als Steuerzeichen → s, virtueller Tastencode statt Zeichen, wo möglich) und
+bekommt ein Bit. Der Zustand der gedrückten Tasten ist eine Bitmaske, ein Hotkey
+ist eine Maske - pro Event bleiben ein Dictionary-Zugriff und ein paar Bit-Operationen.
+
+Modifier, die der Anfang eines Hotkeys sein könnten (z.B. Ctrl und Alt), meldet der
+Matcher als DEFER: der Server hält sie zurück, bis klar ist, ob ein Hotkey daraus
+wird. So kommt von einem Hotkey nichts beim Remote-Rechner an. Verglichen werden
+nur die noch nicht weitergeleiteten Tasten - eine beim schnellen Tippen noch
+gehaltene Taste verhindert den Hotkey also nicht.
+"""
+import sys
+
+# Ergebnis von ChordMatcher.press
+FORWARD = 0     # Normal weiterleiten
+DEFER = 1       # Zurückhalten, könnte Teil eines Hotkeys werden
+SWALLOW = 2     # Gehört zu einem erkannten Hotkey (z.B. Auto-Repeat), nicht senden
+MATCH = 3       # Hotkey erkannt, Aktion in ChordMatcher.action
+
+DEFAULT_BINDINGS = {
+    'switch': 'ctrl+alt+s',      # Lokal ↔ aktiver Host
+    'pause': 'ctrl+alt+p',       # Weiterleitung und Randwechsel aussetzen
+    'release': 'ctrl+alt+r',     # Alle gedrückten Tasten beim Host loslassen
+}
+DEFAULT_BINDINGS.update({f'host{i}': f'ctrl+alt+{i}' for i in range(1, 10)})
+
+MODIFIER_NAMES = ('ctrl', 'alt', 'shift', 'cmd')
+
+# Linke/rechte Varianten zählen als dieselbe Taste
+MODIFIERS = {
+    'ctrl_l': 'ctrl', 'ctrl_r': 'ctrl',
+    'alt_l': 'alt', 'alt_r': 'alt', 'alt_gr': 'alt',
+    'shift_l': 'shift', 'shift_r': 'shift',
+    'cmd_l': 'cmd', 'cmd_r': 'cmd',
+}
+
+# Schreibweisen in der Konfiguration
+CHORD_ALIASES = {
+    'control': 'ctrl', 'strg': 'ctrl',
+    'option': 'alt',
+    'win': 'cmd', 'super': 'cmd', 'meta': 'cmd',
+    'return': 'enter', 'escape': 'esc',
+}
+
+# Unter Windows und X11 ist der virtuelle Code für Buchstaben und Ziffern unabhängig
+# von Ctrl/Alt - unter macOS ist es ein Hardware-Code, dort gilt das Zeichen
+USE_VK = sys.platform != 'darwin'
+
+
+def _char_name(char):
+    code = ord(char[0])
+    if 0x01 <= code <= 0x1a:
+        # Ctrl+Buchstabe liefert auf manchen Plattformen ein Steuerzeichen
+        return chr(code + 0x60)
+    return char[0].lower()
+
+
+def normalize_key(key):
+    """pynput-Taste oder Name ('a', 'Key.ctrl_l') → normalisierter Name, None wenn unbekannt"""
+    if isinstance(key, str):
+        if len(key) == 1:
+            return _char_name(key)
+        name = key[4:] if key.startswith('Key.') else key
+        return MODIFIERS.get(name, name)
+
+    # pynput.keyboard.Key
+    name = getattr(key, 'name', None)
+    if name is not None:
+        return MODIFIERS.get(name, name)
+
+    # pynput.keyboard.KeyCode
+    vk = getattr(key, 'vk', None)
+    if USE_VK and vk is not None and (0x30 <= vk <= 0x39 or 0x41 <= vk <= 0x5a or 0x61 <= vk <= 0x7a):
+        return chr(vk).lower()
+    char = getattr(key, 'char', None)
+    if char:
+        return _char_name(char)
+    if vk is not None:
+        return f'vk{vk}'
+    return None
+
+
+def format_chord(chord):
+    """'ctrl+alt+s' → 'Ctrl+Alt+S' für die Ausgabe"""
+    return '+'.join(part.strip().capitalize() for part in chord.split('+'))
+
+
+class ChordMatcher:
+    """Erkennt Tastenkombinationen über eine Bitmaske der gedrückten Tasten
+
+    bindings: Aktion → Kombination, z.B. {'switch': 'ctrl+alt+s'}
+    """
+
+    def __init__(self, bindings=None):
+        self.bits = {}          # Normalisierter Name → Bit
+        self.key_bits = {}      # pynput-Taste → Bit (spart die Normalisierung bei jedem Event)
+        self.chords = {}        # Bitmaske → Aktion
+        self.prefixes = set()   # Echte Teilmasken aller Kombinationen, nur aus Modifiern
+        self.bindings = {}
+        self.state = 0          # Gedrückte Tasten
+        self.forwarded = 0      # ... davon an den Remote-Rechner weitergeleitet
+        self.swallowed = 0      # ... davon Teil eines erkannten Hotkeys
+        self.action = None
+        for action, chord in (DEFAULT_BINDINGS if bindings is None else bindings).items():
+            self.bind(action, chord)
+
+    def bit(self, name):
+        bit = self.bits.get(name)
+        if bit is None:
+            bit = self.bits[name] = 1 << len(self.bits)
+        return bit
+
+    def bind(self, action, chord):
+        """Kombination einer Aktion zuordnen (ersetzt eine bisherige Zuordnung der Aktion)"""
+        mask = 0
+        for part in chord.lower().split('+'):
+            name = part.strip()
+            if not name:
+                raise ValueError(f"Ungültige Tastenkombination: '{chord}'")
+            mask |= self.bit(MODIFIERS.get(name, CHORD_ALIASES.get(name, name)))
+        if self.chords.get(mask, action) != action:
+            raise ValueError(f"Tastenkombination '{chord}' ist bereits mit '{self.chords[mask]}' belegt")
+        if action in self.bindings:
+            self.unbind(action)
+        self.chords[mask] = action
+        self.bindings[action] = chord
+        self._update_prefixes()
+
+    def unbind(self, action):
+        self.bindings.pop(action, None)
+        for mask in [m for m, a in self.chords.items() if a == action]:
+            del self.chords[mask]
+        self._update_prefixes()
+
+    def _update_prefixes(self):
+        # Nur Modifier zurückhalten - einzelne Buchstaben und Ziffern gehen sofort raus
+        modifiers = 0
+        for name in MODIFIER_NAMES:
+            modifiers |= self.bits.get(name, 0)
+        self.prefixes = set()
+        for mask in self.chords:
+            sub = (mask - 1) & mask
+            while sub:
+                if not sub & ~modifiers:
+                    self.prefixes.add(sub)
+                sub = (sub - 1) & mask
+
+    def key_bit(self, key):
+        bit = self.key_bits.get(key)
+        if bit is None:
+            name = normalize_key(key)
+            bit = self.key_bits[key] = self.bit(name) if name is not None else 0
+        return bit
+
+    def press(self, key):
+        """Taste gedrückt: FORWARD, DEFER, SWALLOW oder MATCH"""
+        bit = self.key_bit(key)
+        if not bit:
+            return FORWARD
+        if self.state & bit:
+            # Auto-Repeat einer gehaltenen Taste löst keinen Hotkey erneut aus
+            if self.swallowed & bit:
+                return SWALLOW
+            return FORWARD if self.forwarded & bit else DEFER
+        self.state |= bit
+        pending = self.state & ~self.forwarded
+        action = self.chords.get(pending)
+        if action is not None:
+            self.action = action
+            self.swallowed |= pending
+            return MATCH
+        if pending in self.prefixes:
+            return DEFER
+        # Zurückgehaltene Tasten sendet der Server jetzt mit
+        self.flush()
+        return FORWARD
+
+    def flush(self):
+        """Zurückgehaltene Tasten wurden weitergeleitet (z.B. vor einem Mausklick)"""
+        self.forwarded |= self.state & ~self.swallowed
+
+    def release(self, key):
+        """Taste losgelassen, gibt True zurück wenn sie zu einem erkannten Hotkey gehörte"""
+        bit = self.key_bit(key)
+        self.state &= ~bit
+        self.forwarded &= ~bit
+        if self.swallowed & bit:
+            self.swallowed &= ~bit
+            return True
+        return False
+
+    def reset(self):
+        self.state = 0
+        self.forwarded = 0
+        self.swallowed = 0
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Gemeinsame Tastencodes für KVM over Network
+
+Auf der Leitung wird jede Taste als Integer übertragen:
+- Zeichen:        Unicode-Codepoint (ord)
+- Sondertasten:   SPECIAL_BASE + Index in KEY_NAMES (alle Tasten aus pynputs Key)
+- Sonstige Tasten ohne Zeichen: VK_BASE + virtueller Tastencode der Plattform
+
+Die Tabellen werden einmal beim Import bzw. beim Start des Backends aufgebaut;
+pro Event bleibt nur ein Dictionary-Zugriff.
+"""
+
+SPECIAL_BASE = 0x110000   # direkt oberhalb des Unicode-Bereichs
+VK_BASE = 0x120000
+
+# Reihenfolge nicht ändern, nur anhängen - der Index ist Teil des Protokolls
+KEY_NAMES = (
+    'alt', 'alt_l', 'alt_r', 'alt_gr',
+    'backspace', 'caps_lock',
+    'cmd', 'cmd_l', 'cmd_r',
+    'ctrl', 'ctrl_l', 'ctrl_r',
+    'delete', 'down', 'end', 'enter', 'esc',
+    'f1', 'f2', 'f3', 'f4', 'f5', 'f6', 'f7', 'f8', 'f9', 'f10',
+    'f11', 'f12', 'f13', 'f14', 'f15', 'f16', 'f17', 'f18', 'f19', 'f20',
+    'f21', 'f22', 'f23', 'f24',
+    'home', 'left', 'page_down', 'page_up', 'right',
+    'shift', 'shift_l', 'shift_r',
+    'space', 'tab', 'up',
+    'media_play_pause', 'media_volume_mute', 'media_volume_down', 'media_volume_up',
+    'media_previous', 'media_next', 'media_stop', 'media_eject',
+    'insert', 'menu', 'num_lock', 'pause', 'print_screen', 'scroll_lock',
+)
+
+NAME_TO_CODE = {name: SPECIAL_BASE + i for i, name in enumerate(KEY_NAMES)}
+CODE_TO_NAME = {code: name for name, code in NAME_TO_CODE.items()}
+
+# Auch die bisherigen String-Namen ("Key.ctrl") auflösen, z.B. aus aufgezeichneten Sitzungen
+for _name, _code in list(NAME_TO_CODE.items()):
+    NAME_TO_CODE['Key.' + _name] = _code
+del _name, _code
+
+
+def encode_key(key):
+    """pynput-Taste (Key/KeyCode) oder Zeichen in einen Integer-Code umwandeln
+
+    Gibt None zurück, wenn die Taste nicht abbildbar ist.
+    """
+    if isinstance(key, int):
+        return key
+    if isinstance(key, str):
+        if len(key) == 1:
+            return ord(key)
+        return NAME_TO_CODE.get(key)
+
+    # pynput.keyboard.Key (Enum) hat einen Namen
+    name = getattr(key, 'name', None)
+    if name is not None:
+        return NAME_TO_CODE.get(name)
+
+    # pynput.keyboard.KeyCode
+    char = getattr(key, 'char', None)
+    if char:
+        code = ord(char[0])
+        if 0x01 <= code <= 0x1a:
+            # Ctrl+Buchstabe liefert auf manchen Plattformen ein Steuerzeichen
+            code += 0x60
+        return code
+    vk = getattr(key, 'vk', None)
+    if vk is not None:
+        return VK_BASE + vk
+    return None
+
+
+def build_key_table(key_class):
+    """Tabelle Code → pynput-Objekt für die Tastatur-Simulation aufbauen
+
+    Sondertasten, die es auf dieser Plattform nicht gibt (z.B. f21 auf macOS),
+    fehlen in der Tabelle.
+    """
+    table = {}
+    for name in KEY_NAMES:
+        key = getattr(key_class, name, None)
+        if key is not None:
+            table[NAME_TO_CODE[name]] = key
+    # Druckbare ASCII-Zeichen vorab eintragen, der Rest wird bei Bedarf ergänzt
+    for code in range(0x20, 0x7f):
+        table[code] = chr(code)
+    return table
+
+
+def resolve_key(table, key_code_class, code):
+    """Code auflösen, der noch nicht in der Tabelle steht (und dort ablegen)"""
+    if code < SPECIAL_BASE:
+        key = chr(code)
+    elif code >= VK_BASE:
+        key = key_code_class.from_vk(code - VK_BASE)
+    else:
+        # Sondertaste, die es auf dieser Plattform nicht gibt
+        return None
+    table[code] = key
+    return key
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Latenz-Messung für KVM over Network - Uhren-Abgleich (NTP-artig) und Histogramme
+"""
+import json
+import math
+import time
+from collections import deque
+
+# Messpunkte eines Events: Erfassung → Senden → Empfang → Simulation
+STAGES = ('capture_send', 'network', 'receive_inject', 'total')
+
+
+class LatencyHistogram:
+    """Logarithmisches Histogramm für Latenzen (Millisekunden), O(1) pro Messwert"""
+
+    MIN_MS = 0.01      # Untere Grenze des ersten Buckets
+    GROWTH = 1.1       # Jeder Bucket ist 10% breiter als der vorherige
+    BUCKETS = 170      # Deckt 0.01 ms bis ca. 100 s ab
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._log_growth = math.log(self.GROWTH)
+
+    def record(self, ms):
+        """Messwert in Millisekunden eintragen"""
+        if ms < 0:
+            # Rest-Fehler des Uhren-Abgleichs, zählt als "sofort"
+            ms = 0.0
+        if ms <= self.MIN_MS:
+            index = 0
+        else:
+            index = min(int(math.log(ms / self.MIN_MS) / self._log_growth) + 1, self.BUCKETS - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ms
+        if ms < self.min:
+            self.min = ms
+        if ms > self.max:
+            self.max = ms
+
+    def merge(self, other):
+        """Messwerte eines anderen Histogramms übernehmen"""
+        for index, bucket in enumerate(other.counts):
+            self.counts[index] += bucket
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def upper_bound(self, index):
+        """Obere Grenze eines Buckets in Millisekunden"""
+        return self.MIN_MS * self.GROWTH ** index
+
+    def percentile(self, p):
+        """Näherungswert für das p-te Perzentil (0-100)"""
+        if self.count == 0:
+            return None
+        threshold = self.count * p / 100.0
+        seen = 0
+        for index, bucket in enumerate(self.counts):
+            seen += bucket
+            if bucket and seen >= threshold:
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Kennzahlen als Dictionary"""
+        if self.count == 0:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': self.total / self.count,
+            'min': self.min,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': self.max,
+        }
+
+
+class ClockSync:
+    """Schätzt den Uhren-Offset zum Server per Ping/Pong (wie NTP)
+
+    offset = Serverzeit - Clientzeit. Von den letzten Messungen wird die mit
+    der kleinsten Round-Trip-Time verwendet, da sie am wenigsten durch
+    Warteschlangen im Netz verfälscht ist.
+    """
+
+    def __init__(self, window=8):
+        self.samples = deque(maxlen=window)
+        self.offset = 0.0
+        self.rtt = None
+
+    @property
+    def synced(self):
+        return bool(self.samples)
+
+    def add_sample(self, t0, t1, t2, t3):
+        """Ping gesendet (t0), Server empfangen (t1), Server gesendet (t2), Pong empfangen (t3)"""
+        rtt = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self.samples.append((rtt, offset))
+        self.rtt, self.offset = min(self.samples)
+
+    def to_server_time(self, local_ts):
+        """Lokalen Zeitstempel in Serverzeit umrechnen"""
+        return local_ts + self.offset
+
+
+class LatencyStats:
+    """Latenz-Histogramme pro Event-Typ und Messpunkt"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = time.time()
+
+    def record(self, event_type, stage, seconds):
+        key = (event_type, stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram()
+        histogram.record(seconds * 1000.0)
+
+    def record_event(self, data, received, injected, clock):
+        """Alle Messpunkte eines empfangenen Events eintragen
+
+        data['timestamp'] (Erfassung) und data['sent'] stammen von der Server-Uhr,
+        received/injected von der lokalen Uhr.
+        """
+        captured = data.get('timestamp')
+        sent = data.get('sent')
+        event_type = data.get('type', 'unknown')
+        if captured is None:
+            return
+        if sent is not None:
+            self.record(event_type, 'capture_send', sent - captured)
+            if clock.synced:
+                self.record(event_type, 'network', clock.to_server_time(received) - sent)
+        self.record(event_type, 'receive_inject', injected - received)
+        if clock.synced:
+            self.record(event_type, 'total', clock.to_server_time(injected) - captured)
+
+    def snapshot(self, clock=None):
+        """Aktueller Stand als JSON-fähiges Dictionary"""
+        events = {}
+        for (event_type, stage), histogram in sorted(self.histograms.items()):
+            events.setdefault(event_type, {})[stage] = histogram.summary()
+        result = {
+            'time': time.time(),
+            'duration': time.time() - self.started,
+            'events': events,
+        }
+        if clock is not None:
+            result['clock'] = {'offset_ms': clock.offset * 1000.0,
+                               'rtt_ms': clock.rtt * 1000.0 if clock.rtt is not None else None}
+        return result
+
+    def format_report(self, clock=None):
+        """Lesbarer Bericht für die periodische Log-Ausgabe"""
+        lines = []
+        if clock is not None and clock.synced:
+            lines.append(f"Uhren-Offset: {clock.offset * 1000:+.2f} ms, RTT: {clock.rtt * 1000:.2f} ms")
+        for (event_type, stage), histogram in sorted(self.histograms.items()):
+            s = histogram.summary()
+            if s['count'] == 0:
+                continue
+            lines.append(
+                f"  {event_type:<12} {stage:<15} n={s['count']:<6} "
+                f"p50={s['p50']:.2f} p90={s['p90']:.2f} p99={s['p99']:.2f} max={s['max']:.2f} ms"
+            )
+        return '\n'.join(lines)
+
+    def export(self, path, clock=None, label=None):
+        """Snapshot als JSON-Zeile an eine Datei anhängen (zum Vergleich mehrerer Netzwerke)"""
+        data = self.snapshot(clock)
+        if label:
+            data['label'] = label
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(data) + '\n')
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Direkte Eingabe-Simulation unter Linux: XTest und /dev/uinput
+
+XTestInjector: schickt Events per XTest-Erweiterung direkt an den X-Server
+(python-xlib, ohne pyautogui/pynput dazwischen). Die Requests landen nur im
+Ausgabepuffer der Verbindung und werden erst mit flush() gesendet - der Client
+ruft flush() einmal pro empfangenem Event-Frame auf, nicht pro Event.
+Relative Bewegung ist native XTest-Bewegung (kein Lesen der Position nötig).
+Scrollen über die Tasten 4-7, also ganze Raststufen (Rest wird aufgehoben).
+
+UInputInjector: virtuelle Geräte im Kernel über /dev/uinput, funktioniert auch
+unter Wayland und auf der Konsole. Events werden gesammelt und bei flush() mit
+einem write() geschrieben. Hochauflösendes Scrollen über REL_WHEEL_HI_RES
+(120 Einheiten pro Raststufe). Braucht Schreibrecht auf /dev/uinput (Gruppe
+input bzw. udev-Regel). Tasten werden nach US-Layout auf Scancodes abgebildet,
+Zeichen ohne Taste gehen an pynput.
+
+Auswahl: backends.create_injector('auto') nimmt uinput, dann XTest, sonst pyautogui.
+
+Benchmark (startet bei Bedarf Xvfb):
+    python linux_input.py bench
+    python linux_input.py bench --events 20000 --batch 16 --backend xtest --backend pyautogui
+"""
+import os
+import struct
+import time
+
+from backends import SCROLL_SCALE, InjectionBackend, native_screen_size
+from keymap import SPECIAL_BASE, VK_BASE, CODE_TO_NAME, NAME_TO_CODE
+from pointer import ScrollAccumulator
+
+# ---------- XTest ----------
+
+# Sondertasten (Namen aus keymap.KEY_NAMES) → X-Keysym
+X_KEYSYMS = {
+    'alt': 0xFFE9, 'alt_l': 0xFFE9, 'alt_r': 0xFFEA, 'alt_gr': 0xFE03,
+    'backspace': 0xFF08, 'caps_lock': 0xFFE5,
+    'cmd': 0xFFEB, 'cmd_l': 0xFFEB, 'cmd_r': 0xFFEC,
+    'ctrl': 0xFFE3, 'ctrl_l': 0xFFE3, 'ctrl_r': 0xFFE4,
+    'delete': 0xFFFF, 'down': 0xFF54, 'end': 0xFF57, 'enter': 0xFF0D, 'esc': 0xFF1B,
+    **{f'f{n}': 0xFFBE + n - 1 for n in range(1, 25)},
+    'home': 0xFF50, 'left': 0xFF51, 'page_down': 0xFF56, 'page_up': 0xFF55, 'right': 0xFF53,
+    'shift': 0xFFE1, 'shift_l': 0xFFE1, 'shift_r': 0xFFE2,
+    'space': 0x0020, 'tab': 0xFF09, 'up': 0xFF52,
+    'media_play_pause': 0x1008FF14, 'media_volume_mute': 0x1008FF12,
+    'media_volume_down': 0x1008FF11, 'media_volume_up': 0x1008FF13,
+    'media_previous': 0x1008FF16, 'media_next': 0x1008FF17,
+    'media_stop': 0x1008FF15, 'media_eject': 0x1008FF2C,
+    'insert': 0xFF63, 'menu': 0xFF67, 'num_lock': 0xFF7F, 'pause': 0xFF13,
+    'print_screen': 0xFF61, 'scroll_lock': 0xFF14,
+}
+
+X_BUTTONS = {'left': 1, 'middle': 2, 'right': 3}
+X_SHIFT_KEYSYMS = (0xFFE1, 0xFFE2)
+
+
+def code_to_keysym(code):
+    """Tastencode aus keymap → X-Keysym, None wenn unbekannt"""
+    if code < SPECIAL_BASE:
+        if 0x20 <= code <= 0x7E or 0xA0 <= code <= 0xFF:
+            return code  # Latin-1: Keysym = Codepoint
+        return 0x01000000 | code
+    if code >= VK_BASE:
+        return code - VK_BASE  # pynput unter X11: vk ist das Keysym
+    return X_KEYSYMS.get(CODE_TO_NAME.get(code))
+
+
+class XTestInjector(InjectionBackend):
+    """Eingabe über die XTest-Erweiterung mit gebündeltem Senden"""
+
+    def __init__(self, display_name=None, scroll_scale=SCROLL_SCALE):
+        from Xlib import X, display
+        from Xlib.ext import xtest
+
+        self.X = X
+        self.fake_input = xtest.fake_input
+        self.display = display.Display(display_name)
+        if not self.display.has_extension('XTEST'):
+            self.display.close()
+            raise RuntimeError("X-Server ohne XTest-Erweiterung")
+        screen = self.display.screen()
+        self.root = screen.root
+        self.size = (int(screen.width_in_pixels), int(screen.height_in_pixels))
+        self.scroll_rest = ScrollAccumulator(1.0)
+        self.scroll_scale = scroll_scale
+        self.keycodes = {}       # Keysym → (Keycode, braucht Shift)
+        self.shift_held = 0
+        self.spare_keycode = None  # freier Keycode für Zeichen ohne Taste im Layout
+        self.pending = 0
+
+    def screen_size(self):
+        return self.size
+
+    def move_to(self, x, y):
+        self.fake_input(self.display, self.X.MotionNotify, x=int(x), y=int(y))
+        self.pending += 1
+
+    def move_rel(self, dx, dy):
+        # detail=True: relative Bewegung, der Server rechnet von der aktuellen Position
+        self.fake_input(self.display, self.X.MotionNotify, detail=True, x=int(dx), y=int(dy))
+        self.pending += 1
+
+    def mouse_button(self, button, pressed):
+        event = self.X.ButtonPress if pressed else self.X.ButtonRelease
+        self.fake_input(self.display, event, X_BUTTONS.get(button, 1))
+        self.pending += 1
+
+    def scroll(self, dx, dy):
+        self.scroll_rest.add(dx * self.scroll_scale, dy * self.scroll_scale)
+        steps_x, steps_y = self.scroll_rest.take()
+        # X11: 4/5 = hoch/runter, 6/7 = links/rechts, je Klick Drücken + Loslassen
+        for count, positive, negative in ((steps_y, 4, 5), (steps_x, 7, 6)):
+            button = positive if count > 0 else negative
+            for _ in range(abs(count)):
+                self.fake_input(self.display, self.X.ButtonPress, button)
+                self.fake_input(self.display, self.X.ButtonRelease, button)
+                self.pending += 2
+
+    def _keycode(self, keysym):
+        entry = self.keycodes.get(keysym)
+        if entry is None:
+            entry = next(((kc, index == 1) for kc, index in self.display.keysym_to_keycodes(keysym)
+                          if index in (0, 1)), None)
+            if entry is None:
+                entry = (self._remap(keysym), False)
+            else:
+                self.keycodes[keysym] = entry
+        return entry
+
+    def _remap(self, keysym):
+        """Zeichen ohne Taste im aktuellen Layout auf einen freien Keycode legen (wie xdotool)"""
+        if self.spare_keycode is None:
+            first = self.display.display.info.min_keycode
+            count = self.display.display.info.max_keycode - first + 1
+            mapping = self.display.get_keyboard_mapping(first, count)
+            self.spare_keycode = next((first + i for i in range(count - 1, -1, -1)
+                                       if not any(mapping[i])), 0)
+            if not self.spare_keycode:
+                raise RuntimeError("Kein freier Keycode für Sonderzeichen")
+        self.display.change_keyboard_mapping(self.spare_keycode, [(keysym, keysym)])
+        self.display.sync()
+        return self.spare_keycode
+
+    def key(self, code, pressed):
+        keysym = code_to_keysym(code)
+        if keysym is None:
+            return
+        keycode, needs_shift = self._keycode(keysym)
+        if keysym in X_SHIFT_KEYSYMS:
+            self.shift_held = max(0, self.shift_held + (1 if pressed else -1))
+        # Großbuchstaben usw. ohne gehaltenes Shift (z.B. Caps Lock beim Server): Shift ergänzen
+        add_shift = pressed and needs_shift and not self.shift_held
+        if add_shift:
+            self.fake_input(self.display, self.X.KeyPress, self._keycode(0xFFE1)[0])
+        self.fake_input(self.display, self.X.KeyPress if pressed else self.X.KeyRelease, keycode)
+        if add_shift:
+            self.fake_input(self.display, self.X.KeyRelease, self._keycode(0xFFE1)[0])
+        self.pending += 1
+
+    def flush(self):
+        if self.pending:
+            self.display.flush()
+            self.pending = 0
+
+    def close(self):
+        self.display.close()
+
+
+# ---------- uinput ----------
+
+EV_SYN, EV_KEY, EV_REL, EV_ABS = 0x00, 0x01, 0x02, 0x03
+SYN_REPORT = 0
+REL_X, REL_Y, REL_HWHEEL, REL_WHEEL = 0x00, 0x01, 0x06, 0x08
+REL_WHEEL_HI_RES, REL_HWHEEL_HI_RES = 0x0B, 0x0C
+ABS_X, ABS_Y = 0x00, 0x01
+BTN_LEFT, BTN_RIGHT, BTN_MIDDLE = 0x110, 0x111, 0x112
+BUS_VIRTUAL = 0x06
+ABS_MAX = 32767
+
+# ioctl-Nummern aus linux/uinput.h
+UI_DEV_CREATE = 0x5501
+UI_DEV_DESTROY = 0x5502
+UI_DEV_SETUP = 0x405C5503
+UI_ABS_SETUP = 0x401C5504
+UI_SET_EVBIT = 0x40045564
+UI_SET_KEYBIT = 0x40045565
+UI_SET_RELBIT = 0x40045566
+UI_SET_ABSBIT = 0x40045567
+
+INPUT_EVENT = struct.Struct('llHHi')        # struct input_event (timeval, type, code, value)
+UINPUT_SETUP = struct.Struct('HHHH80sI')    # struct uinput_setup
+UINPUT_ABS_SETUP = struct.Struct('HHiiiiii')  # struct uinput_abs_setup (code, Padding, absinfo)
+
+UINPUT_BUTTONS = {'left': BTN_LEFT, 'right': BTN_RIGHT, 'middle': BTN_MIDDLE}
+
+# Sondertasten → Linux-Keycode (linux/input-event-codes.h)
+UINPUT_SPECIAL = {
+    'alt': 56, 'alt_l': 56, 'alt_r': 100, 'alt_gr': 100,
+    'backspace': 14, 'caps_lock': 58,
+    'cmd': 125, 'cmd_l': 125, 'cmd_r': 126,
+    'ctrl': 29, 'ctrl_l': 29, 'ctrl_r': 97,
+    'delete': 111, 'down': 108, 'end': 107, 'enter': 28, 'esc': 1,
+    **{f'f{n}': 58 + n for n in range(1, 11)}, 'f11': 87, 'f12': 88,
+    **{f'f{n}': 170 + n for n in range(13, 25)},
+    'home': 102, 'left': 105, 'page_down': 109, 'page_up': 104, 'right': 106,
+    'shift': 42, 'shift_l': 42, 'shift_r': 54,
+    'space': 57, 'tab': 15, 'up': 103,
+    'media_play_pause': 164, 'media_volume_mute': 113, 'media_volume_down': 114,
+    'media_volume_up': 115, 'media_previous': 165, 'media_next': 163,
+    'media_stop': 166, 'media_eject': 161,
+    'insert': 110, 'menu': 127, 'num_lock': 69, 'pause': 119,
+    'print_screen': 99, 'scroll_lock': 70,
+}
+
+
+def _us_layout():
+    """Zeichen → Linux-Keycode nach US-Layout (Shift schickt der Server als eigene Taste)"""
+    table = {}
+    rows = ((16, 'qwertyuiop'), (30, 'asdfghjkl'), (44, 'zxcvbnm'))
+    for first, letters in rows:
+        for i, char in enumerate(letters):
+            table[ord(char)] = table[ord(char.upper())] = first + i
+    for i, (plain, shifted) in enumerate(zip('1234567890', '!@#$%^&*()')):
+        table[ord(plain)] = table[ord(shifted)] = 2 + i
+    for keycode, chars in ((12, '-_'), (13, '=+'), (26, '[{'), (27, ']}'), (43, '\\|'),
+                           (39, ';:'), (40, '\'"'), (41, '`~'), (51, ',<'), (52, '.>'), (53, '/?'),
+                           (57, ' ')):
+        for char in chars:
+            table[ord(char)] = keycode
+    for name, keycode in UINPUT_SPECIAL.items():
+        table[NAME_TO_CODE[name]] = keycode
+    return table
+
+
+UINPUT_KEYS = _us_layout()
+
+
+class UInputInjector(InjectionBackend):
+    """Virtuelle Maus/Tastatur (relativ) und Tablet (absolut) über /dev/uinput"""
+
+    def __init__(self, path='/dev/uinput', screen=None, scroll_scale=SCROLL_SCALE):
+        import fcntl
+        self.ioctl = fcntl.ioctl
+        self.size = screen or native_screen_size()
+        if self.size is None:
+            raise RuntimeError("Bildschirmgröße unbekannt (für absolute Positionen nötig)")
+        self.buffers = {}
+        self.pointer = self._create(path, 'KVM virtual pointer', relative=True)
+        try:
+            self.tablet = self._create(path, 'KVM virtual tablet', relative=False)
+        except Exception:
+            self._destroy(self.pointer)
+            raise
+        self.hires = ScrollAccumulator(1 / 120)
+        self.detents = ScrollAccumulator(1.0)
+        self.scroll_scale = scroll_scale
+        self.fallback = None  # pynput für Zeichen ohne Taste, erst bei Bedarf
+
+    def _create(self, path, name, relative):
+        fd = os.open(path, os.O_WRONLY | os.O_NONBLOCK)
+        try:
+            for button in UINPUT_BUTTONS.values():
+                self.ioctl(fd, UI_SET_KEYBIT, button)
+            self.ioctl(fd, UI_SET_EVBIT, EV_KEY)
+            if relative:
+                # Maus und Tastatur in einem Gerät, wie ydotool
+                for keycode in set(UINPUT_KEYS.values()):
+                    self.ioctl(fd, UI_SET_KEYBIT, keycode)
+                self.ioctl(fd, UI_SET_EVBIT, EV_REL)
+                for axis in (REL_X, REL_Y, REL_WHEEL, REL_HWHEEL, REL_WHEEL_HI_RES, REL_HWHEEL_HI_RES):
+                    self.ioctl(fd, UI_SET_RELBIT, axis)
+            else:
+                # Absolutes Zeigegerät wie das USB-Tablet von QEMU
+                self.ioctl(fd, UI_SET_EVBIT, EV_ABS)
+                for axis in (ABS_X, ABS_Y):
+                    self.ioctl(fd, UI_SET_ABSBIT, axis)
+                    self.ioctl(fd, UI_ABS_SETUP, UINPUT_ABS_SETUP.pack(axis, 0, 0, 0, ABS_MAX, 0, 0, 0))
+            setup = UINPUT_SETUP.pack(BUS_VIRTUAL, 0x4B56, 0x0001 if relative else 0x0002, 1,
+                                      name.encode('ascii'), 0)
+            self.ioctl(fd, UI_DEV_SETUP, setup)
+            self.ioctl(fd, UI_DEV_CREATE)
+        except Exception:
+            os.close(fd)
+            raise
+        self.buffers[fd] = bytearray()
+        return fd
+
+    def _destroy(self, fd):
+        try:
+            self.ioctl(fd, UI_DEV_DESTROY)
+        finally:
+            os.close(fd)
+
+    def _report(self, fd, *events):
+        """Mehrere Achsen/Tasten als ein Zustand (ein SYN_REPORT)"""
+        buffer = self.buffers[fd]
+        for ev_type, code, value in events:
+            buffer += INPUT_EVENT.pack(0, 0, ev_type, code, value)
+        buffer += INPUT_EVENT.pack(0, 0, EV_SYN, SYN_REPORT, 0)
+
+    def screen_size(self):
+        return self.size
+
+    def move_to(self, x, y):
+        width, height = self.size
+        ax = round(min(max(x, 0), width - 1) * ABS_MAX / max(1, width - 1))
+        ay = round(min(max(y, 0), height - 1) * ABS_MAX / max(1, height - 1))
+        self._report(self.tablet, (EV_ABS, ABS_X, ax), (EV_ABS, ABS_Y, ay))
+
+    def move_rel(self, dx, dy):
+        self._report(self.pointer, (EV_REL, REL_X, int(dx)), (EV_REL, REL_Y, int(dy)))
+
+    def mouse_button(self, button, pressed):
+        self._report(self.pointer, (EV_KEY, UINPUT_BUTTONS.get(button, BTN_LEFT), 1 if pressed else 0))
+
+    def scroll(self, dx, dy):
+        # Hochauflösend in 1/120 Raststufen; ganze Raststufen zusätzlich für ältere Programme
+        dx, dy = dx * self.scroll_scale, dy * self.scroll_scale
+        self.hires.add(dx, dy)
+        self.detents.add(dx, dy)
+        hires_x, hires_y = self.hires.take()
+        steps_x, steps_y = self.detents.take()
+        events = []
+        if hires_y:
+            events.append((EV_REL, REL_WHEEL_HI_RES, round(hires_y * 120)))
+        if hires_x:
+            events.append((EV_REL, REL_HWHEEL_HI_RES, round(hires_x * 120)))
+        if steps_y:
+            events.append((EV_REL, REL_WHEEL, steps_y))
+        if steps_x:
+            events.append((EV_REL, REL_HWHEEL, steps_x))
+        if events:
+            self._report(self.pointer, *events)
+
+    def key(self, code, pressed):
+        keycode = UINPUT_KEYS.get(code)
+        if keycode is not None:
+            self._report(self.pointer, (EV_KEY, keycode, 1 if pressed else 0))
+            return
+        # Zeichen ohne Taste im US-Layout (Umlaute usw.): über pynput tippen
+        if self.fallback is None:
+            from backends import PyAutoGUIInjector
+            self.fallback = PyAutoGUIInjector(self.scroll_scale)
+        self.fallback.key(code, pressed)
+
+    def flush(self):
+        for fd, buffer in self.buffers.items():
+            if buffer:
+                os.write(fd, buffer)
+                buffer.clear()
+
+    def close(self):
+        self.flush()
+        for fd in list(self.buffers):
+            self._destroy(fd)
+        self.buffers.clear()
+
+
+# ---------- Benchmark ----------
+
+def start_xvfb(display=':97', size='1920x1080x24', timeout=5.0):
+    """Xvfb starten und warten, bis es Verbindungen annimmt. Gibt den Prozess zurück."""
+    import subprocess
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', size, '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    from Xlib import display as xdisplay
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            xdisplay.Display(display).close()
+            return process
+        except Exception:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("Xvfb ist nicht gestartet")
+
+
+def bench_backend(injector, events, batch, probes=200):
+    """(Events/s, Latenz-Kennzahlen in ms) für Mausbewegungen eines Backends
+
+    Durchsatz: events Bewegungen, flush() nach je batch Events, am Ende ein Abgleich
+    mit dem X-Server (alle Events verarbeitet). Latenz: Zeit von move_to bis der
+    X-Server das MotionNotify an eine zweite Verbindung ausliefert.
+    """
+    from Xlib import X, display
+
+    width, height = injector.screen_size()
+    watcher = display.Display()
+    watcher.screen().root.change_attributes(event_mask=X.PointerMotionMask)
+    watcher.sync()
+
+    start = time.perf_counter()
+    for i in range(events):
+        injector.move_to(i % width, (i * 7) % height)
+        if (i + 1) % batch == 0:
+            injector.flush()
+    injector.flush()
+    watcher.get_pointer_control()  # Round-Trip: alles vorher Gesendete ist verarbeitet
+    elapsed = time.perf_counter() - start
+    while watcher.pending_events():
+        watcher.next_event()
+
+    latencies = []
+    for i in range(probes):
+        x, y = 100 + i % 500, 200 + i % 300
+        sent = time.perf_counter()
+        injector.move_to(x, y)
+        injector.flush()
+        while True:
+            event = watcher.next_event()
+            if event.type == X.MotionNotify and (event.root_x, event.root_y) == (x, y):
+                break
+        latencies.append((time.perf_counter() - sent) * 1000)
+    watcher.close()
+    latencies.sort()
+    pick = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+    return events / elapsed, {'p50': pick(50), 'p99': pick(99), 'max': latencies[-1]}
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="XTest/uinput/pyautogui unter Xvfb vergleichen")
+    parser.add_argument('command', choices=['bench'])
+    parser.add_argument('--backend', action='append', choices=['xtest', 'uinput', 'pyautogui'],
+                        help="Zu messende Backends (Standard: alle verfügbaren)")
+    parser.add_argument('--events', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=16, help="Events pro flush()")
+    parser.add_argument('--probes', type=int, default=200, help="Messungen für die Latenz")
+    args = parser.parse_args()
+
+    xvfb = None
+    if not os.environ.get('DISPLAY'):
+        xvfb = start_xvfb()
+        os.environ['DISPLAY'] = ':97'
+    from backends import create_injector
+    try:
+        for name in args.backend or ['xtest', 'uinput', 'pyautogui']:
+            try:
+                injector = create_injector(name)
+            except Exception as e:
+                print(f"{name:<10} nicht verfügbar: {e}")
+                continue
+            if name == 'uinput':
+                # Xvfb liest keine Kernel-Geräte: nur der Durchsatz bis in den Kernel ist messbar
+                start = time.perf_counter()
+                for i in range(args.events):
+                    injector.move_rel(1, 0)
+                    if (i + 1) % args.batch == 0:
+                        injector.flush()
+                injector.flush()
+                rate = args.events / (time.perf_counter() - start)
+                print(f"{name:<10} {rate:10.0f} Events/s  (Latenz unter Xvfb nicht messbar)")
+            else:
+                events = args.events if name != 'pyautogui' else min(args.events, 500)
+                rate, latency = bench_backend(injector, events, args.batch, args.probes)
+                print(f"{name:<10} {rate:10.0f} Events/s  Latenz p50={latency['p50']:.3f} "
+                      f"p99={latency['p99']:.3f} max={latency['max']:.3f} ms")
+            if hasattr(injector, 'close'):
+                injector.close()
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+            xvfb.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Zeiger-Abbildung für KVM over Network - relative Bewegung und Bildschirmwechsel am Rand
+"""
+
+EDGES = ('left', 'right', 'top', 'bottom')
+
+
+class PointerMapper:
+    """Rechnet lokale Mausbewegungen in relative Deltas für den Remote-Bildschirm um
+
+    Die Deltas werden auf die Auflösung des Remote-Bildschirms skaliert; Bruchteile
+    eines Pixels werden aufsummiert statt verworfen. Zusätzlich wird die Position
+    des Remote-Cursors mitgeführt, um das Verlassen über den Rand zu erkennen.
+
+    edge: Seite des lokalen Bildschirms, an der der Remote-Bildschirm liegt
+    """
+
+    def __init__(self, local_size, remote_size, edge='right', margin=50):
+        if edge is not None and edge not in EDGES:
+            raise ValueError(f"Unbekannter Bildschirmrand: {edge}")
+        self.local_w, self.local_h = local_size
+        self.remote_w, self.remote_h = remote_size
+        self.edge = edge
+        self.margin = margin
+        self.scale_x = self.remote_w / self.local_w
+        self.scale_y = self.remote_h / self.local_h
+        self.last = None
+        self.acc_x = 0.0
+        self.acc_y = 0.0
+        self.remote_x = self.remote_w // 2
+        self.remote_y = self.remote_h // 2
+
+    # ---------- Lokaler Bildschirm ----------
+
+    @property
+    def local_center(self):
+        return self.local_w // 2, self.local_h // 2
+
+    def at_local_edge(self, x, y):
+        """Steht der lokale Cursor am Rand zum Remote-Bildschirm?"""
+        if self.edge == 'right':
+            return x >= self.local_w - 1
+        if self.edge == 'left':
+            return x <= 0
+        if self.edge == 'top':
+            return y <= 0
+        if self.edge == 'bottom':
+            return y >= self.local_h - 1
+        return False
+
+    def near_local_border(self, x, y):
+        """Nähert sich der lokale Cursor einem Rand? (dann zurück in die Mitte setzen)"""
+        m = self.margin
+        return x < m or y < m or x >= self.local_w - m or y >= self.local_h - m
+
+    def reset(self, x, y):
+        """Neue lokale Bezugsposition (z.B. nach dem Zurücksetzen des Cursors)"""
+        self.last = (x, y)
+
+    # ---------- Remote-Bildschirm ----------
+
+    def center(self):
+        """Remote-Cursor in die Mitte setzen, gibt die absolute Position zurück"""
+        self.remote_x = self.remote_w // 2
+        self.remote_y = self.remote_h // 2
+        self.acc_x = self.acc_y = 0.0
+        self.last = None
+        return self.remote_x, self.remote_y
+
+    def enter(self, x, y):
+        """Einstieg über den Rand: Remote-Cursor an den gegenüberliegenden Rand setzen"""
+        rx = min(int(x * self.scale_x), self.remote_w - 1)
+        ry = min(int(y * self.scale_y), self.remote_h - 1)
+        if self.edge == 'right':
+            rx = 0
+        elif self.edge == 'left':
+            rx = self.remote_w - 1
+        elif self.edge == 'top':
+            ry = self.remote_h - 1
+        elif self.edge == 'bottom':
+            ry = 0
+        self.remote_x, self.remote_y = rx, ry
+        self.acc_x = self.acc_y = 0.0
+        self.last = (x, y)
+        return rx, ry
+
+    def exit_point(self):
+        """Lokale Position beim Verlassen des Remote-Bildschirms (knapp neben dem Rand)"""
+        x = min(int(self.remote_x / self.scale_x), self.local_w - 1)
+        y = min(int(self.remote_y / self.scale_y), self.local_h - 1)
+        if self.edge == 'right':
+            x = self.local_w - 2
+        elif self.edge == 'left':
+            x = 1
+        elif self.edge == 'top':
+            y = 1
+        elif self.edge == 'bottom':
+            y = self.local_h - 2
+        return x, y
+
+    def move(self, x, y):
+        """Lokale Position verarbeiten
+
+        Gibt (dx, dy) in Remote-Pixeln zurück - (0, 0) wenn noch kein ganzer Pixel
+        zusammengekommen ist - oder None, wenn der Cursor den Remote-Bildschirm
+        über den Rand zurück zum lokalen Bildschirm verlässt.
+        """
+        if self.last is None:
+            self.last = (x, y)
+            return 0, 0
+        last_x, last_y = self.last
+        self.last = (x, y)
+
+        fx = (x - last_x) * self.scale_x + self.acc_x
+        fy = (y - last_y) * self.scale_y + self.acc_y
+        ix = int(fx)
+        iy = int(fy)
+        self.acc_x = fx - ix
+        self.acc_y = fy - iy
+
+        new_x = self.remote_x + ix
+        new_y = self.remote_y + iy
+        if ((self.edge == 'right' and new_x < 0)
+                or (self.edge == 'left' and new_x > self.remote_w - 1)
+                or (self.edge == 'top' and new_y > self.remote_h - 1)
+                or (self.edge == 'bottom' and new_y < 0)):
+            return None
+
+        # Wie das Betriebssystem am Bildschirmrand begrenzen, damit Position und Remote-Cursor übereinstimmen
+        new_x = min(max(new_x, 0), self.remote_w - 1)
+        new_y = min(max(new_y, 0), self.remote_h - 1)
+        dx = new_x - self.remote_x
+        dy = new_y - self.remote_y
+        self.remote_x, self.remote_y = new_x, new_y
+        return dx, dy
+
+
+class ScrollAccumulator:
+    """Summiert Scroll-Deltas beider Achsen und gibt nur ganze Schritte aus
+
+    Der Rest unterhalb eines Schritts bleibt für das nächste Mal stehen, so gehen
+    die kleinen Deltas von Trackpads nicht verloren.
+    step: kleinste darstellbare Einheit (1 = Raststufe, 1/120 = WHEEL_DELTA)
+    """
+
+    def __init__(self, step=1.0):
+        self.step = step
+        self.x = 0.0
+        self.y = 0.0
+
+    def add(self, dx, dy):
+        self.x += dx
+        self.y += dy
+
+    def _whole(self, value):
+        # Kleiner Zuschlag gegen Rundungsfehler (0.1 * 10 = 0.9999...)
+        steps = int(abs(value) / self.step + 1e-9)
+        # Bei ganzen Raststufen als int (pynput zählt unter X11 Klicks)
+        whole = steps if self.step == 1 else steps * self.step
+        return whole if value >= 0 else -whole
+
+    def take(self):
+        """Ganze Schritte (dx, dy) entnehmen, (0, 0) wenn noch keiner zusammengekommen ist"""
+        dx = self._whole(self.x)
+        dy = self._whole(self.y)
+        self.x -= dx
+        self.y -= dy
+        return dx, dy
+
+    def reset(self):
+        self.x = self.y = 0.0
+
+
+def parse_layout(spec):
+    """Bildschirm-Anordnung 'right=laptop,left=desktop' → {'laptop': 'right', 'desktop': 'left'}
+
+    Jeder Rand des lokalen Bildschirms kann zu höchstens einem Host führen.
+    """
+    layout = {}
+    edges = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        edge, sep, name = part.partition('=')
+        edge, name = edge.strip(), name.strip()
+        if not sep or not name:
+            raise ValueError(f"Ungültiger Eintrag in der Anordnung: '{part}' (erwartet Rand=Host)")
+        if edge not in EDGES:
+            raise ValueError(f"Unbekannter Bildschirmrand: {edge}")
+        if edge in edges:
+            raise ValueError(f"Rand '{edge}' ist mehrfach belegt")
+        edges.add(edge)
+        layout[name] = edge
+    return layout
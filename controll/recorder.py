@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Aufzeichnung und Wiedergabe von KVM-Sitzungen
+
+Binäres Log, nur anhängend:
+    Kopf:      b'KVMR' + Versions-Byte
+    Eintrag:   Typ (1 Byte) + Abstand zum vorigen Eintrag in µs (uint32, monotone Uhr) + Nutzdaten
+
+Verwendung:
+    python server.py --record sitzung.kvmlog            # Server zeichnet erfasste Events auf
+    python server.py --replay sitzung.kvmlog --speed 2  # ... und spielt sie statt der Hardware ab
+    python client.py --record empfangen.kvmlog          # Client zeichnet simulierte Events auf
+    python recorder.py info sitzung.kvmlog
+    python recorder.py dump sitzung.kvmlog              # als JSON-Lines ausgeben
+"""
+import json
+import struct
+import sys
+import threading
+import time
+
+from backends import SyntheticCapture, InjectionBackend
+
+MAGIC = b'KVMR'
+VERSION = 1
+
+HEADER = struct.Struct('<BI')
+
+# Typ → (Name, Nutzdaten-Format, Felder)
+RECORD_TYPES = {
+    1: ('mouse_move', struct.Struct('<ii'), ('x', 'y')),
+    2: ('mouse_delta', struct.Struct('<ii'), ('dx', 'dy')),
+    3: ('mouse_click', struct.Struct('<iiBB'), ('x', 'y', 'button', 'pressed')),
+    4: ('mouse_scroll', struct.Struct('<iiff'), ('x', 'y', 'dx', 'dy')),
+    5: ('key_press', struct.Struct('<I'), ('key',)),
+    6: ('key_release', struct.Struct('<I'), ('key',)),
+}
+TYPE_IDS = {name: type_id for type_id, (name, _, _) in RECORD_TYPES.items()}
+
+BUTTONS = ('unknown', 'left', 'right', 'middle', 'x1', 'x2')
+BUTTON_IDS = {name: i for i, name in enumerate(BUTTONS)}
+
+
+class EventLogWriter:
+    """Schreibt Events gepuffert in ein binäres Log
+
+    Thread-sicher, da Maus- und Tastatur-Listener in eigenen Threads laufen.
+    Pro Event fällt nur ein struct.pack und ein Schreiben in den Puffer an.
+    """
+
+    def __init__(self, path, buffer_size=1 << 16):
+        self.path = path
+        self.file = open(path, 'wb', buffering=buffer_size)
+        self.file.write(MAGIC + bytes([VERSION]))
+        self.lock = threading.Lock()
+        self.last = time.monotonic_ns()
+        self.count = 0
+
+    def write(self, event_type, *values):
+        type_id = TYPE_IDS[event_type]
+        payload = RECORD_TYPES[type_id][1]
+        with self.lock:
+            now = time.monotonic_ns()
+            delta_us = min((now - self.last) // 1000, 0xFFFFFFFF)
+            # Nur ganze µs weiterzählen, damit sich Rundungen nicht aufsummieren
+            self.last += delta_us * 1000
+            self.file.write(HEADER.pack(type_id, delta_us) + payload.pack(*values))
+            self.count += 1
+
+    def mouse_move(self, x, y):
+        self.write('mouse_move', int(x), int(y))
+
+    def mouse_delta(self, dx, dy):
+        self.write('mouse_delta', int(dx), int(dy))
+
+    def mouse_click(self, x, y, button, pressed):
+        self.write('mouse_click', int(x), int(y), BUTTON_IDS.get(button, 0), 1 if pressed else 0)
+
+    def mouse_scroll(self, x, y, dx, dy):
+        self.write('mouse_scroll', int(x), int(y), dx, dy)
+
+    def key(self, code, pressed):
+        self.write('key_press' if pressed else 'key_release', code)
+
+    def flush(self):
+        with self.lock:
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def read_event_log(path):
+    """Liefert (Zeit in Sekunden seit Beginn, Event-Dictionary) für jeden Eintrag"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC:
+        raise ValueError(f"{path} ist kein KVM-Event-Log")
+    if data[4] != VERSION:
+        raise ValueError(f"Nicht unterstützte Log-Version: {data[4]}")
+
+    offset = 5
+    elapsed_us = 0
+    while offset + HEADER.size <= len(data):
+        type_id, delta_us = HEADER.unpack_from(data, offset)
+        offset += HEADER.size
+        record = RECORD_TYPES.get(type_id)
+        if record is None:
+            raise ValueError(f"Unbekannter Eintragstyp {type_id} bei Byte {offset - HEADER.size}")
+        name, payload, fields = record
+        if offset + payload.size > len(data):
+            break  # Abgeschnittener letzter Eintrag (z.B. Absturz beim Schreiben)
+        values = payload.unpack_from(data, offset)
+        offset += payload.size
+        elapsed_us += delta_us
+
+        event = dict(zip(fields, values))
+        event['type'] = name
+        if name == 'mouse_click':
+            event['button'] = BUTTONS[event['button']] if event['button'] < len(BUTTONS) else 'unknown'
+            event['pressed'] = bool(event['pressed'])
+        yield elapsed_us / 1e6, event
+
+
+def is_event_log(path):
+    with open(path, 'rb') as f:
+        return f.read(4) == MAGIC
+
+
+class ReplayCapture(SyntheticCapture):
+    """Spielt ein Event-Log als Eingabe-Quelle für den Server ab
+
+    speed: 1.0 = Originaltempo, 2.0 = doppelt so schnell, 0 = so schnell wie möglich
+    """
+
+    def __init__(self, path, speed=1.0, autostart=False, screen=(1920, 1080)):
+        super().__init__(events=read_event_log(path), rate=0, autostart=autostart, screen=screen)
+        self.path = path
+        self.speed = speed
+
+    def client_connected(self):
+        # Wiedergabe erst starten, wenn jemand zuschaut
+        self.play()
+
+    def _run(self, sink):
+        self._go.wait()
+        self.started_at = time.perf_counter()
+        try:
+            for offset, event in self.events:
+                if self._stop.is_set():
+                    break
+                if self.speed:
+                    wait = self.started_at + offset / self.speed - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                if self._dispatch(sink, event):
+                    self.emitted += 1
+        finally:
+            self.finished_at = time.perf_counter()
+            self.done.set()
+
+
+class LogInjector(InjectionBackend):
+    """Client-seitige Aufzeichnung: schreibt simulierte Events ins Log
+
+    Mit inner wird zusätzlich an ein echtes Backend weitergereicht.
+    """
+
+    def __init__(self, path, inner=None):
+        self.writer = EventLogWriter(path)
+        self.inner = inner
+
+    def screen_size(self):
+        return self.inner.screen_size() if self.inner else (1920, 1080)
+
+    def move_to(self, x, y):
+        self.writer.mouse_move(x, y)
+        if self.inner:
+            self.inner.move_to(x, y)
+
+    def move_rel(self, dx, dy):
+        self.writer.mouse_delta(dx, dy)
+        if self.inner:
+            self.inner.move_rel(dx, dy)
+
+    def mouse_button(self, button, pressed):
+        self.writer.mouse_click(0, 0, button, pressed)
+        if self.inner:
+            self.inner.mouse_button(button, pressed)
+
+    def scroll(self, dx, dy):
+        self.writer.mouse_scroll(0, 0, dx, dy)
+        if self.inner:
+            self.inner.scroll(dx, dy)
+
+    def key(self, code, pressed):
+        self.writer.key(code, pressed)
+        if self.inner:
+            self.inner.key(code, pressed)
+
+    def flush(self):
+        if self.inner:
+            self.inner.flush()
+
+    def close(self):
+        self.writer.close()
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('info', 'dump'):
+        print("Verwendung:\n  python recorder.py info LOG\n  python recorder.py dump LOG > events.jsonl")
+        sys.exit(1)
+
+    command, path = sys.argv[1], sys.argv[2]
+    if command == 'dump':
+        for _, event in read_event_log(path):
+            print(json.dumps(event))
+        return
+
+    counts = {}
+    duration = 0.0
+    for duration, event in read_event_log(path):
+        counts[event['type']] = counts.get(event['type'], 0) + 1
+    total = sum(counts.values())
+    print(f"{path}: {total} Events in {duration:.2f} s")
+    for name, n in sorted(counts.items()):
+        print(f"  {name:<12} {n}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Verschlüsselter, authentifizierter Kanal zwischen Server und Client
+
+Verschlüsselung: TLS 1.3 (wss://) mit dem ssl-Modul der Standardbibliothek.
+Ein selbst signiertes Zertifikat genügt - der Client muss ihm nicht vertrauen,
+wenn beide Seiten einen gemeinsamen Schlüssel (PSK) haben:
+
+    Server → Client:  auth_challenge (Zufallszahl)
+    Client → Server:  auth (eigene Zufallszahl + HMAC-SHA256 über beide Zahlen und das Zertifikat)
+    Server → Client:  auth_ok (HMAC-SHA256 als Gegenbeweis)
+
+In den HMAC geht der SHA-256 des Server-Zertifikats ein, so wie es der Client
+sieht (Channel Binding). Ein Angreifer in der Mitte mit eigenem Zertifikat
+kann den Beweis deshalb nicht weiterreichen. Vor der Authentifizierung
+verarbeitet keine Seite Events. Die Challenge schickt der Server direkt nach
+dem Verbindungsaufbau; der Client sendet Beweis und hello ohne zu warten
+hinterher - das kostet keinen zusätzlichen Round-Trip.
+
+Wiederverbinden: ResumingContext merkt sich die TLS-Sitzung (Session Ticket),
+ein Reconnect spart so den vollständigen Handshake (Schlüsseltausch, Zertifikat).
+
+Zertifikat erzeugen und Overhead messen:
+    python security.py cert ~/.kvm                 # cert.pem + key.pem (openssl)
+    python security.py bench                       # Handshake und Nachrichten: ws vs. wss
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import ssl
+import time
+from pathlib import Path
+
+AUTH_NAME = 'psk1'
+
+# Close-Code bei fehlgeschlagener Authentifizierung (4000-4999: anwendungsspezifisch)
+CLOSE_AUTH_FAILED = 4401
+
+NONCE_BYTES = 16
+
+
+class AuthenticationError(Exception):
+    """Gegenseite konnte sich nicht mit dem gemeinsamen Schlüssel ausweisen"""
+
+
+# ---------- Zertifikate ----------
+
+def generate_certificate(cert_dir, common_name='kvm', days=825):
+    """Selbst signiertes Zertifikat (P-256) mit dem openssl-Kommando erzeugen
+
+    Gibt (cert.pem, key.pem) zurück; vorhandene Dateien werden weiterverwendet.
+    """
+    cert_dir = Path(cert_dir).expanduser()
+    cert_path = cert_dir / 'cert.pem'
+    key_path = cert_dir / 'key.pem'
+    if cert_path.exists() and key_path.exists():
+        return cert_path, key_path
+    import subprocess
+    cert_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        subprocess.run([
+            'openssl', 'req', '-x509', '-newkey', 'ec', '-pkeyopt', 'ec_paramgen_curve:P-256',
+            '-nodes', '-keyout', str(key_path), '-out', str(cert_path), '-days', str(days),
+            '-subj', f'/CN={common_name}',
+            '-addext', f'subjectAltName=DNS:{common_name},DNS:localhost,IP:127.0.0.1'
+        ], check=True, capture_output=True)
+    except FileNotFoundError:
+        raise RuntimeError("openssl nicht gefunden - Zertifikat bitte selbst erzeugen (--tls-cert/--tls-key)")
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Zertifikat konnte nicht erzeugt werden: {e.stderr.decode(errors='replace').strip()}")
+    os.chmod(key_path, 0o600)
+    return cert_path, key_path
+
+
+def fingerprint(der):
+    """SHA-256 eines Zertifikats (DER) als Hex"""
+    return hashlib.sha256(der).hexdigest()
+
+
+def certificate_der(cert_path):
+    """Erstes Zertifikat einer PEM-Datei als DER"""
+    pem = Path(cert_path).read_text()
+    end = pem.index('-----END CERTIFICATE-----') + len('-----END CERTIFICATE-----')
+    return ssl.PEM_cert_to_DER_cert(pem[pem.index('-----BEGIN CERTIFICATE-----'):end])
+
+
+# ---------- TLS ----------
+
+def server_context(cert_path, key_path):
+    """TLS-Kontext für den Server (nur TLS 1.3)"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.minimum_version = ssl.TLSVersion.TLSv1_3
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+class ResumingContext(ssl.SSLContext):
+    """Client-Kontext, der die letzte TLS-Sitzung für den nächsten Verbindungsaufbau merkt
+
+    asyncio (und damit websockets) reicht keine Sitzung an wrap_bio durch - deshalb
+    setzt der Kontext sie selbst ein. remember() nach dem Verbindungsaufbau aufrufen.
+    """
+    session = None
+    ssl_object = None
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        ssl_object = super().wrap_bio(incoming, outgoing, server_side=server_side,
+                                      server_hostname=server_hostname, session=session or self.session)
+        self.ssl_object = ssl_object
+        return ssl_object
+
+    def remember(self, ssl_object):
+        """Sitzung merken (bei TLS 1.3 kommt das Ticket erst nach dem Handshake)"""
+        if ssl_object is not None and ssl_object.session is not None:
+            self.session = ssl_object.session
+
+    def forget(self):
+        self.session = None
+
+
+def client_context(cafile=None):
+    """TLS-Kontext für den Client
+
+    Mit cafile wird das Server-Zertifikat geprüft. Ohne cafile wird jedes Zertifikat
+    akzeptiert - dann schützt erst der PSK (Channel Binding) vor einem Angreifer in der Mitte.
+    """
+    context = ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.minimum_version = ssl.TLSVersion.TLSv1_3
+    if cafile:
+        context.load_verify_locations(cafile)
+        # Selbst signierte Zertifikate passen meist nicht zum Hostnamen, vertraut wird der Datei
+        context.check_hostname = False
+    else:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def ssl_object(websocket):
+    """SSLObject einer WebSocket-Verbindung (None ohne TLS)"""
+    transport = getattr(websocket, 'transport', None)
+    return transport.get_extra_info('ssl_object') if transport is not None else None
+
+
+def peer_binding(websocket):
+    """Channel Binding auf der Client-Seite: SHA-256 des Zertifikats, das der Server vorzeigt"""
+    obj = ssl_object(websocket)
+    if obj is None:
+        return b''
+    der = obj.getpeercert(binary_form=True)
+    return hashlib.sha256(der).digest() if der else b''
+
+
+# ---------- Gemeinsamer Schlüssel ----------
+
+def load_psk(value):
+    """PSK aus einer Datei (Pfad) oder direkt als Text"""
+    path = Path(value).expanduser()
+    if path.is_file():
+        value = path.read_text().strip()
+    if len(value) < 16:
+        raise ValueError("Der gemeinsame Schlüssel muss mindestens 16 Zeichen lang sein")
+    return value.encode('utf-8')
+
+
+def new_psk():
+    return secrets.token_urlsafe(32)
+
+
+def new_nonce():
+    return secrets.token_bytes(NONCE_BYTES)
+
+
+def proof(psk, role, server_nonce, client_nonce, binding):
+    """HMAC-SHA256 über Rolle, beide Zufallszahlen und das Zertifikat"""
+    message = b'|'.join((AUTH_NAME.encode(), role, server_nonce, client_nonce, binding))
+    return hmac.new(psk, message, hashlib.sha256).hexdigest()
+
+
+def check_proof(psk, role, server_nonce, client_nonce, binding, received):
+    expected = proof(psk, role, server_nonce, client_nonce, binding)
+    return isinstance(received, str) and hmac.compare_digest(expected, received)
+
+
+# ---------- Benchmark ----------
+
+def record_cost(cert_path, key_path, count=100000, size=12):
+    """Reine Krypto-Kosten pro Nachricht: Verschlüsseln + Entschlüsseln eines TLS-Records
+
+    Beide Seiten laufen über Memory-BIOs im selben Thread, ohne Netzwerk und Event-Loop.
+    Gibt Mikrosekunden pro Nachricht zurück.
+    """
+    server = server_context(cert_path, key_path)
+    client = client_context(cert_path)
+    server_in, server_out, client_in, client_out = (ssl.MemoryBIO() for _ in range(4))
+    s = server.wrap_bio(server_in, server_out, server_side=True)
+    c = client.wrap_bio(client_in, client_out)
+
+    for _ in range(10):
+        for obj in (c, s):
+            try:
+                obj.do_handshake()
+            except ssl.SSLWantReadError:
+                pass
+        client_in.write(server_out.read())
+        server_in.write(client_out.read())
+    payload = bytes(size)
+    start = time.perf_counter()
+    for _ in range(count):
+        s.write(payload)
+        client_in.write(server_out.read())
+        c.read(size)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def _bench(count, rounds, cert_dir, port):
+    import websockets
+
+    cert_path, key_path = generate_certificate(cert_dir)
+
+    async def echo(websocket):
+        async for message in websocket:
+            await websocket.send(message)
+
+    frame = bytes(12)   # Typische Größe eines delta-kodierten Events
+    results = {}
+    for label, tls in (('ws', False), ('wss', True)):
+        server_ssl = server_context(cert_path, key_path) if tls else None
+        async with websockets.serve(echo, '127.0.0.1', port, ssl=server_ssl, compression=None):
+            context = client_context(cert_path) if tls else None
+            uri = f"{'wss' if tls else 'ws'}://127.0.0.1:{port}"
+            full, resumed, reused = [], [], 0
+            for i in range(rounds):
+                if context is not None and i == 0:
+                    context.forget()
+                start = time.perf_counter()
+                async with websockets.connect(uri, ssl=context, compression=None) as websocket:
+                    elapsed = time.perf_counter() - start
+                    await websocket.send(frame)
+                    await websocket.recv()
+                    obj = ssl_object(websocket)
+                    if obj is not None and obj.session_reused:
+                        reused += 1
+                        resumed.append(elapsed)
+                    else:
+                        full.append(elapsed)
+                    if context is not None:
+                        context.remember(obj)
+
+                    if i == 0:
+                        # Nachrichten-Durchsatz: Ping-Pong, jeweils eine Nachricht unterwegs
+                        start = time.perf_counter()
+                        for _ in range(count):
+                            await websocket.send(frame)
+                            await websocket.recv()
+                        round_trip = (time.perf_counter() - start) / count
+            results[label] = {
+                'handshake_ms': sorted(full)[len(full) // 2] * 1000 if full else None,
+                'resumed_ms': sorted(resumed)[len(resumed) // 2] * 1000 if resumed else None,
+                'resumed': reused,
+                'round_trip_us': round_trip * 1e6
+            }
+    results['wss']['record_us'] = record_cost(cert_path, key_path, count * 10)
+    return results
+
+
+def main():
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description="TLS-Zertifikat erzeugen, Verschlüsselungs-Overhead messen")
+    sub = parser.add_subparsers(dest='command', required=True)
+    cert = sub.add_parser('cert', help="Selbst signiertes Zertifikat und PSK erzeugen")
+    cert.add_argument('dir', help="Zielordner für cert.pem, key.pem und psk")
+    cert.add_argument('--name', default='kvm', help="Common Name des Zertifikats")
+    bench = sub.add_parser('bench', help="Handshake und Nachrichten-Round-Trip: ws vs. wss")
+    bench.add_argument('--count', type=int, default=5000, help="Nachrichten pro Messung")
+    bench.add_argument('--rounds', type=int, default=20, help="Verbindungsaufbauten pro Messung")
+    bench.add_argument('--port', type=int, default=8798)
+    args = parser.parse_args()
+
+    if args.command == 'cert':
+        cert_path, key_path = generate_certificate(args.dir, args.name)
+        psk_path = Path(args.dir).expanduser() / 'psk'
+        if not psk_path.exists():
+            psk_path.write_text(new_psk() + '\n')
+            os.chmod(psk_path, 0o600)
+        print(f"Zertifikat: {cert_path}")
+        print(f"Schlüssel:  {key_path}")
+        print(f"PSK:        {psk_path} (auf den Client kopieren)")
+        print(f"SHA-256:    {fingerprint(certificate_der(cert_path))}")
+        return
+
+    with tempfile.TemporaryDirectory() as cert_dir:
+        results = asyncio.run(_bench(args.count, args.rounds, cert_dir, args.port))
+    plain, tls = results['ws'], results['wss']
+    print(f"{'':<10} {'Handshake':>12} {'Fortgesetzt':>12} {'Round-Trip':>12}")
+    for label, r in results.items():
+        resumed = f"{r['resumed_ms']:.2f} ms" if r['resumed_ms'] is not None else '-'
+        print(f"{label:<10} {r['handshake_ms']:>9.2f} ms {resumed:>12} {r['round_trip_us']:>9.1f} µs")
+    print(f"TLS-Overhead pro Nachricht (hin und zurück): {tls['round_trip_us'] - plain['round_trip_us']:.1f} µs")
+    print(f"Krypto pro Nachricht (Record ver- und entschlüsseln): {tls['record_us']:.2f} µs")
+    print(f"Fortgesetzte TLS-Sitzungen: {tls['resumed']} von {args.rounds - 1}")
+
+
+if __name__ == "__main__":
+    main()
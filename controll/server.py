@@ -3,193 +3,931 @@
 KVM Server (Laptop A) - Fängt Tastatur/Maus Events ab und sendet sie über WebSocket
 """
 import asyncio
+import collections
+import hashlib
 import websockets
 import json
+import os
+import secrets
+import signal
 import threading
 import time
-from pynput import mouse, keyboard
-from pynput.mouse import Button
-import pyautogui
+from http import HTTPStatus
+
+from backends import PynputCapture
+from codec import CODEC_NAME, SCROLL_UNITS, EventEncoder
+from hotkeys import ChordMatcher, DEFAULT_BINDINGS, DEFER, SWALLOW, MATCH, format_chord, normalize_key
+from keymap import encode_key
+from pointer import PointerMapper, ScrollAccumulator, parse_layout
+import security
+from transport import POINTER_TYPES, PointerServerProtocol, encode_pointer
+from transfer import TransferManager, ClipboardWatcher, OutboxWatcher
+
+# Events, vor denen gesammeltes Scrollen nicht gesendet werden muss
+SCROLL_UNORDERED = ('mouse_scroll', 'mouse_move', 'mouse_delta')
 
 class KVMServer:
-    def __init__(self, host='localhost', port=8765):
+    def __init__(self, host='localhost', port=8765, capture=None, edge='right', recorder=None,
+                 udp=True, udp_port=None, clipboard=False, inbox=None, outbox=None,
+                 codec=True, deflate=True, layout=None, hotkeys=None, tls=None, psk=None):
         self.host = host
         self.port = port
         self.clients = set()
         self.capturing = False
-        self.mouse_listener = None
-        self.keyboard_listener = None
         
-        # Hotkey für das Umschalten (z.B. Ctrl+Alt+S)
-        self.switch_hotkey = {keyboard.Key.ctrl, keyboard.Key.alt, keyboard.KeyCode(char='s')}
-        self.pressed_keys = set()
+        # Mehrere Remote-Hosts: Eingaben gehen nur an den aktiven Host, nicht an alle Clients
+        self.layout = layout or {}              # Host-Name → Rand des lokalen Bildschirms
+        self.hosts = {}                         # Routing-Tabelle: Host-Name → WebSocket
+        self.client_names = {}                  # WebSocket → Host-Name
+        self.host_order = list(self.layout)     # Reihenfolge für die Hotkeys Ctrl+Alt+1..9
+        self.active = None                      # Host, der im Remote-Modus die Eingaben bekommt
+        self.routed_host = None                 # Host, an den die Sender-Loop zuletzt gesendet hat
+        
+        # Verschlüsselung und Authentifizierung (security.py): tls = (Zertifikat, Schlüssel)
+        self.ssl_context = security.server_context(*tls) if tls else None
+        self.cert_binding = hashlib.sha256(security.certificate_der(tls[0])).digest() if tls else b''
+        self.psk = psk                  # Gemeinsamer Schlüssel (bytes), None = keine Authentifizierung
+        self.auth_timeout = 5.0
+        if tls and udp:
+            # Die UDP-Datagramme wären unverschlüsselt
+            print("TLS aktiv - Mausbewegungen laufen nur über den verschlüsselten WebSocket")
+            udp = False
+        
+        # UDP-Kanal für Mausbewegungen (transport.py)
+        self.udp = udp
+        self.udp_port = udp_port or port
+        self.udp_transport = None
+        self.udp_tokens = {}        # Token → WebSocket, bis sich der Client per UDP meldet
+        self.udp_peers = {}         # WebSocket → UDP-Adresse des Clients
+        
+        # Binäre Delta-Kodierung (codec.py), ein Encoder pro Client der sie anbietet
+        self.codec = codec
+        self.encoders = {}
+        self.deflate = deflate      # permessage-deflate aushandeln
+        self.bytes_sent = 0         # Nutzdaten der gesendeten Events (WebSocket vor Deflate, UDP)
+        
+        # Zwischenablage und Dateien (transfer.py), eine TransferManager-Instanz pro Client
+        self.clipboard = ClipboardWatcher(self.share_clipboard) if clipboard else None
+        self.inbox = inbox
+        self.outbox = outbox
+        self.transfers = {}
+        
+        # Sitzungen für schnelles Wiederverbinden
+        self.session_ttl = 60.0
+        self.sessions = {}          # Token → Zeitpunkt der Trennung (None solange verbunden)
+        self.client_sessions = {}   # WebSocket → Token
+        
+        # An die Clients gesendete, noch gedrückte Tasten/Maustasten
+        self.held_keys = set()
+        self.held_buttons = set()
+        # Physische Taste → beim Drücken gesendeter Code (Erfassungs-Thread). Das Zeichen beim
+        # Loslassen hängt vom Shift-Zustand ab ('a' drücken, Shift, loslassen → 'A')
+        self.pressed_codes = {}
+        
+        # Bildschirm-Geometrie: relative Bewegung, skaliert auf den Remote-Bildschirm
+        self.edge = edge            # Rand des ersten Hosts, wenn keine Anordnung angegeben ist (None = kein Randwechsel)
+        self.local_screen = None
+        self.mappers = {}           # Host-Name → PointerMapper, sobald der Client seine Geometrie meldet
+        
+        # Scroll-Events pro Frame zusammenfassen: das erste nach einer Pause geht sofort raus,
+        # weitere werden bis zum Ende des Frames gesammelt. Reste unter 1/120 bleiben stehen.
+        self.scroll_interval = 1 / 120
+        self.scroll = ScrollAccumulator(1 / SCROLL_UNITS)
+        self.scroll_lock = threading.Lock()
+        self.scroll_pos = (0, 0)
+        self.scroll_timestamp = None    # Erfassungszeit des ältesten noch nicht gesendeten Scrolls
+        self.scroll_window = 0.0        # Frame-Ende (monotone Uhr)
+        self.scroll_timer = False
+        
+        # Eingabe-Quelle: echte Hardware oder z.B. SyntheticCapture für Tests
+        self.capture = capture if capture is not None else PynputCapture()
+        self.seq = 0
+        
+        # Optional: alle erfassten Events in ein Event-Log schreiben (recorder.EventLogWriter)
+        self.recorder = recorder
+        
+        # Übergabe der Events aus den Listener-Threads an die Event-Loop
+        self.loop = None
+        self.event_queue = None
+        
+        # Lebenszyklus: starting → running → stopping → stopped
+        self.state = 'starting'
+        self.started_at = None
+        self.stop_event = None
+        self.stop_reason = None
+        self.drain_timeout = 2.0    # Sekunden, um beim Beenden ausstehende Events noch zu senden
+        
+        # Hotkeys (hotkeys.py): Umschalten, Host wählen, Pause, alle Tasten loslassen
+        self.hotkeys = ChordMatcher(hotkeys)
+        self.deferred = collections.deque()     # Zurückgehaltene Modifier (könnten Teil eines Hotkeys sein)
+        self.paused = False
+        switch = self.hotkeys.bindings.get('switch')
+        self.switch_label = format_chord(switch) if switch else "den Hotkey"
         
         print(f"KVM Server wird gestartet auf {host}:{port}")
-        print("Hotkey zum Umschalten: Ctrl+Alt+S")
+        print(f"Hotkey zum Umschalten: {self.switch_label}")
+    
+    @property
+    def mapper(self):
+        """Zeiger-Abbildung des aktiven Hosts"""
+        return self.mappers.get(self.active)
     
-    async def register_client(self, websocket, path):
+    async def register_client(self, websocket, path=None):
         """Neuen Client registrieren"""
-        self.clients.add(websocket)
         client_info = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
+        if self.psk is not None and not await self.authenticate(websocket):
+            print(f"Authentifizierung fehlgeschlagen: {client_info}")
+            await websocket.close(security.CLOSE_AUTH_FAILED, "Authentifizierung fehlgeschlagen")
+            return
+        self.clients.add(websocket)
         print(f"Client verbunden: {client_info}")
+        self.capture.client_connected()
+        transfer = self.transfers[websocket] = TransferManager(
+            websocket,
+            inbox=self.inbox,
+            on_clipboard=self.clipboard.set if self.clipboard else None,
+            input_busy=lambda: not self.event_queue.empty()
+        )
         
         try:
-            await websocket.wait_closed()
+            async for message in websocket:
+                if isinstance(message, bytes):
+                    await transfer.handle_chunk(message)
+                    continue
+                try:
+                    data = json.loads(message)
+                except json.JSONDecodeError:
+                    print(f"Ungültiges JSON von {client_info}: {message}")
+                    continue
+                if await transfer.handle_message(data):
+                    continue
+                await self.handle_client_message(websocket, data)
+        except websockets.exceptions.ConnectionClosed:
+            pass
         finally:
-            self.clients.remove(websocket)
+            self.clients.discard(websocket)
+            self.transfers.pop(websocket).close()
+            self.encoders.pop(websocket, None)
+            name = self.client_names.pop(websocket, None)
+            if name is not None and self.hosts.get(name) is websocket:
+                del self.hosts[name]
+                self.mappers.pop(name, None)
+                if self.active == name:
+                    # Der nächste Host, der sich meldet, übernimmt (auch derselbe nach einem Reconnect)
+                    self.active = None
+            self.udp_peers.pop(websocket, None)
+            token = self.client_sessions.pop(websocket, None)
+            if token is not None:
+                self.sessions[token] = time.time()
+            for token in [t for t, ws in self.udp_tokens.items() if ws is websocket]:
+                del self.udp_tokens[token]
             print(f"Client getrennt: {client_info}")
     
+    async def authenticate(self, websocket):
+        """Challenge-Response mit dem gemeinsamen Schlüssel, bevor der Client Events bekommt"""
+        server_nonce = security.new_nonce()
+        try:
+            await websocket.send(json.dumps({
+                'type': 'auth_challenge',
+                'method': security.AUTH_NAME,
+                'nonce': server_nonce.hex()
+            }))
+            data = json.loads(await asyncio.wait_for(websocket.recv(), self.auth_timeout))
+            client_nonce = bytes.fromhex(data.get('nonce', ''))
+        except (asyncio.TimeoutError, websockets.exceptions.ConnectionClosed,
+                json.JSONDecodeError, TypeError, ValueError, AttributeError):
+            return False
+        if data.get('type') != 'auth' or len(client_nonce) != security.NONCE_BYTES:
+            return False
+        if not security.check_proof(self.psk, b'client', server_nonce, client_nonce,
+                                    self.cert_binding, data.get('proof')):
+            return False
+        # Gegenbeweis: der Client prüft, dass er mit dem richtigen Server spricht
+        try:
+            await websocket.send(json.dumps({
+                'type': 'auth_ok',
+                'proof': security.proof(self.psk, b'server', server_nonce, client_nonce, self.cert_binding)
+            }))
+        except websockets.exceptions.ConnectionClosed:
+            return False
+        return True
+    
+    async def handle_client_message(self, websocket, data):
+        """Nachricht eines Clients verarbeiten"""
+        if data.get('type') == 'ping':
+            # Uhren-Abgleich: Empfangs- und Sendezeit des Servers zurückgeben
+            received = time.time()
+            await websocket.send(json.dumps({
+                'type': 'pong',
+                't0': data.get('t0'),
+                't1': received,
+                't2': time.time()
+            }))
+        elif data.get('type') == 'hello':
+            name = self.add_host(websocket, data.get('name'))
+            if self.codec and CODEC_NAME in data.get('codecs', ()):
+                self.encoders[websocket] = EventEncoder()
+            await self.start_session(websocket, data.get('session'))
+            screen = data.get('screen')
+            if screen and self.local_screen:
+                self.mappers[name] = PointerMapper(self.local_screen, screen, edge=self.host_edge(name))
+                print(f"Bildschirm von '{name}': {screen[0]}x{screen[1]} (lokal: {self.local_screen[0]}x{self.local_screen[1]})")
+            if data.get('udp') and self.udp_transport is not None:
+                # Zweiten Kanal anbieten, der Client meldet sich mit dem Token per UDP
+                token = secrets.randbits(64)
+                self.udp_tokens[token] = websocket
+                await websocket.send(json.dumps({'type': 'udp_offer', 'port': self.udp_port, 'token': token}))
+    
+    def add_host(self, websocket, name):
+        """Client unter seinem Namen in die Routing-Tabelle eintragen"""
+        if not name:
+            # Ältere Clients melden keinen Namen
+            name = f"{websocket.remote_address[0]}:{websocket.remote_address[1]}"
+        self.hosts[name] = websocket    # Ein Reconnect ersetzt die alte Verbindung
+        self.client_names[websocket] = name
+        if name not in self.host_order:
+            self.host_order.append(name)
+        if self.active is None:
+            self.active = name
+        
+        number = self.host_order.index(name) + 1
+        edge = self.host_edge(name)
+        chord = self.hotkeys.bindings.get(f'host{number}')
+        info = [format_chord(chord)] if chord else []
+        if edge:
+            info.append(f"Rand: {edge}")
+        print(f"Host '{name}' verbunden" + (f" ({', '.join(info)})" if info else ""))
+        return name
+    
+    def host_edge(self, name):
+        """Rand des lokalen Bildschirms, über den man zu diesem Host wechselt"""
+        if self.layout:
+            return self.layout.get(name)
+        # Ohne Anordnung liegt der erste Host am Standard-Rand
+        return self.edge if self.host_order and name == self.host_order[0] else None
+    
+    async def start_session(self, websocket, token):
+        """Sitzung fortsetzen oder neu anlegen und den Tastenzustand abgleichen"""
+        now = time.time()
+        # Abgelaufene Sitzungen aufräumen
+        for old, closed in list(self.sessions.items()):
+            if closed is not None and now - closed > self.session_ttl:
+                del self.sessions[old]
+        
+        resumed = token is not None and token in self.sessions
+        if not resumed:
+            token = secrets.token_hex(16)
+        self.sessions[token] = None
+        self.client_sessions[websocket] = token
+        if resumed:
+            print("Sitzung fortgesetzt")
+        
+        # Der Client lässt alles los, was hier nicht mehr als gedrückt gilt -
+        # gedrückt sein kann nur etwas beim Host, an den zuletzt gesendet wurde
+        routed = self.client_names.get(websocket) == self.routed_host
+        await websocket.send(json.dumps({
+            'type': 'session',
+            'token': token,
+            'resumed': resumed,
+            'codec': CODEC_NAME if websocket in self.encoders else None,
+            'keys': sorted(self.held_keys) if routed else [],
+            'buttons': sorted(self.held_buttons) if routed else []
+        }))
+    
+    def register_udp_peer(self, token, addr):
+        """Registrierungs-Datagramm eines Clients (läuft in der Event-Loop)"""
+        websocket = self.udp_tokens.pop(token, None)
+        if websocket is None or websocket not in self.clients:
+            return
+        self.udp_peers[websocket] = addr
+        print(f"UDP-Kanal aktiv: {addr[0]}:{addr[1]}")
+        asyncio.create_task(websocket.send(json.dumps({'type': 'udp_ready'})))
+    
+    async def share_clipboard(self, text):
+        """Geänderte Zwischenablage an alle Clients senden"""
+        await asyncio.gather(*(t.send_clipboard(text) for t in list(self.transfers.values())),
+                             return_exceptions=True)
+    
+    async def send_file_to_clients(self, path):
+        """Datei an alle Clients senden, True wenn alle sie erhalten haben"""
+        if not self.transfers:
+            return False
+        results = await asyncio.gather(*(t.send_file(path) for t in list(self.transfers.values())),
+                                       return_exceptions=True)
+        return all(result is True for result in results)
+    
+    def emit(self, message):
+        """Event aus einem Listener-Thread an die Event-Loop übergeben"""
+        if self.loop is not None:
+            if self.scroll_timestamp is not None and message['type'] not in SCROLL_UNORDERED:
+                # Gesammeltes Scrollen vor Klicks und Tasten senden, damit die Reihenfolge stimmt
+                self.flush_scroll()
+            # Ziel-Host beim Erfassen festhalten, ein Wechsel gilt erst für spätere Events
+            message.setdefault('host', self.active)
+            self.loop.call_soon_threadsafe(self.event_queue.put_nowait, message)
+    
+    async def sender_loop(self):
+        """Events in Erfassungsreihenfolge an die Clients senden"""
+        while True:
+            message = await self.event_queue.get()
+            try:
+                await self.send_to_clients(message)
+            except Exception as e:
+                print(f"Fehler beim Senden des Events {message.get('type')}: {e}")
+            finally:
+                self.event_queue.task_done()
+    
     async def send_to_clients(self, message):
-        """Nachricht an alle verbundenen Clients senden"""
-        if self.clients and self.capturing:
-            disconnected = set()
-            for client in self.clients:
-                try:
-                    await client.send(json.dumps(message))
-                except websockets.exceptions.ConnectionClosed:
-                    disconnected.add(client)
-            
-            # Getrennte Clients entfernen
-            self.clients -= disconnected
+        """Event an den aktiven Host senden - untätige Clients bekommen nichts"""
+        host = message.pop('host', self.active)
+        if message['type'] == 'release':
+            # Beim Wechsel zur lokalen Steuerung oder per Hotkey: nichts gedrückt lassen
+            await self.release_host(self.routed_host)
+            return
+        # Erfasst wurde nur im Remote-Modus - auch Events, die erst nach dem Zurückschalten
+        # hier ankommen (z.B. das Loslassen einer Taste), gehen noch an ihren Host
+        if host != self.routed_host:
+            # Ziel-Host gewechselt: beim bisherigen noch gedrückte Tasten loslassen
+            await self.release_host(self.routed_host)
+            self.routed_host = host
+        if not self.is_held(message):
+            return  # Loslassen einer Maustaste, die dieser Host nie gedrückt bekommen hat
+        # Auch ohne verbundenen Client, damit ein späterer Abgleich stimmt
+        self.track_held(message)
+        client = self.hosts.get(host)
+        if client is None:
+            return
+        
+        # Absolute Remote-Position, nur für den UDP-Kanal
+        pos = message.pop('pos', None)
+        addr = self.udp_peers.get(client)
+        if addr is not None and message['type'] in POINTER_TYPES:
+            message['sent'] = time.time()
+            message['seq'] = self.seq
+            self.seq += 1
+            x, y = pos if pos is not None else (message['x'], message['y'])
+            datagram = encode_pointer(message['seq'], message['timestamp'], message['sent'], x, y)
+            self.udp_transport.sendto(datagram, addr)
+            self.bytes_sent += len(datagram)
+            return
+        await self.deliver(client, message)
+    
+    async def deliver(self, client, message):
+        """Event über den WebSocket eines Clients senden"""
+        # Sendezeitpunkt für die Latenz-Messung
+        message['sent'] = time.time()
+        message['seq'] = self.seq
+        self.seq += 1
+        encoder = self.encoders.get(client)
+        # Delta-Kodierung: Zustand pro Verbindung, ältere Clients bekommen JSON
+        frame = encoder.encode(message) if encoder is not None else json.dumps(message)
+        self.bytes_sent += len(frame)
+        try:
+            await client.send(frame)
+        except websockets.exceptions.ConnectionClosed:
+            pass  # Aufräumen übernimmt register_client
+    
+    async def release_host(self, name):
+        """Alle beim Host noch gedrückten Tasten/Maustasten loslassen"""
+        releases = [{'type': 'key_release', 'key': code} for code in sorted(self.held_keys)]
+        releases += [{'type': 'mouse_click', 'x': 0, 'y': 0, 'button': button, 'pressed': False}
+                     for button in sorted(self.held_buttons)]
+        self.held_keys.clear()
+        self.held_buttons.clear()
+        client = self.hosts.get(name)
+        if client is None:
+            return
+        for message in releases:
+            message['timestamp'] = time.time()
+            await self.deliver(client, message)
+    
+    def is_held(self, message):
+        """False für das Loslassen einer Maustaste, die beim Host nicht gedrückt ist
+
+        Tasten werden immer losgelassen: ein Code, der nicht in held_keys steht, kann trotzdem
+        zu einer gedrückten Taste gehören (anderes Zeichen je nach Shift/Layout).
+        """
+        event_type = message['type']
+        if event_type == 'mouse_click' and not message['pressed']:
+            return message['button'] in self.held_buttons
+        return True
+    
+    def track_held(self, message):
+        """Merken, welche Tasten beim Client gerade gedrückt sind"""
+        event_type = message['type']
+        if event_type == 'key_press':
+            self.held_keys.add(message['key'])
+        elif event_type == 'key_release':
+            self.held_keys.discard(message['key'])
+        elif event_type == 'mouse_click':
+            if message['pressed']:
+                self.held_buttons.add(message['button'])
+            else:
+                self.held_buttons.discard(message['button'])
     
     def on_mouse_move(self, x, y):
         """Maus-Bewegung abfangen"""
-        if self.capturing:
+        if self.recorder:
+            self.recorder.mouse_move(x, y)
+        if not self.capturing:
+            if self.paused:
+                return
+            # Bildschirmwechsel, wenn der Cursor an den Rand zu einem Remote-Bildschirm stößt
+            for name, mapper in list(self.mappers.items()):
+                if mapper.at_local_edge(x, y):
+                    self.switch_to(name, entry=mapper.enter(x, y))
+                    break
+            return
+        
+        mapper = self.mapper
+        
+        if mapper is None:
+            # Client ohne Geometrie-Angabe: absolute Koordinaten wie bisher
             message = {
                 'type': 'mouse_move',
                 'x': x,
                 'y': y,
                 'timestamp': time.time()
             }
-            asyncio.create_task(self.send_to_clients(message))
+            self.emit(message)
+            return
+        
+        delta = mapper.move(x, y)
+        if delta is None:
+            # Cursor verlässt den Remote-Bildschirm über den Rand
+            exit_x, exit_y = mapper.exit_point()
+            self.toggle_capturing()
+            self.capture.warp(exit_x, exit_y)
+            return
+        
+        dx, dy = delta
+        if dx or dy:
+            message = {
+                'type': 'mouse_delta',
+                'dx': dx,
+                'dy': dy,
+                'pos': (mapper.remote_x, mapper.remote_y),
+                'timestamp': time.time()
+            }
+            self.emit(message)
+        
+        # Lokalen Cursor vom Rand fernhalten, damit weiter Bewegungen ankommen
+        if mapper.near_local_border(x, y):
+            self.center_local_cursor()
+    
+    def center_local_cursor(self):
+        """Lokalen Cursor in die Bildschirmmitte setzen"""
+        center_x, center_y = self.mapper.local_center
+        self.capture.warp(center_x, center_y)
+        self.mapper.reset(center_x, center_y)
     
     def on_mouse_click(self, x, y, button, pressed):
         """Maus-Klick abfangen"""
+        if self.recorder:
+            self.recorder.mouse_click(x, y, button, pressed)
         if self.capturing:
+            # Gehaltene Modifier gehören zum Klick (z.B. Ctrl+Klick)
+            self.flush_deferred()
             message = {
                 'type': 'mouse_click',
                 'x': x,
                 'y': y,
-                'button': button.name,
+                'button': button,
                 'pressed': pressed,
                 'timestamp': time.time()
             }
-            asyncio.create_task(self.send_to_clients(message))
+            self.emit(message)
     
     def on_mouse_scroll(self, x, y, dx, dy):
         """Maus-Scroll abfangen"""
+        if self.recorder:
+            self.recorder.mouse_scroll(x, y, dx, dy)
         if self.capturing:
-            message = {
-                'type': 'mouse_scroll',
-                'x': x,
-                'y': y,
-                'dx': dx,
-                'dy': dy,
-                'timestamp': time.time()
-            }
-            asyncio.create_task(self.send_to_clients(message))
+            self.flush_deferred()
+            now = time.monotonic()
+            message = None
+            with self.scroll_lock:
+                self.scroll.add(dx, dy)
+                self.scroll_pos = (x, y)
+                if self.scroll_timestamp is None:
+                    self.scroll_timestamp = time.time()
+                if now >= self.scroll_window:
+                    # Erstes Scroll-Event nach einer Pause ohne Verzögerung
+                    self.scroll_window = now + self.scroll_interval
+                    message = self._take_scroll()
+                elif not self.scroll_timer and self.loop is not None:
+                    self.scroll_timer = True
+                    self.loop.call_soon_threadsafe(self.loop.call_later, self.scroll_window - now, self.flush_scroll)
+            if message is not None:
+                self.emit(message)
+    
+    def _take_scroll(self):
+        """Gesammeltes Scrollen als Nachricht (scroll_lock muss gehalten werden)"""
+        dx, dy = self.scroll.take()
+        if not dx and not dy:
+            return None
+        x, y = self.scroll_pos
+        message = {
+            'type': 'mouse_scroll',
+            'x': x,
+            'y': y,
+            'dx': dx,
+            'dy': dy,
+            'timestamp': self.scroll_timestamp
+        }
+        self.scroll_timestamp = None
+        return message
+    
+    def flush_scroll(self):
+        """Am Frame-Ende bzw. vor Klicks/Tasten: gesammeltes Scrollen senden"""
+        with self.scroll_lock:
+            self.scroll_timer = False
+            message = self._take_scroll()
+            if message is not None:
+                self.scroll_window = time.monotonic() + self.scroll_interval
+        if message is not None:
+            self.emit(message)
+    
+    def physical_key(self, key, code):
+        """Kennung der physischen Taste, unabhängig vom Shift-Zustand
+
+        Sondertasten zählen als sie selbst - ctrl_l und ctrl_r bleiben getrennt, anders
+        als bei den Hotkeys. Bei Zeichentasten der virtuelle Code bzw. das Zeichen in
+        Kleinschreibung (normalize_key), damit 'a' und 'A' dieselbe Taste sind.
+        """
+        if getattr(key, 'name', None) is not None:
+            return key
+        return normalize_key(key) or code
     
     def on_key_press(self, key):
         """Tastendruck abfangen"""
-        self.pressed_keys.add(key)
+        code = encode_key(key)
+        if code is not None:
+            self.pressed_codes.setdefault(self.physical_key(key, code), code)
+        if self.recorder and code is not None:
+            self.recorder.key(code, True)
         
-        # Prüfen ob Hotkey gedrückt wurde
-        if self.switch_hotkey.issubset(self.pressed_keys):
-            self.toggle_capturing()
+        # Hotkeys erkennen, ohne dass Teile davon beim Remote-Rechner ankommen
+        verdict = self.hotkeys.press(key)
+        if verdict == MATCH:
+            self.deferred.clear()
+            self.run_hotkey(self.hotkeys.action)
+            return
+        if verdict == SWALLOW:
             return
         
         if self.capturing:
-            try:
-                key_data = key.char if hasattr(key, 'char') and key.char else str(key)
-            except AttributeError:
-                key_data = str(key)
+            if code is None:
+                print(f"Unbekannte Taste ignoriert: {key}")
+                return
+            if verdict == DEFER:
+                if code not in self.deferred:
+                    self.deferred.append(code)
+                return
+            self.flush_deferred()
             
             message = {
                 'type': 'key_press',
-                'key': key_data,
+                'key': code,
                 'timestamp': time.time()
             }
-            asyncio.create_task(self.send_to_clients(message))
+            self.emit(message)
     
     def on_key_release(self, key):
         """Taste loslassen abfangen"""
-        try:
-            self.pressed_keys.discard(key)
-        except KeyError:
-            pass
+        code = encode_key(key)
+        if code is not None:
+            # Denselben Code loslassen, der beim Drücken gesendet wurde
+            code = self.pressed_codes.pop(self.physical_key(key, code), code)
+        if self.recorder and code is not None:
+            self.recorder.key(code, False)
+        
+        if self.hotkeys.release(key):
+            return  # Teil eines Hotkeys, das Drücken wurde nie gesendet
         
         if self.capturing:
-            try:
-                key_data = key.char if hasattr(key, 'char') and key.char else str(key)
-            except AttributeError:
-                key_data = str(key)
+            if code is None:
+                print(f"Unbekannte Taste ignoriert: {key}")
+                return
+            # Zurückgehaltene Taste ohne Hotkey losgelassen: Drücken nachholen
+            self.flush_deferred()
             
             message = {
                 'type': 'key_release',
-                'key': key_data,
+                'key': code,
                 'timestamp': time.time()
             }
-            asyncio.create_task(self.send_to_clients(message))
+            self.emit(message)
+    
+    def flush_deferred(self):
+        """Zurückgehaltene Modifier jetzt senden"""
+        if not self.deferred:
+            return
+        self.hotkeys.flush()
+        while self.deferred:
+            try:
+                code = self.deferred.popleft()
+            except IndexError:
+                break
+            self.emit({'type': 'key_press', 'key': code, 'timestamp': time.time()})
+    
+    def run_hotkey(self, action):
+        """Aktion eines erkannten Hotkeys ausführen"""
+        if action == 'pause':
+            self.paused = not self.paused
+            if self.paused and self.capturing:
+                self.switch_to(None)
+            print("Weiterleitung pausiert" if self.paused else "Weiterleitung fortgesetzt")
+        elif self.paused:
+            return
+        elif action == 'switch':
+            self.toggle_capturing()
+        elif action == 'release':
+            self.emit({'type': 'release', 'timestamp': time.time()})
+            print("Alle Tasten beim Host losgelassen")
+        elif action.startswith('host'):
+            index = int(action[4:]) - 1
+            if index < len(self.host_order) and self.host_order[index] in self.hosts:
+                host = self.host_order[index]
+                # Erneut gedrückt: zurück zur lokalen Steuerung
+                self.switch_to(None if self.capturing and host == self.active else host)
+    
+    def toggle_capturing(self, entry=None):
+        """Umschalten zwischen lokalem Modus und dem aktiven Host"""
+        self.switch_to(None if self.capturing else self.active, entry=entry)
     
-    def toggle_capturing(self):
-        """Umschalten zwischen lokalem und Remote-Modus"""
-        self.capturing = not self.capturing
-        status = "Remote-Steuerung AKTIV" if self.capturing else "Lokale Steuerung AKTIV"
+    def switch_to(self, name, entry=None):
+        """Eingaben an einen Host leiten (None = lokale Steuerung)"""
+        if name is None or name not in self.hosts:
+            if self.capturing:
+                # Nichts beim Host gedrückt lassen, auch nicht die zurückgehaltenen Modifier
+                self.deferred.clear()
+                self.emit({'type': 'release', 'timestamp': time.time()})
+            self.capturing = False
+        else:
+            self.active = name
+            self.capturing = True
+            mapper = self.mappers.get(name)
+            if mapper is not None:
+                # Remote-Cursor auf eine definierte Position setzen, danach nur noch relative Bewegung
+                remote_x, remote_y = entry if entry is not None else mapper.center()
+                self.emit({'type': 'mouse_move', 'x': remote_x, 'y': remote_y, 'timestamp': time.time()})
+                self.center_local_cursor()
+        
+        status = f"Remote-Steuerung AKTIV: {self.active}" if self.capturing else "Lokale Steuerung AKTIV"
         print(f"\n{'='*50}")
         print(f"Status: {status}")
         print(f"{'='*50}")
         
         if self.capturing:
-            print("Tastatur und Maus werden jetzt an den Remote-Laptop gesendet")
-            print("Drücken Sie Ctrl+Alt+S um zurück zu wechseln")
+            print(f"Tastatur und Maus werden jetzt an '{self.active}' gesendet")
+            print(f"Drücken Sie {self.switch_label} um zurück zu wechseln")
         else:
             print("Tastatur und Maus sind wieder lokal aktiv")
-            print("Drücken Sie Ctrl+Alt+S um zu Remote-Laptop zu wechseln")
+            print(f"Drücken Sie {self.switch_label} um zum Remote-Laptop zu wechseln")
     
     def start_listeners(self):
         """Event-Listener starten"""
-        # Maus-Listener
-        self.mouse_listener = mouse.Listener(
-            on_move=self.on_mouse_move,
-            on_click=self.on_mouse_click,
-            on_scroll=self.on_mouse_scroll
-        )
-        
-        # Tastatur-Listener  
-        self.keyboard_listener = keyboard.Listener(
-            on_press=self.on_key_press,
-            on_release=self.on_key_release
-        )
-        
-        self.mouse_listener.start()
-        self.keyboard_listener.start()
+        self.local_screen = self.capture.screen_size()
+        self.capture.start(self)
         
         print("Event-Listener gestartet")
-        print("Drücken Sie Ctrl+Alt+S um Remote-Steuerung zu aktivieren")
+        print(f"Drücken Sie {self.switch_label} um Remote-Steuerung zu aktivieren")
     
     def stop_listeners(self):
         """Event-Listener stoppen"""
-        if self.mouse_listener:
-            self.mouse_listener.stop()
-        if self.keyboard_listener:
-            self.keyboard_listener.stop()
+        self.capture.stop()
+    
+    def status(self):
+        """Zustand für den Health-Endpunkt"""
+        return {
+            'state': self.state,
+            'uptime': time.time() - self.started_at if self.started_at else 0.0,
+            'hosts': list(self.hosts),
+            'clients': len(self.clients),
+            'active': self.active,
+            'capturing': self.capturing,
+            'paused': self.paused,
+            'queued': self.event_queue.qsize() if self.event_queue is not None else 0,
+            'sent': self.seq,
+            'bytes_sent': self.bytes_sent,
+            'udp': self.udp_transport is not None,
+            'transfers': sum(len(t.outgoing) + len(t.incoming) for t in self.transfers.values())
+        }
+    
+    def process_request(self, *args):
+        """HTTP-Anfragen an /health bzw. /status beantworten, alles andere wird WebSocket
+        
+        websockets ab 13 ruft mit (connection, request) auf, ältere Versionen mit (path, headers).
+        """
+        if isinstance(args[0], str):
+            connection, path = None, args[0]
+        else:
+            connection, path = args[0], args[1].path
+        if path.split('?')[0] not in ('/health', '/status'):
+            return None
+        status = HTTPStatus.OK if self.state == 'running' else HTTPStatus.SERVICE_UNAVAILABLE
+        body = json.dumps(self.status())
+        if connection is None:
+            return status, [('Content-Type', 'application/json')], body.encode('utf-8')
+        response = connection.respond(status, body)
+        response.headers['Content-Type'] = 'application/json'
+        return response
+    
+    def stop(self, reason="Server wird beendet"):
+        """Server geordnet beenden (auch aus anderen Threads aufrufbar)"""
+        if self.loop is None or self.stop_event is None:
+            return
+        self.loop.call_soon_threadsafe(self._request_stop, reason)
+    
+    def _request_stop(self, reason):
+        if self.stop_reason is None:
+            self.stop_reason = reason
+        self.stop_event.set()
+    
+    def install_signal_handlers(self):
+        """SIGINT/SIGTERM beenden den Server geordnet, ein zweites Ctrl+C bricht sofort ab"""
+        installed = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(sig, self._on_signal, sig)
+                installed.append(sig)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Windows bzw. nicht im Haupt-Thread: dort bleibt KeyboardInterrupt
+                pass
+        return installed
+    
+    def _on_signal(self, sig):
+        print(f"\nSignal {signal.Signals(sig).name} empfangen, Server wird beendet...")
+        self.loop.remove_signal_handler(sig)
+        self._request_stop("Server wird beendet")
+    
+    async def shutdown(self):
+        """Erfassung stoppen, ausstehende Events senden, Clients mit Begründung trennen"""
+        self.state = 'stopping'
+        reason = self.stop_reason or "Server wird beendet"
+        
+        # Keine neuen Events mehr, Listener-Threads beenden
+        await asyncio.to_thread(self.stop_listeners)
+        if self.capturing:
+            # Nichts beim Host gedrückt lassen
+            self.deferred.clear()
+            self.emit({'type': 'release', 'timestamp': time.time()})
+            self.capturing = False
+        
+        # Warteschlange abarbeiten lassen
+        try:
+            await asyncio.wait_for(self.event_queue.join(), self.drain_timeout)
+        except asyncio.TimeoutError:
+            print(f"{self.event_queue.qsize()} Events konnten nicht mehr gesendet werden")
+        
+        # Close-Frame mit Begründung (1001 = Going Away), der Client verbindet sich später neu
+        clients = list(self.clients)
+        if clients:
+            print(f"Trenne {len(clients)} Client(s): {reason}")
+            await asyncio.gather(*(client.close(1001, reason) for client in clients),
+                                 return_exceptions=True)
     
     async def start_server(self):
-        """WebSocket-Server starten"""
-        self.start_listeners()
+        """WebSocket-Server starten und laufen lassen, bis stop() oder ein Signal kommt"""
+        self.loop = asyncio.get_running_loop()
+        self.event_queue = asyncio.Queue()
+        self.stop_event = asyncio.Event()
+        signals = self.install_signal_handlers()
+        sender = asyncio.create_task(self.sender_loop())
+        background = []
+        if self.clipboard:
+            background.append(asyncio.create_task(self.clipboard.run()))
+        if self.outbox:
+            background.append(asyncio.create_task(OutboxWatcher(self.outbox, self.send_file_to_clients).run()))
+        if self.udp:
+            try:
+                self.udp_transport, _ = await self.loop.create_datagram_endpoint(
+                    lambda: PointerServerProtocol(self), local_addr=(self.host, self.udp_port))
+            except OSError as e:
+                print(f"UDP-Kanal nicht verfügbar ({e}), Mausbewegungen laufen über den WebSocket")
         
         try:
-            async with websockets.serve(self.register_client, self.host, self.port):
-                print(f"Server läuft auf ws://{self.host}:{self.port}")
+            async with websockets.serve(self.register_client, self.host, self.port,
+                                        compression='deflate' if self.deflate else None,
+                                        process_request=self.process_request,
+                                        ssl=self.ssl_context):
+                self.start_listeners()
+                self.state = 'running'
+                self.started_at = time.time()
+                scheme = 'wss' if self.ssl_context else 'ws'
+                status_url = f"{'https' if self.ssl_context else 'http'}://{self.host}:{self.port}/health"
+                print(f"Server läuft auf {scheme}://{self.host}:{self.port} (Status: {status_url})")
+                if self.psk is not None:
+                    print("Clients müssen sich mit dem gemeinsamen Schlüssel (PSK) authentifizieren")
                 print("Warten auf Client-Verbindungen...")
-                await asyncio.Future()  # Läuft für immer
-        except KeyboardInterrupt:
-            print("\nServer wird beendet...")
+                await self.stop_event.wait()
+                await self.shutdown()
         finally:
+            self.state = 'stopped'
+            sender.cancel()
+            for task in background:
+                task.cancel()
+            await asyncio.gather(sender, *background, return_exceptions=True)
             self.stop_listeners()
+            for sig in signals:
+                self.loop.remove_signal_handler(sig)
+            if self.udp_transport is not None:
+                self.udp_transport.close()
+                self.udp_transport = None
+            if self.recorder:
+                self.recorder.close()
+                print(f"Aufzeichnung gespeichert: {self.recorder.path} ({self.recorder.count} Events)")
+            print("Server beendet")
 
 def main():
-    server = KVMServer()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="KVM Server - sendet Tastatur/Maus an Clients")
+    parser.add_argument('--host', default='localhost', help="Adresse, auf der gelauscht wird")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--edge', default='right', choices=['left', 'right', 'top', 'bottom', 'none'],
+                        help="Seite, an der der Remote-Bildschirm liegt (none = nur Hotkey)")
+    parser.add_argument('--layout',
+                        help="Mehrere Hosts: Rand=Name je Host, z.B. right=laptop,left=desktop")
+    parser.add_argument('--hotkey', action='append', default=[], metavar='AKTION=TASTEN',
+                        help="Hotkey ändern, z.B. switch=ctrl+alt+k oder pause=none "
+                             "(Aktionen: switch, pause, release, host1 bis host9)")
+    parser.add_argument('--no-udp', action='store_true',
+                        help="Mausbewegungen nicht über UDP, sondern nur über den WebSocket senden")
+    parser.add_argument('--clipboard', action='store_true', help="Zwischenablage mit den Clients teilen")
+    parser.add_argument('--inbox', help="Ordner für empfangene Dateien")
+    parser.add_argument('--outbox', help="Dateien in diesem Ordner an die Clients senden")
+    parser.add_argument('--no-delta', action='store_true', help="Events als JSON statt binär senden")
+    parser.add_argument('--no-deflate', action='store_true', help="permessage-deflate abschalten")
+    parser.add_argument('--tls', metavar='ORDNER',
+                        help="Verschlüsseln (wss): cert.pem/key.pem aus dem Ordner, fehlen sie, werden sie erzeugt")
+    parser.add_argument('--tls-cert', help="Eigenes TLS-Zertifikat (PEM)")
+    parser.add_argument('--tls-key', help="Privater Schlüssel zum Zertifikat (PEM)")
+    parser.add_argument('--psk', default=os.environ.get('KVM_PSK'),
+                        help="Gemeinsamer Schlüssel oder Datei damit; Clients ohne ihn werden abgewiesen "
+                             "(Standard: Umgebungsvariable KVM_PSK)")
+    parser.add_argument('--record', help="Erfasste Events in ein Event-Log schreiben")
+    parser.add_argument('--replay', help="Event-Log statt Tastatur/Maus abspielen")
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="Wiedergabe-Tempo (1 = original, 0 = maximal)")
+    args = parser.parse_args()
+    
+    try:
+        layout = parse_layout(args.layout) if args.layout else None
+    except ValueError as e:
+        parser.error(str(e))
+    
+    hotkeys = dict(DEFAULT_BINDINGS)
+    for item in args.hotkey:
+        action, _, chord = item.partition('=')
+        if action not in DEFAULT_BINDINGS:
+            parser.error(f"Unbekannte Hotkey-Aktion: {action}")
+        if not chord or chord == 'none':
+            hotkeys.pop(action, None)
+        else:
+            hotkeys[action] = chord
+    try:
+        ChordMatcher(hotkeys)
+    except ValueError as e:
+        parser.error(str(e))
+    
+    tls = None
+    try:
+        if args.tls_cert or args.tls_key:
+            if not (args.tls_cert and args.tls_key):
+                parser.error("--tls-cert und --tls-key gehören zusammen")
+            tls = (args.tls_cert, args.tls_key)
+        elif args.tls:
+            tls = security.generate_certificate(args.tls)
+        psk = security.load_psk(args.psk) if args.psk else None
+    except (RuntimeError, ValueError, OSError) as e:
+        parser.error(str(e))
+    if tls:
+        print(f"TLS-Zertifikat: {tls[0]} (SHA-256 {security.fingerprint(security.certificate_der(tls[0]))})")
+    if tls and psk is None:
+        print("Hinweis: ohne --psk kann sich jeder Client verbinden")
+    if psk is not None and not tls:
+        print("Hinweis: ohne --tls ist die Verbindung nicht verschlüsselt, nur authentifiziert")
+    
+    capture = None
+    recorder = None
+    if args.replay or args.record:
+        from recorder import ReplayCapture, EventLogWriter
+        if args.replay:
+            capture = ReplayCapture(args.replay, speed=args.speed)
+        if args.record:
+            recorder = EventLogWriter(args.record)
+    
+    server = KVMServer(args.host, args.port, capture=capture,
+                       edge=None if args.edge == 'none' else args.edge, recorder=recorder,
+                       udp=not args.no_udp, clipboard=args.clipboard,
+                       inbox=args.inbox, outbox=args.outbox,
+                       codec=not args.no_delta, deflate=not args.no_deflate,
+                       layout=layout, hotkeys=hotkeys, tls=tls, psk=psk)
+    if args.replay:
+        # Abgespielte Events direkt weiterleiten, die Wiedergabe startet mit dem ersten Client
+        server.capturing = True
     
     try:
         asyncio.run(server.start_server())
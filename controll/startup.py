@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Startzeit von Server und Client messen
+
+Import-Profil: `python -X importtime` je Modul, die teuersten Imports nach
+kumulierter Zeit. Startzeit: `server.py --help` sowie die Zeit vom Prozessstart,
+bis der Server auf /health antwortet (mit --replay, läuft also ohne Display).
+
+    python startup.py                       # Profil server + client, Startzeit
+    python startup.py --module client --top 20
+    python startup.py --runs 10 --json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def import_profile(module):
+    """(Gesamtzeit in ms, [(kumuliert ms, eigene ms, Modul)]) für den Import eines Moduls"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=HERE, capture_output=True, text=True)
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        # Nur direkte Imports und eine Ebene darunter, sonst wird die Liste unlesbar
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth <= 2:
+            entries.append((int(cumulative) / 1000, int(own) / 1000, name.strip()))
+    total = next((c for c, _, name in entries if name == module), 0.0)
+    entries.sort(reverse=True)
+    return total, entries
+
+
+def time_command(args, runs):
+    """Median der Laufzeit eines Kommandos in ms"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=HERE, capture_output=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def time_to_ready(runs, port, timeout=10.0):
+    """Median in ms vom Start von server.py bis /health mit 200 antwortet"""
+    from recorder import EventLogWriter
+
+    times = []
+    with tempfile.TemporaryDirectory() as tmp:
+        log = Path(tmp) / 'leer.kvmlog'
+        EventLogWriter(str(log)).close()
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, 'server.py', '--replay', str(log), '--port', str(port),
+                 '--edge', 'none', '--no-udp'],
+                cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                while time.perf_counter() - start < timeout:
+                    try:
+                        with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=0.5) as response:
+                            if response.status == 200:
+                                times.append((time.perf_counter() - start) * 1000)
+                                break
+                    except OSError:
+                        time.sleep(0.002)
+                else:
+                    raise RuntimeError("Server hat nicht rechtzeitig geantwortet")
+            finally:
+                process.terminate()
+                process.wait()
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-Zeiten und Startzeit von Server und Client")
+    parser.add_argument('--module', action='append', help="Modul profilieren (Standard: server und client)")
+    parser.add_argument('--top', type=int, default=12, help="Anzahl der angezeigten Imports")
+    parser.add_argument('--runs', type=int, default=5, help="Wiederholungen für die Startzeit")
+    parser.add_argument('--port', type=int, default=8797)
+    parser.add_argument('--json', action='store_true', help="Ergebnis als JSON ausgeben")
+    args = parser.parse_args()
+
+    result = {'imports': {}, 'python_ms': time_command(['-c', 'pass'], args.runs)}
+    for module in args.module or ['server', 'client']:
+        total, entries = import_profile(module)
+        result['imports'][module] = {'total_ms': total, 'top': entries[:args.top]}
+    result['server_help_ms'] = time_command(['server.py', '--help'], args.runs)
+    result['client_help_ms'] = time_command(['client.py', '--help'], args.runs)
+    result['server_ready_ms'] = time_to_ready(args.runs, args.port)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    for module, profile in result['imports'].items():
+        print(f"import {module}: {profile['total_ms']:.1f} ms")
+        for cumulative, own, name in profile['top']:
+            print(f"  {cumulative:8.1f} ms  (eigen {own:6.1f})  {name}")
+    print(f"\nPython ohne Imports:   {result['python_ms']:7.1f} ms")
+    print(f"server.py --help:      {result['server_help_ms']:7.1f} ms")
+    print(f"client.py --help:      {result['client_help_ms']:7.1f} ms")
+    print(f"Server bis /health:    {result['server_ready_ms']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Zwischenablage und Dateiübertragung über die bestehende WebSocket-Verbindung
+
+Steuer-Nachrichten laufen als JSON, die Daten als binäre Frames in Blöcken:
+    Sender → Empfänger:  transfer_offer (Name, Größe, SHA-256)
+    Empfänger → Sender:  transfer_resume (ab welchem Byte, bei Abbruch vorhandener Teil)
+    Sender → Empfänger:  Blöcke: Kopf (FRAME_CHUNK, ID, Offset, Flags) + zlib-komprimierte Daten
+    Empfänger → Sender:  transfer_ack pro Block (Flusskontrolle), transfer_done am Ende
+
+Der Sender hat höchstens WINDOW Blöcke unbestätigt unterwegs und wartet, solange
+Eingabe-Events anstehen - große Übertragungen verzögern so keine Tastendrücke.
+"""
+import asyncio
+import hashlib
+import json
+import struct
+import zlib
+from pathlib import Path
+
+# Erstes Byte binärer Frames; Event-Frames beginnen mit codec.FRAME_EVENTS
+FRAME_CHUNK = 0xC1
+CHUNK = struct.Struct('<B16sQB')
+CHUNK_SIZE = 8 * 1024
+WINDOW = 8
+FLAG_ZLIB = 1
+
+# Unterhalb dieser Größe lohnt sich die Kompression nicht
+COMPRESS_MIN = 256
+
+
+def transfer_id(kind, name, digest):
+    """Gleicher Inhalt → gleiche ID, damit ein erneutes Angebot fortgesetzt werden kann"""
+    return hashlib.sha256(f"{kind}:{name}:{digest}".encode('utf-8')).digest()[:16]
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class _Outgoing:
+    def __init__(self):
+        self.acked = 0
+        self.ack_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        self.resume = loop.create_future()
+        self.done = loop.create_future()
+
+
+class _Incoming:
+    def __init__(self, kind, name, size, digest, part_path=None):
+        self.kind = kind
+        self.name = name
+        self.size = size
+        self.digest = digest
+        self.part_path = part_path
+        self.buffer = bytearray() if part_path is None else None
+        self.file = None
+        self.offset = 0
+
+
+class TransferManager:
+    """Übertragungen auf einer WebSocket-Verbindung (Server: eine pro Client)
+
+    inbox: Ordner für empfangene Dateien (None = Dateien ablehnen)
+    on_clipboard: wird mit dem empfangenen Text aufgerufen
+    input_busy: liefert True, solange Eingabe-Events auf das Senden warten
+    """
+
+    def __init__(self, websocket, inbox=None, on_clipboard=None, input_busy=None):
+        self.websocket = websocket
+        self.inbox = Path(inbox) if inbox else None
+        self.on_clipboard = on_clipboard
+        self.input_busy = input_busy or (lambda: False)
+        self.outgoing = {}
+        self.incoming = {}
+
+    # ---------- Senden ----------
+
+    async def send_clipboard(self, text):
+        data = text.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        return await self._send('clipboard', 'clipboard', len(data), digest, lambda offset: data[offset:offset + CHUNK_SIZE])
+
+    async def send_file(self, path):
+        path = Path(path)
+        digest = await asyncio.to_thread(file_digest, path)
+        with open(path, 'rb') as f:
+            def read(offset):
+                f.seek(offset)
+                return f.read(CHUNK_SIZE)
+            return await self._send('file', path.name, path.stat().st_size, digest, read)
+
+    async def _send(self, kind, name, size, digest, read):
+        tid = transfer_id(kind, name, digest)
+        if tid in self.outgoing:
+            return False  # Läuft bereits
+        out = self.outgoing[tid] = _Outgoing()
+        try:
+            await self.websocket.send(json.dumps({
+                'type': 'transfer_offer',
+                'id': tid.hex(),
+                'kind': kind,
+                'name': name,
+                'size': size,
+                'sha256': digest,
+                'chunk_size': CHUNK_SIZE
+            }))
+            offset = await asyncio.wait_for(out.resume, 10.0)
+            if offset < 0:
+                return False  # Vom Empfänger abgelehnt
+            out.acked = offset
+
+            while offset < size:
+                # Eingabe-Events haben Vorrang, und der Sendepuffer muss leer sein,
+                # damit ein Tastendruck nie hinter Datenblöcken in der Leitung wartet
+                while self.input_busy() or self._write_buffer_size():
+                    await asyncio.sleep(0.002)
+                # Flusskontrolle: nur WINDOW Blöcke unbestätigt
+                while offset - out.acked >= WINDOW * CHUNK_SIZE:
+                    out.ack_event.clear()
+                    await asyncio.wait_for(out.ack_event.wait(), 10.0)
+
+                block = read(offset)
+                if not block:
+                    break
+                flags = 0
+                payload = block
+                if len(block) >= COMPRESS_MIN:
+                    packed = zlib.compress(block, 1)
+                    if len(packed) < len(block):
+                        payload, flags = packed, FLAG_ZLIB
+                await self.websocket.send(CHUNK.pack(FRAME_CHUNK, tid, offset, flags) + payload)
+                offset += len(block)
+
+            return await asyncio.wait_for(out.done, 30.0)
+        except asyncio.TimeoutError:
+            print(f"Übertragung abgebrochen (Zeitüberschreitung): {name}")
+            return False
+        finally:
+            del self.outgoing[tid]
+
+    def _write_buffer_size(self):
+        transport = getattr(self.websocket, 'transport', None)
+        return transport.get_write_buffer_size() if transport is not None else 0
+
+    # ---------- Empfangen ----------
+
+    async def handle_message(self, data):
+        """Steuer-Nachricht verarbeiten, gibt False zurück wenn sie nicht hierher gehört"""
+        event_type = data.get('type')
+        if event_type == 'transfer_offer':
+            await self._on_offer(data)
+        elif event_type in ('transfer_resume', 'transfer_ack', 'transfer_done'):
+            out = self.outgoing.get(bytes.fromhex(data['id']))
+            if out is None:
+                return True
+            if event_type == 'transfer_resume':
+                if not out.resume.done():
+                    out.resume.set_result(data['offset'])
+            elif event_type == 'transfer_ack':
+                out.acked = max(out.acked, data['offset'])
+                out.ack_event.set()
+            elif not out.done.done():
+                out.done.set_result(bool(data.get('ok')))
+        else:
+            return False
+        return True
+
+    async def _on_offer(self, data):
+        tid = bytes.fromhex(data['id'])
+        kind = data.get('kind')
+        offset = 0
+        if kind == 'clipboard' and self.on_clipboard is not None:
+            self.incoming[tid] = _Incoming(kind, 'clipboard', data['size'], data['sha256'])
+        elif kind == 'file' and self.inbox is not None:
+            self.inbox.mkdir(parents=True, exist_ok=True)
+            part_path = self.inbox / f".{data['id']}.part"
+            incoming = _Incoming(kind, Path(data['name']).name, data['size'], data['sha256'], part_path)
+            if part_path.exists():
+                # Abgebrochene Übertragung fortsetzen, nur ganze Blöcke übernehmen
+                offset = part_path.stat().st_size // CHUNK_SIZE * CHUNK_SIZE
+            incoming.file = open(part_path, 'r+b' if part_path.exists() else 'wb')
+            incoming.file.truncate(offset)
+            incoming.file.seek(offset)
+            incoming.offset = offset
+            self.incoming[tid] = incoming
+            if offset:
+                print(f"Setze Übertragung fort: {incoming.name} ab {offset} Bytes")
+        else:
+            offset = -1  # Ablehnen
+        await self.websocket.send(json.dumps({'type': 'transfer_resume', 'id': data['id'], 'offset': offset}))
+        if offset >= 0 and offset >= data['size']:
+            await self._finish(tid)
+
+    async def handle_chunk(self, frame):
+        """Binären Block verarbeiten"""
+        if len(frame) < CHUNK.size:
+            return
+        kind, tid, offset, flags = CHUNK.unpack_from(frame)
+        if kind != FRAME_CHUNK:
+            return
+        incoming = self.incoming.get(tid)
+        if incoming is None or offset != incoming.offset:
+            return
+        block = frame[CHUNK.size:]
+        if flags & FLAG_ZLIB:
+            block = zlib.decompress(block)
+        if incoming.file is not None:
+            incoming.file.write(block)
+        else:
+            incoming.buffer += block
+        incoming.offset += len(block)
+        await self.websocket.send(json.dumps({'type': 'transfer_ack', 'id': tid.hex(), 'offset': incoming.offset}))
+        if incoming.offset >= incoming.size:
+            await self._finish(tid)
+
+    async def _finish(self, tid):
+        incoming = self.incoming.pop(tid)
+        ok = False
+        if incoming.file is not None:
+            incoming.file.close()
+            ok = await asyncio.to_thread(file_digest, incoming.part_path) == incoming.digest
+            if ok:
+                target = self.inbox / incoming.name
+                n = 1
+                while target.exists():
+                    target = self.inbox / f"{Path(incoming.name).stem} ({n}){Path(incoming.name).suffix}"
+                    n += 1
+                incoming.part_path.rename(target)
+                print(f"Datei empfangen: {target}")
+            else:
+                incoming.part_path.unlink(missing_ok=True)
+                print(f"Prüfsumme falsch, Datei verworfen: {incoming.name}")
+        else:
+            data = bytes(incoming.buffer)
+            ok = hashlib.sha256(data).hexdigest() == incoming.digest
+            if ok:
+                self.on_clipboard(data.decode('utf-8', errors='replace'))
+        await self.websocket.send(json.dumps({'type': 'transfer_done', 'id': tid.hex(), 'ok': ok}))
+
+    def close(self):
+        """Offene Teil-Dateien schließen (bleiben zum Fortsetzen liegen)"""
+        for incoming in self.incoming.values():
+            if incoming.file is not None:
+                incoming.file.close()
+        self.incoming.clear()
+
+
+class ClipboardWatcher:
+    """Beobachtet die lokale Zwischenablage (pyperclip) und meldet Änderungen"""
+
+    def __init__(self, on_change, interval=0.5):
+        self.on_change = on_change
+        self.interval = interval
+        self.last = None
+        self.available = True
+
+    def set(self, text):
+        """Vom Remote-Rechner empfangenen Text übernehmen (ohne ihn zurückzuschicken)"""
+        self.last = text
+        try:
+            import pyperclip
+            pyperclip.copy(text)
+        except Exception as e:
+            print(f"Zwischenablage konnte nicht gesetzt werden: {e}")
+
+    async def run(self):
+        try:
+            import pyperclip
+            self.last = await asyncio.to_thread(pyperclip.paste)
+        except Exception as e:
+            print(f"Zwischenablage nicht verfügbar ({e}) - Synchronisation deaktiviert")
+            self.available = False
+            return
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                text = await asyncio.to_thread(pyperclip.paste)
+            except Exception:
+                continue
+            if text and text != self.last:
+                self.last = text
+                await self.on_change(text)
+
+
+class OutboxWatcher:
+    """Dateien, die in den Ordner gelegt werden, an die Gegenseite senden
+
+    Erfolgreich übertragene Dateien landen in outbox/sent. Bricht eine
+    Übertragung ab, bleibt die Datei liegen und wird beim nächsten Durchlauf
+    erneut angeboten - der Empfänger setzt dann an der abgebrochenen Stelle fort.
+    """
+
+    def __init__(self, outbox, send, interval=1.0):
+        self.outbox = Path(outbox)
+        self.send = send
+        self.interval = interval
+
+    async def run(self):
+        self.outbox.mkdir(parents=True, exist_ok=True)
+        sent_dir = self.outbox / 'sent'
+        while True:
+            for path in sorted(self.outbox.iterdir()):
+                if not path.is_file() or path.name.startswith('.'):
+                    continue
+                if await self.send(path):
+                    sent_dir.mkdir(exist_ok=True)
+                    path.rename(sent_dir / path.name)
+                    print(f"Datei gesendet: {path.name}")
+            await asyncio.sleep(self.interval)
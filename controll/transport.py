@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+UDP-Kanal für Zeiger-Events
+
+Mausbewegungen gehen als Datagramme mit Sequenznummer an den Client. Ein
+verlorenes Paket blockiert so keine späteren Bewegungen (kein Head-of-Line-
+Blocking wie bei TCP), veraltete Pakete werden verworfen. Jedes Paket trägt
+die absolute Position - Verluste führen also nicht zu einem versetzten Cursor.
+Klicks, Tasten und Steuer-Nachrichten bleiben auf dem WebSocket.
+
+Aushandlung über den WebSocket:
+    Client → Server:  hello mit 'udp': True
+    Server → Client:  udp_offer mit Port und Token
+    Client → Server:  Registrierungs-Datagramm (Magic + Token) per UDP
+    Server → Client:  udp_ready, ab dann laufen Zeiger-Events über UDP
+"""
+import asyncio
+import struct
+
+MAGIC = b'KVMU'
+
+# Registrierung: Magic + Token
+REGISTER = struct.Struct('<4sQ')
+
+# Zeiger-Paket: Typ, Sequenznummer, Erfassungszeit, Sendezeit, x, y
+POINTER = struct.Struct('<BQddii')
+POINTER_MOVE = 1
+
+# Über UDP übertragene Event-Typen
+POINTER_TYPES = ('mouse_move', 'mouse_delta')
+
+
+def encode_pointer(seq, timestamp, sent, x, y):
+    return POINTER.pack(POINTER_MOVE, seq, timestamp, sent, int(x), int(y))
+
+
+def decode_pointer(datagram):
+    """Zeiger-Paket als Event-Dictionary, None bei ungültigen Daten"""
+    if len(datagram) != POINTER.size:
+        return None
+    kind, seq, timestamp, sent, x, y = POINTER.unpack(datagram)
+    if kind != POINTER_MOVE:
+        return None
+    return {'type': 'mouse_move', 'seq': seq, 'timestamp': timestamp, 'sent': sent, 'x': x, 'y': y}
+
+
+class PointerServerProtocol(asyncio.DatagramProtocol):
+    """Server-Seite: nimmt Registrierungen entgegen"""
+
+    def __init__(self, server):
+        self.server = server
+
+    def datagram_received(self, data, addr):
+        if len(data) != REGISTER.size:
+            return
+        magic, token = REGISTER.unpack(data)
+        if magic == MAGIC:
+            self.server.register_udp_peer(token, addr)
+
+
+class PointerClientProtocol(asyncio.DatagramProtocol):
+    """Client-Seite: empfängt Zeiger-Pakete und verwirft veraltete"""
+
+    def __init__(self, client):
+        self.client = client
+        self.last_seq = -1
+        self.received = 0
+        self.stale = 0
+
+    def datagram_received(self, data, addr):
+        event = decode_pointer(data)
+        if event is None:
+            return
+        if event['seq'] <= self.last_seq:
+            # Überholt von einem neueren Paket - Position ist bereits veraltet
+            self.stale += 1
+            return
+        self.last_seq = event['seq']
+        self.received += 1
+        self.client.handle_pointer_datagram(event)
+
+    def error_received(self, exc):
+        print(f"UDP-Fehler: {exc}")
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Startzeit von script.py / gui_qt.py messen.
+
+- Import-Profil (python -X importtime): welche Module kosten beim Start wie viel
+- script.py --help: Zeit bis zur Hilfe-Ausgabe (Median mehrerer Läufe)
+- Render-Backend: erster Aufruf (Import von PySide6/CairoSVG) gegen weitere Aufrufe
+
+Aufruf:
+    python bench_startup.py
+    python bench_startup.py --runs 10 --top 15
+"""
+
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+
+
+def import_times(module):
+    """Liste (kumuliert_ms, modul) der direkten und eine Ebene tieferen Imports."""
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                          cwd=HERE, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        if len(name) - len(name.lstrip()) <= 3:
+            rows.append((int(parts[1]) / 1000, name.strip()))
+    ok = proc.returncode == 0
+    return ok, sorted(rows, reverse=True)
+
+
+def median_runtime(args, runs):
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=HERE, capture_output=True)
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times) // 2]
+
+
+def backend_times():
+    """(Name, erster Aufruf ms, zweiter Aufruf ms, Fehler) für die Render-Backends."""
+    sys.path.insert(0, str(HERE))
+    import script
+    results = []
+    for name, loader in (('Qt', script.load_qt), ('CairoSVG', script.load_cairosvg)):
+        times = []
+        error = None
+        for _ in range(2):
+            t0 = time.perf_counter()
+            try:
+                loader()
+            except ImportError as e:
+                error = str(e)
+            times.append((time.perf_counter() - t0) * 1000)
+        results.append((name, times[0], times[1], error))
+    return results
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Startzeit von script.py und gui_qt.py messen")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args()
+
+    for module in ('script', 'gui_qt'):
+        ok, rows = import_times(module)
+        if not ok:
+            print(f"import {module}: nicht importierbar (PySide6 fehlt?)")
+            continue
+        print(f"import {module}:")
+        for ms, name in rows[:args.top]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+    print()
+    print(f"python -c pass:      {median_runtime(['-c', 'pass'], args.runs):7.1f} ms")
+    print(f"script.py --help:    {median_runtime(['script.py', '--help'], args.runs):7.1f} ms")
+
+    print()
+    for name, first, second, error in backend_times():
+        state = f"nicht verfügbar ({error})" if error else "ok"
+        print(f"{name:<9} erster Aufruf {first:7.1f} ms, danach {second:6.3f} ms  {state}")
+
+
+if __name__ == '__main__':
+    main()
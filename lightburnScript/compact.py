@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Kompakte SVG-Ausgabe für build_svg (Veröffentlichung im Web, schnelleres Parsen beim Rendern).
+
+- Koordinaten auf eine feste Anzahl Nachkommastellen gerundet, ohne überflüssige Nullen
+- gemeinsame Stile als CSS-Klassen in einem <style>-Block statt style="..." an jedem Element
+- Pfade mit relativen Befehlen (m, l, h, v, c, ...), Befehlsbuchstaben nur bei Wechsel
+- reine Verschiebungen (matrix(1 0 0 1 e f)) in die Koordinaten von rect/ellipse/path übernommen,
+  x/y/cx/cy mit dem Standardwert 0 weggelassen
+- keine Einrückung zwischen den Elementen
+
+Die relativen Koordinaten werden aus den gerundeten absoluten berechnet, Rundungsfehler
+summieren sich also über lange Pfade nicht auf. Eingebettete Bilder (data-URIs), ids und
+Text bleiben unverändert.
+
+Aufruf über script.py:
+    python script.py auftrag.lbrn2 auftrag.svg --compact
+    python script.py auftrag.lbrn2 auftrag.svgz --compact --precision 2
+"""
+
+import functools
+import re
+from collections import Counter
+
+_TAG = re.compile(r'<([A-Za-z][\w:.-]*)((?:\s+[\w:.-]+="[^"]*")*)\s*(/?)>')
+_ATTR = re.compile(r'([\w:.-]+)="([^"]*)"')
+_NUMBER = re.compile(r'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+_TOKEN = re.compile(r'([MmZzLlHhVvCcSsQqTtAa])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+_FLAG = re.compile(r'[\s,]*([01])')
+_COMMAND = re.compile(r'[\s,]*([MmZzLlHhVvCcSsQqTtAa])')
+_SEPARATOR = re.compile(r'[\s,]*')
+_BETWEEN_TAGS = re.compile(r'>\n\s*<')
+_LONG_COLOR = re.compile(r'#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3\b')
+
+_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+_LENGTH_ATTRS = frozenset(('x', 'y', 'width', 'height', 'cx', 'cy', 'rx', 'ry', 'r'))
+# Position der Shapes, in die sich eine Verschiebung einrechnen lässt (Pfade: über das erste m)
+_POSITION_ATTRS = {'rect': ('x', 'y'), 'ellipse': ('cx', 'cy'), 'circle': ('cx', 'cy'), 'path': ()}
+# Hier ist 0 der Standardwert (bei <tspan> nicht: ohne x läuft der Text weiter)
+_ZERO_DEFAULT = {'rect': ('x', 'y'), 'ellipse': ('cx', 'cy'), 'circle': ('cx', 'cy'),
+                 'use': ('x', 'y'), 'image': ('x', 'y')}
+# Faktoren (Skalierung/Drehung) wirken auf alle Koordinaten, deshalb genauer als die Positionen
+_FACTOR_DIGITS = 3
+
+
+@functools.lru_cache(maxsize=65536)
+def fmt(value, precision):
+    """Zahl auf precision Nachkommastellen, so kurz wie möglich ('0.50' → '.5', '-0' → '0')."""
+    text = f'{value:.{precision}f}'
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('-0', ''):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
+
+
+def join_numbers(numbers):
+    """Zahlen ohne unnötige Trenner aneinanderhängen ('1 -2' → '1-2', '.5 .5' → '.5.5')."""
+    out = []
+    previous = None
+    for number in numbers:
+        if previous is not None and not (number[0] == '-' or (number[0] == '.' and '.' in previous)):
+            out.append(' ')
+        out.append(number)
+        previous = number
+    return ''.join(out)
+
+
+def parse_path(d):
+    """SVG-Pfad in Befehle [(Buchstabe, [Zahlen]), ...], implizite Wiederholungen aufgeteilt.
+
+    Bogen-Flags dürfen ohne Trenner stehen ('a5 5 0 011 10 10'). ValueError bei Syntaxfehlern.
+    """
+    if 'a' not in d and 'A' not in d:
+        return _parse_simple(d)
+    commands = []
+    pos = 0
+    end = len(d.rstrip())
+    command = None
+    while pos < end:
+        match = _COMMAND.match(d, pos)
+        if match:
+            command = match.group(1)
+            pos = match.end()
+            if command in 'Zz':
+                commands.append((command, []))
+                continue
+        elif command is None or command in 'Zz':
+            raise ValueError(f"Ungültiger Pfad bei Position {pos}")
+        count = _ARGS[command.upper()]
+        args = []
+        for i in range(count):
+            if command in 'Aa' and i in (3, 4):
+                match = _FLAG.match(d, pos)
+                if not match:
+                    raise ValueError(f"Ungültiges Bogen-Flag bei Position {pos}")
+                args.append(float(match.group(1)))
+            else:
+                pos = _SEPARATOR.match(d, pos).end()
+                match = _NUMBER.match(d, pos)
+                if not match:
+                    raise ValueError(f"Zahl erwartet bei Position {pos}")
+                args.append(float(match.group(0)))
+            pos = match.end()
+        commands.append((command, args))
+        # Nach M/m werden weitere Koordinatenpaare als L/l gelesen
+        if command in 'Mm':
+            command = 'L' if command == 'M' else 'l'
+        pos = _SEPARATOR.match(d, pos).end()
+    return commands
+
+
+def _parse_simple(d):
+    """parse_path für Pfade ohne Bögen: alle Zahlen auf einmal per findall (schnell)"""
+    commands = []
+    command = None
+    numbers = []
+
+    def flush():
+        if command is None:
+            if numbers:
+                raise ValueError("Pfad beginnt nicht mit einem Befehl")
+            return
+        count = _ARGS[command.upper()]
+        if count == 0 or len(numbers) % count or not numbers:
+            if count or numbers:
+                raise ValueError(f"Falsche Anzahl Zahlen für {command}")
+            commands.append((command, []))
+            return
+        repeat = command
+        for i in range(0, len(numbers), count):
+            commands.append((repeat, numbers[i:i + count]))
+            # Nach M/m werden weitere Koordinatenpaare als L/l gelesen
+            if repeat in 'Mm':
+                repeat = 'L' if repeat == 'M' else 'l'
+
+    for cmd, num in _TOKEN.findall(d):
+        if cmd:
+            flush()
+            command = cmd
+            numbers = []
+        else:
+            numbers.append(float(num))
+    flush()
+    return commands
+
+
+def relative_path(d, precision=3, offset=(0.0, 0.0)):
+    """Pfad mit relativen Befehlen und gerundeten Koordinaten, um offset verschoben.
+
+    ValueError bei Syntaxfehlern (siehe parse_path).
+    """
+    commands = parse_path(d)
+    scale = 10 ** precision
+    dx, dy = offset
+    # gerundete absolute Koordinaten in ganzen Schritten
+    qx_of = lambda v: round((v + dx) * scale)
+    qy_of = lambda v: round((v + dy) * scale)
+    num = lambda steps: fmt(steps / scale, precision)
+
+    out = []
+    last = None
+    tail = ''
+    x = y = 0.0          # exakte aktuelle Position
+    qx = qy = 0          # gerundete aktuelle Position, Basis der relativen Werte
+    start = (0.0, 0.0, 0, 0)
+
+    def emit(letter, numbers):
+        nonlocal last, tail
+        # Buchstabe entfällt bei Wiederholung; nach m gilt ein Koordinatenpaar als l
+        if letter == 'm' or (letter != last and not (letter == 'l' and last == 'm')):
+            out.append(letter + join_numbers(numbers))
+        else:
+            out.append(join_numbers([tail] + numbers)[len(tail):])
+        last = letter
+        tail = numbers[-1]
+
+    for command, args in commands:
+        upper = command.upper()
+        relative = command != upper
+        if upper == 'Z':
+            out.append('z')
+            last = 'z'
+            x, y, qx, qy = start
+            continue
+        # Alle Punkte absolut machen
+        if upper == 'H':
+            points = [(args[0] + x if relative else args[0], y)]
+        elif upper == 'V':
+            points = [(x, args[0] + y if relative else args[0])]
+        elif upper == 'A':
+            points = [(args[5] + x if relative else args[5], args[6] + y if relative else args[6])]
+        else:
+            points = [(args[i] + x if relative else args[i], args[i + 1] + y if relative else args[i + 1])
+                      for i in range(0, len(args), 2)]
+        ex, ey = points[-1]
+        qex, qey = qx_of(ex), qy_of(ey)
+
+        if upper == 'A':
+            numbers = [fmt(args[0], precision), fmt(args[1], precision), fmt(args[2], precision),
+                       '1' if args[3] else '0', '1' if args[4] else '0', num(qex - qx), num(qey - qy)]
+            emit('a', numbers)
+        elif upper in 'LHV':
+            if qey == qy and qex != qx:
+                emit('h', [num(qex - qx)])
+            elif qex == qx and qey != qy:
+                emit('v', [num(qey - qy)])
+            else:
+                emit('l', [num(qex - qx), num(qey - qy)])
+        else:
+            numbers = []
+            for px, py in points:
+                numbers += [num(qx_of(px) - qx), num(qy_of(py) - qy)]
+            emit(upper.lower(), numbers)
+
+        x, y, qx, qy = ex, ey, qex, qey
+        if upper == 'M':
+            start = (x, y, qx, qy)
+    return ''.join(out)
+
+
+def compact_transform(value, precision=3):
+    """Zahlen in transform runden; Faktoren (matrix a-d, scale, rotate) genauer als Verschiebungen."""
+    def function(match):
+        name, body = match.group(1), match.group(2)
+        numbers = [float(n) for n in _NUMBER.findall(body)]
+        digits = [precision + _FACTOR_DIGITS] * len(numbers)
+        if name == 'translate':
+            digits = [precision] * len(numbers)
+        elif name == 'matrix':
+            digits[4:] = [precision] * len(digits[4:])
+        return f'{name}(' + join_numbers([fmt(n, p) for n, p in zip(numbers, digits)]) + ')'
+    return re.sub(r'(\w+)\s*\(([^)]*)\)', function, value)
+
+
+def translation(transform):
+    """(e, f) wenn transform eine reine Verschiebung ist (auch die Identität), sonst None."""
+    match = re.fullmatch(r'\s*(matrix|translate)\s*\(([^)]*)\)\s*', transform)
+    if not match:
+        return None
+    numbers = [float(n) for n in _NUMBER.findall(match.group(2))]
+    if match.group(1) == 'translate':
+        return (numbers[0], numbers[1] if len(numbers) > 1 else 0.0) if numbers else None
+    if len(numbers) == 6 and numbers[:4] == [1, 0, 0, 1]:
+        return numbers[4], numbers[5]
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def compact_style(style):
+    """Stil als CSS-Regelkörper: ohne Leerzeichen, ohne abschließendes ';', Farben kurz (#ff0000 → #f00)."""
+    rules = [part.strip() for part in style.split(';') if part.strip()]
+    rules = [':'.join(s.strip() for s in rule.split(':', 1)) for rule in rules]
+    return _LONG_COLOR.sub(r'#\1\2\3', ';'.join(rules))
+
+
+def class_names():
+    """a, b, ..., z, aa, ab, ... (gültige CSS-Klassennamen, die häufigsten bekommen die kürzesten)"""
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    length = 1
+    while True:
+        for i in range(len(letters) ** length):
+            name = ''
+            for _ in range(length):
+                i, r = divmod(i, len(letters))
+                name = letters[r] + name
+            yield name
+        length += 1
+
+
+def compact_svg(svg_text, precision=3):
+    """SVG-Text aus build_svg in die kompakte Form bringen (siehe Modulbeschreibung)."""
+    if precision < 0:
+        raise ValueError(f"precision muss >= 0 sein, nicht {precision}")
+    styles = Counter()
+    for value, count in Counter(re.findall(r' style="([^"]*)"', svg_text)).items():
+        styles[compact_style(value)] += count
+    classes = dict(zip((style for style, _ in styles.most_common()), class_names()))
+
+    def tag(match):
+        name = match.group(1)
+        attrs = dict(_ATTR.findall(match.group(2)))
+        offset = None
+        if name in _POSITION_ATTRS and 'transform' in attrs:
+            offset = translation(attrs['transform'])
+        if offset is not None:
+            if name == 'path':
+                try:
+                    attrs['d'] = relative_path(attrs.get('d', ''), precision, offset)
+                except ValueError:
+                    offset = None
+            else:
+                # Erst alle Werte lesen: scheitert einer, bleiben Position und transform unverändert
+                keys = _POSITION_ATTRS[name]
+                try:
+                    values = [float(attrs.get(key, 0)) + delta for key, delta in zip(keys, offset)]
+                except ValueError:
+                    offset = None
+                else:
+                    attrs.update((key, fmt(value, precision)) for key, value in zip(keys, values))
+            if offset is not None:
+                del attrs['transform']
+        elif 'd' in attrs:
+            try:
+                attrs['d'] = relative_path(attrs['d'], precision)
+            except ValueError:
+                pass  # unverändert lassen, der Renderer meldet den Fehler wie bisher
+
+        parts = []
+        for key, value in attrs.items():
+            if key == 'style':
+                key, value = 'class', classes[compact_style(value)]
+            elif key == 'transform':
+                value = compact_transform(value, precision)
+            elif key == 'viewBox':
+                value = ' '.join(fmt(float(n), precision) for n in _NUMBER.findall(value))
+            elif key in _LENGTH_ATTRS:
+                try:
+                    value = fmt(float(value), precision)
+                except ValueError:
+                    pass  # z.B. width="auto"
+                if value == '0' and key in _ZERO_DEFAULT.get(name, ()):
+                    continue
+            parts.append(f'{key}="{value}"')
+        return f'<{name}' + ''.join(' ' + part for part in parts) + match.group(3) + '>'
+
+    text = _TAG.sub(tag, _BETWEEN_TAGS.sub('><', svg_text))
+    if classes:
+        css = ''.join(f'.{name}{{{style}}}' for style, name in classes.items())
+        # Direkt nach dem öffnenden <svg>, vor <defs> und den Shapes
+        svg_open = re.search(r'<svg\b[^>]*>', text).end()
+        text = text[:svg_open] + f'<style>{css}</style>' + text[svg_open:]
+    return text
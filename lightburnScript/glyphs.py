@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+glyphs.py
+
+Text-Shapes als Umriss-Pfade statt <text>: die Glyphen kommen direkt aus der
+Schriftdatei (fontTools), damit das Ergebnis auf jedem Rechner gleich aussieht
+und Qt/cairo beim Rendern keine Schrift suchen und setzen müssen.
+
+- FontLibrary: findet die Schriftdatei zu Familie + Bold/Italic (Index der
+  Schriftordner, auf der Platte zwischengespeichert)
+- GlyphCache: Pfad + Vorschubbreite pro (Schrift, Größe, Zeichen), LRU im
+  Speicher und optional als JSON auf der Platte
+- text_to_svg: Zeilen zentriert setzen wie bisher das <text>-Element
+  (text-anchor:middle, Zeilenabstand 1.2em); jede Glyphe wird einmal in <defs>
+  abgelegt und per <use> platziert
+
+Ohne fontTools oder ohne passende Schrift liefert text_to_svg None, script.py
+schreibt dann wie bisher ein <text>-Element.
+
+    pip install fonttools
+    python script.py --glyph-cache ~/.cache/lightburn-glyphs schild.lbrn2
+"""
+
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+from pathlib import Path
+
+LINE_HEIGHT = 1.2   # wie dy="1.2em" im <text>-Element
+
+# Ersatz, falls die Schrift aus der Datei nicht installiert ist
+FALLBACK_FAMILIES = ('arial', 'helvetica', 'liberation sans', 'dejavu sans', 'noto sans')
+
+FONT_SUFFIXES = ('.ttf', '.otf', '.ttc')
+
+
+def _num(v):
+    """Koordinate kompakt formatieren (3 Nachkommastellen, ohne überflüssige Nullen)."""
+    text = f'{v:.3f}'.rstrip('0').rstrip('.')
+    return '0' if text in ('-0', '') else text
+
+
+def default_font_dirs():
+    home = Path.home()
+    if sys.platform == 'win32':
+        dirs = [Path(os.environ.get('WINDIR', r'C:\Windows')) / 'Fonts',
+                home / 'AppData' / 'Local' / 'Microsoft' / 'Windows' / 'Fonts']
+    elif sys.platform == 'darwin':
+        dirs = [Path('/System/Library/Fonts'), Path('/Library/Fonts'), home / 'Library' / 'Fonts']
+    else:
+        dirs = [Path('/usr/share/fonts'), Path('/usr/local/share/fonts'),
+                home / '.local' / 'share' / 'fonts', home / '.fonts']
+    extra = os.environ.get('LIGHTBURN_FONT_DIRS')
+    if extra:
+        dirs = [Path(d) for d in extra.split(os.pathsep) if d] + dirs
+    return dirs
+
+
+def default_cache_dir():
+    """Platten-Cache für Schrift-Index und Glyphen im Cache-Ordner des Benutzers."""
+    home = Path.home()
+    if sys.platform == 'win32':
+        base = Path(os.environ.get('LOCALAPPDATA') or home / 'AppData' / 'Local')
+    elif sys.platform == 'darwin':
+        base = home / 'Library' / 'Caches'
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME') or home / '.cache')
+    return base / 'lightburn-glyphs'
+
+
+def parse_font_attr(font_attr, elem=None):
+    """LightBurn 'Font'-Attribut (QFont::toString) → (Familie, bold, italic).
+
+    Format: Familie,Punktgröße,Pixelgröße,StyleHint,Gewicht,Kursiv,...
+    Qt 5 schreibt Gewicht 50/75, Qt 6 400/700. Bold/Italic-Attribute am Shape haben Vorrang.
+    """
+    parts = (font_attr or '').split(',')
+    family = parts[0].strip() or 'Arial'
+    bold = italic = False
+    if len(parts) > 5:
+        try:
+            weight = int(parts[4])
+            bold = weight >= 600 or 63 <= weight <= 99
+            italic = parts[5].strip() not in ('0', '')
+        except ValueError:
+            pass
+    if elem is not None:
+        if elem.get('Bold') is not None:
+            bold = elem.get('Bold') in ('1', 'true', 'True')
+        if elem.get('Italic') is not None:
+            italic = elem.get('Italic') in ('1', 'true', 'True')
+    return family, bold, italic
+
+
+class FontLibrary:
+    """Index Familie → Schriftdateien über alle Schriftordner.
+
+    Das Einlesen der Namen kostet bei vielen installierten Schriften spürbar Zeit -
+    mit cache_dir wird der Index gespeichert und nur bei geänderten Ordnern neu gebaut.
+    Ohne gültigen Index werden zuerst die Dateien gelesen, deren Name zur gesuchten
+    Familie passt (DejaVuSans-Bold.ttf für 'DejaVu Sans'); alle übrigen nur, wenn die
+    Familie dort nicht dabei ist.
+    """
+
+    def __init__(self, font_dirs=None, cache_dir=None):
+        self.font_dirs = [Path(d).expanduser() for d in (font_dirs or [])] + default_font_dirs()
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+        self._index = None     # Familie (klein) → {(bold, italic): [Pfad, Font-Nummer]}
+        self._complete = False
+        self._files = None     # noch nicht gelesene Schriftdateien
+        self._stamp_value = None
+        self._resolved = {}
+
+    def _stamp(self):
+        # Änderungszeiten aller (Unter-)Ordner: neue oder gelöschte Schriften ändern sie
+        stamp = []
+        for d in self.font_dirs:
+            for root, _dirs, _files in os.walk(d):
+                stamp.append(f'{root}:{os.stat(root).st_mtime_ns}')
+        return hashlib.sha1('|'.join(stamp).encode('utf-8')).hexdigest()
+
+    def _font_files(self):
+        files = []
+        for d in self.font_dirs:
+            if d.is_dir():
+                files.extend(path for path in sorted(d.rglob('*')) if path.suffix.lower() in FONT_SUFFIXES)
+        return files
+
+    def _add_file(self, path, index):
+        from fontTools.ttLib import TTFont, TTCollection
+
+        try:
+            if path.suffix.lower() == '.ttc':
+                fonts = list(enumerate(TTCollection(str(path), lazy=True).fonts))
+            else:
+                fonts = [(-1, TTFont(str(path), lazy=True))]
+        except Exception:
+            return
+        for number, font in fonts:
+            try:
+                family = font['name'].getBestFamilyName()
+                os2 = font['OS/2']
+                bold = os2.usWeightClass >= 600 or bool(os2.fsSelection & 0x20)
+                italic = bool(os2.fsSelection & 0x01)
+            except Exception:
+                continue
+            if family:
+                styles = index.setdefault(family.lower(), {})
+                styles.setdefault(f'{int(bold)}{int(italic)}', [str(path), number])
+
+    def _build_index(self):
+        index = {}
+        for path in self._font_files():
+            self._add_file(path, index)
+        return index
+
+    def _load_cached(self):
+        """Gespeicherten Index laden, falls die Schriftordner unverändert sind."""
+        if self.cache_dir is None:
+            return False
+        self._stamp_value = self._stamp()
+        try:
+            cached = json.loads((self.cache_dir / 'font-index.json').read_text(encoding='utf-8'))
+            if cached.get('stamp') == self._stamp_value:
+                self._index = cached['fonts']
+                self._complete = True
+                return True
+        except (OSError, ValueError, KeyError):
+            pass
+        return False
+
+    def _scan(self, family=None):
+        """Noch nicht gelesene Dateien einlesen: nur die zur Familie passenden, ohne family alle."""
+        if self._files is None:
+            self._files = self._font_files()
+            self._index = {}
+        if family is None:
+            todo, self._files = self._files, []
+        else:
+            wanted = ''.join(family.lower().split())
+            todo = [p for p in self._files if wanted in p.stem.lower().replace(' ', '')]
+            done = set(todo)
+            self._files = [p for p in self._files if p not in done]
+        for path in todo:
+            self._add_file(path, self._index)
+        if self._files:
+            return
+        self._complete = True
+        if self.cache_dir is not None:
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                stamp = self._stamp_value or self._stamp()
+                (self.cache_dir / 'font-index.json').write_text(
+                    json.dumps({'stamp': stamp, 'fonts': self._index}), encoding='utf-8')
+            except OSError:
+                pass
+
+    def index(self):
+        """Vollständiger Index (liest bei Bedarf alle Schriftordner)."""
+        if not self._complete and not (self._index is None and self._load_cached()):
+            self._scan()
+        return self._index
+
+    def find(self, family, bold=False, italic=False):
+        """(Pfad, Font-Nummer) zur Familie, Ersatzschrift falls nicht installiert, sonst None."""
+        key = (family.lower(), bold, italic)
+        if key in self._resolved:
+            return self._resolved[key]
+        if self._index is None:
+            self._load_cached()
+        if not self._complete:
+            self._scan(family)
+            if family.lower() not in self._index:
+                self._scan()
+        index = self._index
+        found = None
+        for name in (family.lower(),) + FALLBACK_FAMILIES:
+            styles = index.get(name)
+            if not styles:
+                continue
+            # Gewünschten Schnitt, sonst ohne Kursiv, sonst Normal, sonst irgendeinen
+            for style in (f'{int(bold)}{int(italic)}', f'{int(bold)}0', '00'):
+                if style in styles:
+                    found = tuple(styles[style])
+                    break
+            else:
+                found = tuple(next(iter(styles.values())))
+            if name != family.lower():
+                print(f"Schrift '{family}' nicht gefunden, verwende '{name}'")
+            break
+        self._resolved[key] = found
+        return found
+
+
+class GlyphCache:
+    """Glyphen-Umrisse pro (Schrift, Größe, Zeichen): SVG-Pfad bei Ursprung 0/0 + Vorschub.
+
+    Im Speicher als LRU (maxsize Einträge); mit cache_dir zusätzlich eine JSON-Datei
+    pro Schrift und Größe, die beim ersten Zugriff geladen und mit save() geschrieben wird.
+    """
+
+    def __init__(self, maxsize=4096, cache_dir=None):
+        self.maxsize = maxsize
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else None
+        self._entries = OrderedDict()
+        self._fonts = {}          # (Pfad, Nummer) → TTFont
+        self._disk = {}           # (Pfad, Nummer, Größe) → {Zeichen: [d, Vorschub]}
+        self._dirty = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _font(self, font):
+        tt = self._fonts.get(font)
+        if tt is None:
+            from fontTools.ttLib import TTFont
+            path, number = font
+            tt = TTFont(path, fontNumber=number, lazy=True)
+            self._fonts[font] = tt
+        return tt
+
+    def _disk_file(self, font, size):
+        path, number = font
+        try:
+            mtime = Path(path).stat().st_mtime_ns
+        except OSError:
+            mtime = 0
+        key = f'{path}|{number}|{mtime}|{size}'
+        return self.cache_dir / f'{hashlib.sha1(key.encode("utf-8")).hexdigest()}.json'
+
+    def _disk_table(self, font, size):
+        key = (font, size)
+        table = self._disk.get(key)
+        if table is None:
+            table = {}
+            try:
+                table = json.loads(self._disk_file(font, size).read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                pass
+            self._disk[key] = table
+        return table
+
+    def _outline(self, font, size, char):
+        from fontTools.pens.svgPathPen import SVGPathPen
+        from fontTools.pens.transformPen import TransformPen
+
+        tt = self._font(font)
+        glyph_set = tt.getGlyphSet()
+        name = tt.getBestCmap().get(ord(char)) or '.notdef'
+        glyph = glyph_set[name]
+        scale = size / tt['head'].unitsPerEm
+        pen = SVGPathPen(glyph_set, ntos=_num)
+        # Schrift-Koordinaten zeigen nach oben, SVG nach unten
+        glyph.draw(TransformPen(pen, (scale, 0, 0, -scale, 0, 0)))
+        return pen.getCommands(), glyph.width * scale
+
+    def get(self, font, size, char):
+        """(Pfad-Daten, Vorschub) für ein Zeichen"""
+        key = (font, size, char)
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+        self.misses += 1
+        table = self._disk_table(font, size) if self.cache_dir is not None else None
+        if table is not None and char in table:
+            entry = tuple(table[char])
+        else:
+            entry = self._outline(font, size, char)
+            if table is not None:
+                table[char] = list(entry)
+                self._dirty.add((font, size))
+        self._entries[key] = entry
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def save(self):
+        """Neue Glyphen in den Platten-Cache schreiben."""
+        if self.cache_dir is None or not self._dirty:
+            return
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for font, size in self._dirty:
+            path = self._disk_file(font, size)
+            tmp = path.with_suffix('.tmp')
+            tmp.write_text(json.dumps(self._disk[(font, size)]), encoding='utf-8')
+            os.replace(tmp, path)
+        self._dirty.clear()
+
+
+# Gemeinsame Instanzen, damit Stapel-Exporte (GUI, mehrere Dateien) den Cache teilen
+_library = None
+_cache = None
+_available = None
+
+
+def configure(font_dirs=None, cache_dir=None, maxsize=4096):
+    """Schriftordner und Platten-Cache festlegen (vor dem ersten text_to_svg).
+
+    cache_dir: Standard $LIGHTBURN_GLYPH_CACHE, sonst default_cache_dir(); '' schaltet ab.
+    """
+    global _library, _cache
+    if cache_dir is None:
+        cache_dir = os.environ.get('LIGHTBURN_GLYPH_CACHE', default_cache_dir())
+    _library = FontLibrary(font_dirs, cache_dir)
+    _cache = GlyphCache(maxsize, cache_dir)
+    return _cache
+
+
+def available():
+    """True, wenn fontTools installiert ist (importiert wird erst für neue Glyphen)."""
+    global _available
+    if _available is None:
+        from importlib.util import find_spec
+        _available = find_spec('fontTools') is not None
+    return _available
+
+
+def glyph_cache():
+    if _cache is None:
+        configure()
+    return _cache
+
+
+def save_cache():
+    if _cache is not None:
+        _cache.save()
+
+
+def layout_text(text, font_attr, size, elem=None):
+    """Glyphen eines Texts mit Position, None wenn fontTools oder die Schrift fehlt.
+
+    Gibt (font_key, [(Zeichen, Pfad-Daten, x, y)]) zurück, jede Zeile um x=0 zentriert
+    wie text-anchor:middle. Grundlage für text_to_svg und die Schnittlängen in stats.py.
+    """
+    if not available() or size <= 0:
+        return None
+    cache = glyph_cache()
+    family, bold, italic = parse_font_attr(font_attr, elem)
+    font = _library.find(family, bold, italic)
+    if font is None:
+        return None
+    size = round(size, 3)
+
+    font_key = hashlib.sha1(f'{font[0]}|{font[1]}|{size}'.encode('utf-8')).hexdigest()[:8]
+    placed = []
+    for line_no, line in enumerate(text.split('\n')):
+        glyphs = []
+        x = 0.0
+        for char in line:
+            d, advance = cache.get(font, size, char)
+            if d:
+                glyphs.append((char, d, x))
+            x += advance
+        # Zentriert wie text-anchor:middle
+        offset = -x / 2
+        y = line_no * LINE_HEIGHT * size
+        placed.extend((char, d, gx + offset, y) for char, d, gx in glyphs)
+    return font_key, placed
+
+
+def text_to_svg(text, font_attr, size, style, transform, defs, elem=None):
+    """Text als <g> mit <use>-Verweisen auf Glyphen in defs, None wenn nicht möglich.
+
+    defs: Dictionary id → SVG-Element, wird von build_svg in <defs> geschrieben.
+    """
+    layout = layout_text(text, font_attr, size, elem)
+    if layout is None:
+        return None
+    font_key, placed = layout
+    parts = []
+    for char, d, x, y in placed:
+        glyph_id = f'g{font_key}-{ord(char):x}'
+        if glyph_id not in defs:
+            defs[glyph_id] = f'<path id="{glyph_id}" d="{d}" />'
+        # xlink:href, weil QtSvg das einfache href bei <use> nicht kennt
+        parts.append(f'<use xlink:href="#{glyph_id}" x="{_num(x)}" y="{_num(y)}" />')
+    if not parts:
+        return ''
+    tr = f' transform="{transform}"' if transform else ''
+    return f'<g style="{style}"{tr}>' + ''.join(parts) + '</g>'
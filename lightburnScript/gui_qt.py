@@ -29,7 +29,7 @@ except Exception as e:
     sys.exit(1)
 
 try:
-    from script import build_svg, write_png
+    from script import build_svg, write_png, save_glyph_cache, scan_thumbnail, write_thumbnail
 except Exception as e:
     print("Fehler: Konnte Funktionen aus script.py nicht importieren. Stelle sicher, dass script.py im selben Ordner liegt.")
     sys.exit(1)
@@ -135,6 +135,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.overwrite_chk.setChecked(True)
         right_layout.addRow("", self.overwrite_chk)
 
+        self.thumb_only_chk = QtWidgets.QCheckBox("Nur Vorschaubild (schnell)")
+        right_layout.addRow("", self.thumb_only_chk)
+
+        self.layers_edit = QtWidgets.QLineEdit()
+        self.layers_edit.setPlaceholderText("alle (z.B. 0,2 oder C05)")
+        right_layout.addRow("Nur Ebenen:", self.layers_edit)
+
         # Export button
         export_btn = QtWidgets.QPushButton("Export starten")
         export_btn.clicked.connect(self.export)
@@ -189,6 +196,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
         subdir_name = self.subdir_edit.text().strip() or "png"
         overwrite = self.overwrite_chk.isChecked()
+        thumb_only = self.thumb_only_chk.isChecked()
+        layers = self.layers_edit.text().strip() or None
 
         paths: List[Path] = [Path(self.list_widget.item(i).text()) for i in range(count)]
 
@@ -205,7 +214,18 @@ class MainWindow(QtWidgets.QMainWindow):
                     self.log_msg(f"  – Übersprungen (existiert bereits): {out_path}")
                     continue
 
-                svg_text, has_elems, thumb_b64 = build_svg(in_path, out_dir)
+                if thumb_only:
+                    # Nur Byte-Suche nach dem Thumbnail, kein XML-Parser
+                    raw, _canvas = scan_thumbnail(in_path)
+                    if raw:
+                        size = write_thumbnail(raw, out_path)
+                        self.log_msg(f"  – PNG exportiert (Thumbnail {size[0]}x{size[1]}): {out_path}")
+                        ok += 1
+                    else:
+                        self.log_msg("  ! Kein Thumbnail gefunden.")
+                    continue
+
+                svg_text, has_elems, thumb_b64 = build_svg(in_path, out_dir, layers=layers)
                 if has_elems:
                     try:
                         write_png(svg_text, out_path, out_dir)
@@ -217,8 +237,8 @@ class MainWindow(QtWidgets.QMainWindow):
                 elif thumb_b64:
                     try:
                         raw = base64.b64decode(''.join(thumb_b64.split()))
-                        out_path.write_bytes(raw)
-                        self.log_msg(f"  – PNG exportiert (Thumbnail): {out_path}")
+                        size = write_thumbnail(raw, out_path)
+                        self.log_msg(f"  – PNG exportiert (Thumbnail {size[0]}x{size[1]}): {out_path}")
                         ok += 1
                     except Exception as e:
                         self.log_msg("  ! Konnte Thumbnail nicht schreiben: " + str(e))
@@ -227,6 +247,7 @@ class MainWindow(QtWidgets.QMainWindow):
             except Exception as e:
                 self.log_msg(f"  ! Unerwarteter Fehler: {e}")
 
+        save_glyph_cache()
         self.log_msg(f"Fertig. Erfolgreich: {ok}/{total}")
 
 
@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Lokaler HTTP-Dienst, der LightBurn-Dateien zu PNG rendert.
+
+Statt für jede Vorschau script.py neu zu starten (Interpreter, Imports, Qt-Init),
+läuft ein Prozess dauerhaft und verteilt die Arbeit auf einen festen Pool von
+Worker-Prozessen, die Qt und den Glyphen-Cache einmal laden.
+
+- Gleiche Anfragen (SHA-256 der Datei + Einstellungen), die gleichzeitig eintreffen,
+  werden zu einem Render zusammengefasst; fertige PNGs liegen in einem LRU-Cache.
+- Die Warteschlange ist begrenzt, volle Warteschlange -> 503 mit Retry-After.
+- /metrics liefert p50/p99 der Antwortzeit, der Wartezeit im Pool und der Renderzeit.
+
+Aufruf:
+    python render_server.py                          # http://127.0.0.1:8765
+    python render_server.py --workers 4 --cache-mb 512 --root /srv/jobs
+
+Anfragen:
+    GET  /render?path=/pfad/datei.lbrn2[&text=paths|text][&thumbnail=1][&layers=0,2]
+    POST /render[?text=...&thumbnail=1]   (Body: Inhalt der .lbrn2-Datei)
+    GET  /health, GET /metrics
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+HERE = Path(__file__).resolve().parent
+
+CHUNK_SIZE = 64 * 1024
+SAMPLES = 4096  # Messwerte pro Kennzahl für die Perzentile
+
+
+class RenderError(Exception):
+    """Datei lässt sich nicht rendern (kein Inhalt, kein Thumbnail, kein Backend)."""
+
+
+class QueueFull(Exception):
+    """Alle Plätze der Warteschlange sind belegt."""
+
+
+# --- Worker-Prozess ---------------------------------------------------------
+
+def init_worker(font_dirs, glyph_cache):
+    """Einmal pro Worker: Qt ohne Display, Schriften und Glyphen-Cache, Backend vorladen."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    if str(HERE) not in sys.path:
+        sys.path.insert(0, str(HERE))
+    import script
+    if font_dirs or glyph_cache:
+        import glyphs
+        glyphs.configure(font_dirs=font_dirs, cache_dir=glyph_cache)
+    try:
+        script.load_qt()
+    except ImportError:
+        pass  # render_png versucht dann CairoSVG
+
+
+def render_job(data, text_as_paths, thumbnail_only, base_dir, layers=None):
+    """Im Worker: rendert den Dateiinhalt, gibt (PNG-Bytes, Renderzeit s, Quelle) zurück."""
+    import xml.etree.ElementTree as ET
+    import script
+
+    start = time.perf_counter()
+    if thumbnail_only:
+        raw, _canvas = script.find_thumbnail(data)
+        if not raw:
+            raise RenderError("Kein Thumbnail gefunden")
+        png, _size = script.thumbnail_png(raw)
+        return png, time.perf_counter() - start, 'Thumbnail'
+
+    try:
+        svg_text, has_elems, thumb_b64 = script.build_svg(io.BytesIO(data), Path(base_dir), text_as_paths, layers)
+    except ET.ParseError as e:
+        raise RenderError(f"Keine gültige LightBurn-Datei: {e}")
+    except ValueError as e:
+        raise RenderError(str(e))  # Unbekannte Ebene
+    script.save_glyph_cache()
+    try:
+        if has_elems:
+            png, source = script.render_png(svg_text, Path(base_dir))
+        elif thumb_b64:
+            png, _size = script.thumbnail_png(base64.b64decode(''.join(thumb_b64.split())))
+            source = 'Thumbnail'
+        else:
+            raise RenderError("Keine erkennbaren Vektorelemente und kein Thumbnail gefunden")
+    except RuntimeError as e:
+        raise RenderError(str(e))
+    return png, time.perf_counter() - start, source
+
+
+# --- Dienst -----------------------------------------------------------------
+
+def summary(samples):
+    """Kennzahlen in ms für eine Messreihe in Sekunden"""
+    if not samples:
+        return {'count': 0}
+    ordered = sorted(samples)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000
+    return {
+        'count': len(ordered),
+        'mean': sum(ordered) / len(ordered) * 1000,
+        'p50': pick(50),
+        'p90': pick(90),
+        'p99': pick(99),
+        'max': ordered[-1] * 1000,
+    }
+
+
+def normalize_layers(layers):
+    """Ebenen-Auswahl aus der Query ('1, 2,C05') in eine eindeutige Form ('1,2,c05'), None wenn leer.
+
+    Gleiche Auswahl in anderer Schreibweise trifft so denselben Cache-Eintrag; Namen
+    vergleicht LayerTable ohnehin ohne Groß-/Kleinschreibung.
+    """
+    if not layers:
+        return None
+    tokens = {str(int(t)) if t.isdigit() else t.lower()
+              for t in (t.strip() for t in layers.split(',')) if t}
+    return ','.join(sorted(tokens)) or None
+
+
+class RenderService:
+    """Worker-Pool mit Zusammenfassen gleicher Anfragen und Ergebnis-Cache"""
+
+    def __init__(self, workers=None, max_queue=64, cache_bytes=256 * 1024 * 1024,
+                 font_dirs=None, glyph_cache=None):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_queue = max_queue
+        self.cache_limit = cache_bytes
+        self.worker_args = (font_dirs or [], glyph_cache)
+        self.pool = self._new_pool()
+        self.lock = threading.Lock()
+        self.inflight = {}          # Schlüssel -> Future des laufenden Renders
+        self.cache = OrderedDict()  # Schlüssel -> PNG-Bytes
+        self.cache_bytes = 0
+        self.counts = {'requests': 0, 'cache_hits': 0, 'not_modified': 0, 'coalesced': 0,
+                       'renders': 0, 'errors': 0, 'rejected': 0, 'pool_restarts': 0}
+        self.latency = deque(maxlen=SAMPLES)
+        self.queue_wait = deque(maxlen=SAMPLES)
+        self.render_time = deque(maxlen=SAMPLES)
+        self.started = time.time()
+
+    def _new_pool(self):
+        return ProcessPoolExecutor(self.workers, initializer=init_worker, initargs=self.worker_args)
+
+    def _restart_pool(self, broken):
+        """Unter self.lock: einen abgestürzten Pool ersetzen, nur einmal, auch wenn ihn mehrere Anfragen bemerken"""
+        if self.pool is broken:
+            # Ein gestorbener Worker (Speicher, Qt-Absturz) macht den ganzen Pool unbrauchbar
+            print("Worker-Prozess abgestürzt, Pool wird neu gestartet", file=sys.stderr)
+            self.pool = self._new_pool()
+            self.counts['pool_restarts'] += 1
+
+    def warm_up(self):
+        """Alle Worker starten, damit die erste Anfrage nicht den Qt-Start bezahlt"""
+        for future in [self.pool.submit(time.sleep, 0.05) for _ in range(self.workers)]:
+            future.result()
+
+    def key(self, data, text_as_paths=True, thumbnail_only=False, layers=None):
+        """Cache-Schlüssel (auch ETag) aus Dateiinhalt und Optionen; layers siehe normalize_layers"""
+        key = f"{hashlib.sha256(data).hexdigest()}-{'p' if text_as_paths else 't'}{'T' if thumbnail_only else ''}"
+        if layers and not thumbnail_only:  # Das Thumbnail hängt nicht von der Ebenen-Auswahl ab
+            key += '-L' + layers
+        return key
+
+    def not_modified(self):
+        """Bedingte Anfrage mit passendem ETag, beantwortet ohne Rendern"""
+        with self.lock:
+            self.counts['requests'] += 1
+            self.counts['not_modified'] += 1
+
+    def render(self, data, text_as_paths=True, thumbnail_only=False, base_dir='.', layers=None, key=None):
+        """PNG-Bytes für einen Dateiinhalt, gibt (Bytes, 'cache'|'coalesced'|'render', Schlüssel) zurück"""
+        layers = normalize_layers(layers)
+        key = key or self.key(data, text_as_paths, thumbnail_only, layers)
+        with self.lock:
+            self.counts['requests'] += 1
+            png = self.cache.get(key)
+            if png is not None:
+                self.cache.move_to_end(key)
+                self.counts['cache_hits'] += 1
+                return png, 'cache', key
+            future = self.inflight.get(key)
+            if future is not None:
+                self.counts['coalesced'] += 1
+                origin = 'coalesced'
+            else:
+                if len(self.inflight) >= self.max_queue:
+                    self.counts['rejected'] += 1
+                    raise QueueFull()
+                submitted = time.perf_counter()
+                job = (render_job, data, text_as_paths, thumbnail_only, str(base_dir), layers)
+                pool = self.pool
+                try:
+                    future = pool.submit(*job)
+                except BrokenProcessPool:
+                    self._restart_pool(pool)
+                    pool = self.pool
+                    future = pool.submit(*job)
+                self.inflight[key] = future
+                origin = 'render'
+        if origin == 'render':
+            future.add_done_callback(lambda f: self._finished(key, f, submitted, pool))
+        try:
+            png, _render_s, _source = future.result()
+        except BrokenProcessPool:
+            raise RenderError("Worker-Prozess abgestürzt (Speicher, defekte Datei?), Pool neu gestartet")
+        return png, origin, key
+
+    def _finished(self, key, future, submitted, pool):
+        elapsed = time.perf_counter() - submitted
+        with self.lock:
+            self.inflight.pop(key, None)
+            if future.exception() is not None:
+                self.counts['errors'] += 1
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self._restart_pool(pool)
+                return
+            png, render_s, _source = future.result()
+            self.counts['renders'] += 1
+            self.render_time.append(render_s)
+            # Rest der Zeit: Warten auf einen freien Worker plus Übertragung zum Prozess
+            self.queue_wait.append(max(0.0, elapsed - render_s))
+            if len(png) <= self.cache_limit:
+                self.cache[key] = png
+                self.cache_bytes += len(png)
+                while self.cache_bytes > self.cache_limit:
+                    _old, old_png = self.cache.popitem(last=False)
+                    self.cache_bytes -= len(old_png)
+
+    def record_latency(self, seconds):
+        with self.lock:
+            self.latency.append(seconds)
+
+    def metrics(self):
+        with self.lock:
+            return {
+                'uptime_s': time.time() - self.started,
+                'workers': self.workers,
+                'queue': len(self.inflight),
+                'max_queue': self.max_queue,
+                'cache': {'entries': len(self.cache), 'bytes': self.cache_bytes, 'limit': self.cache_limit},
+                **self.counts,
+                'latency_ms': summary(self.latency),
+                'queue_wait_ms': summary(self.queue_wait),
+                'render_ms': summary(self.render_time),
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class RenderHandler(BaseHTTPRequestHandler):
+    server_version = 'LightBurnRender/1.0'
+    protocol_version = 'HTTP/1.1'  # Keep-Alive für den Front-End-Client
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/health':
+            self.send_json(HTTPStatus.OK, {'status': 'ok'})
+        elif url.path == '/metrics':
+            self.send_json(HTTPStatus.OK, self.server.service.metrics())
+        elif url.path == '/render':
+            params = parse_qs(url.query)
+            path = params.get('path', [None])[0]
+            if not path:
+                return self.send_json(HTTPStatus.BAD_REQUEST, {'error': "Parameter 'path' fehlt"})
+            in_path = Path(path).expanduser().resolve()
+            root = self.server.root
+            if root is not None and not in_path.is_relative_to(root):
+                return self.send_json(HTTPStatus.FORBIDDEN, {'error': f"Pfad liegt nicht unter {root}"})
+            try:
+                data = in_path.read_bytes()
+            except OSError as e:
+                return self.send_json(HTTPStatus.NOT_FOUND, {'error': str(e)})
+            self.render(data, params, in_path.parent)
+        else:
+            self.send_json(HTTPStatus.NOT_FOUND, {'error': 'Unbekannter Pfad'})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/render':
+            return self.send_json(HTTPStatus.NOT_FOUND, {'error': 'Unbekannter Pfad'})
+        try:
+            length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            return self.send_json(HTTPStatus.LENGTH_REQUIRED, {'error': 'Content-Length fehlt'})
+        if length < 0:
+            # rfile.read(-1) würde bis zum Verbindungsende blockieren
+            self.close_connection = True
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': 'Ungültige Content-Length'})
+        if length > self.server.max_body:
+            self.close_connection = True
+            return self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Datei zu groß'})
+        data = self.rfile.read(length)
+        self.render(data, parse_qs(url.query), self.server.root or Path.cwd())
+
+    def render(self, data, params, base_dir):
+        start = time.perf_counter()
+        try:
+            self.respond_render(data, params, base_dir)
+        finally:
+            # Auch Fehler, 503 und 304 gehören in die Antwortzeiten
+            self.server.service.record_latency(time.perf_counter() - start)
+
+    def respond_render(self, data, params, base_dir):
+        service = self.server.service
+        text = params.get('text', ['paths'])[0]
+        if text not in ('paths', 'text'):
+            return self.send_json(HTTPStatus.BAD_REQUEST, {'error': "text muss 'paths' oder 'text' sein"})
+        thumbnail_only = params.get('thumbnail', ['0'])[0] in ('1', 'true', 'yes')
+        layers = normalize_layers(params.get('layers', [None])[0])
+        # Der Schlüssel hängt nur von Inhalt und Optionen ab: passender ETag → 304 ohne Rendern
+        key = service.key(data, text == 'paths', thumbnail_only, layers)
+        etag = f'"{key}"'
+        if self.headers.get('If-None-Match') == etag:
+            service.not_modified()
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        try:
+            png, origin, key = service.render(data, text == 'paths', thumbnail_only, base_dir, layers, key)
+        except QueueFull:
+            return self.send_json(HTTPStatus.SERVICE_UNAVAILABLE, {'error': 'Warteschlange voll'},
+                                  [('Retry-After', '1')])
+        except RenderError as e:
+            return self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {'error': str(e)})
+        except Exception as e:
+            return self.send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {'error': f"{type(e).__name__}: {e}"})
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(png)))
+        self.send_header('ETag', etag)
+        self.send_header('X-Render', origin)
+        self.end_headers()
+        # In Blöcken senden, statt die ganze Antwort im Puffer zusammenzusetzen
+        view = memoryview(png)
+        for offset in range(0, len(view), CHUNK_SIZE):
+            self.wfile.write(view[offset:offset + CHUNK_SIZE])
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class RenderHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service, root=None, max_body=64 * 1024 * 1024, verbose=False):
+        super().__init__(address, RenderHandler)
+        self.service = service
+        self.root = root
+        self.max_body = max_body
+        self.verbose = verbose
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokaler HTTP-Dienst: LightBurn-Datei -> PNG")
+    parser.add_argument('--host', default='127.0.0.1', help="Adresse (Standard: nur lokal)")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help="Worker-Prozesse (Standard: min(4, CPUs))")
+    parser.add_argument('--max-queue', type=int, default=64,
+                        help="Höchstens so viele unterschiedliche Renders gleichzeitig, danach 503")
+    parser.add_argument('--cache-mb', type=float, default=256, help="Größe des PNG-Caches im Speicher")
+    parser.add_argument('--max-body-mb', type=float, default=64, help="Maximale Dateigröße bei POST")
+    parser.add_argument('--root', help="GET /render?path= nur für Dateien unter diesem Ordner erlauben")
+    parser.add_argument('--font-dir', action='append', default=[],
+                        help="Zusätzlicher Schriftordner (mehrfach möglich)")
+    parser.add_argument('--glyph-cache',
+                        help="Ordner für den Glyphen-Cache auf der Platte (Standard: $LIGHTBURN_GLYPH_CACHE, sonst Cache-Ordner des Benutzers)")
+    parser.add_argument('--verbose', action='store_true', help="Jede Anfrage protokollieren")
+    args = parser.parse_args()
+
+    service = RenderService(args.workers, args.max_queue, int(args.cache_mb * 1024 * 1024),
+                            args.font_dir, args.glyph_cache)
+    root = Path(args.root).expanduser().resolve() if args.root else None
+    server = RenderHTTPServer((args.host, args.port), service, root,
+                              int(args.max_body_mb * 1024 * 1024), args.verbose)
+    service.warm_up()
+    print(f"Render-Dienst bereit: http://{args.host}:{args.port}/render "
+          f"({service.workers} Worker, Metriken unter /metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nRender-Dienst wird beendet...")
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
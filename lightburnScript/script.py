@@ -2,27 +2,73 @@
 """
 lightburn_export.py
 
-Konvertiert eine LightBurn .lbrn / .lbrn2 (XML) Datei in PNG.
+Konvertiert eine LightBurn .lbrn / .lbrn2 (XML) Datei in PNG oder SVG.
 
 Beispiele:
     python script.py eingabe.lbrn2            # erzeugt eingabe.png neben der Eingabedatei
     python script.py eingabe.lbrn2 ausgabe.png
+    python script.py eingabe.lbrn2 ausgabe.svgz --compact   # kompaktes SVG, gzip-komprimiert
+    python script.py --help
 
 Hinweise PNG:
 - Für den PNG-Export wird das Python-Paket "cairosvg" benötigt.
 - Installation (eine der Varianten):
     pip install cairosvg
     python3 -m pip install cairosvg
+
+Startzeit:
+- PySide6 bzw. CairoSVG werden erst beim ersten PNG importiert und dann
+  wiederverwendet (auch ein fehlgeschlagener Import wird nicht wiederholt).
+  Import-Zeiten und Startzeit messen: python bench_startup.py
 """
 
 import sys
 import base64
+import binascii
+import functools
+import gzip
+import hashlib
+import mmap
+import re
+import struct
 import xml.etree.ElementTree as ET
 from pathlib import Path
 from html import escape
 
 SVG_HEADER = '<?xml version="1.0" encoding="utf-8"?>\n'
 
+# Längere Seite von PNG-Ausgabe und Thumbnail wird mindestens so groß
+MIN_SIZE = 1080
+
+# Byte-Suche ohne XML-Parser (--thumbnail-only)
+_THUMB_SOURCE = re.compile(rb'<Thumbnail\b[^>]*?\bSource\s*=\s*(["\'])')  # ab b'<Thumbnail' angewendet
+_ROOT_TAG = re.compile(rb'<(?![?!])[^>]*>')
+_SIZE_ATTR = re.compile(rb'\b(Width|Height)\s*=\s*["\']([^"\']*)["\']')
+_IMAGE_SIZE = re.compile(r' width="([^"]*)" height="([^"]*)" />$')
+
+# Standard-Ebenenfarben von LightBurn (C00..C29), Index = CutIndex
+LIGHTBURN_PALETTE = (
+    '#000000', '#0000FF', '#FF0000', '#00E000', '#D0D000', '#FF8000', '#00E0E0', '#FF00FF',
+    '#B4B4B4', '#0000A0', '#A00000', '#00A000', '#A0A000', '#C08000', '#00A0FF', '#A000A0',
+    '#808080', '#7D87B9', '#BB7784', '#4A6FE3', '#D33F6A', '#8CD78C', '#F0B98D', '#F6C4E1',
+    '#FA9ED4', '#500A78', '#B45A00', '#004754', '#86FA88', '#FFDB66',
+)
+
+# Render-Backends, beim ersten Gebrauch geladen: Modul-Namespace bzw. Fehlermeldung
+_qt = None
+_qt_error = None
+_cairosvg = None
+_cairosvg_error = None
+
+def scale_to_min(width, height, min_size=MIN_SIZE):
+    """Größe so hochskalieren, dass die längere Seite mindestens min_size ist (Seitenverhältnis bleibt)."""
+    if width > height:
+        if width < min_size:
+            return min_size, height * min_size / width
+    elif height < min_size:
+        return width * min_size / height, min_size
+    return width, height
+
 def parse_matrix(elem):
     # LightBurn uses m11..m32 sometimes. Try both styles.
     keys = ['m11','m12','m21','m22','m31','m32']
@@ -69,28 +115,116 @@ def add_style_from_cutsettings(elem):
     # return style string
     return ';'.join(f'{k}:{v}' for k, v in style.items())
 
-def svg_rect_from_elem(elem):
+class LayerTable:
+    """CutSetting-Tabelle einer Datei, einmal beim Parsen gelesen.
+
+    settings: CutIndex -> {'name', 'type', 'color'}; dazu ein fertiger Stil je Ebene,
+    damit nicht jedes Shape seinen Stil neu zusammensetzt. only: Auswahl von Ebenen
+    (Index oder Name), andere Shapes werden beim Durchlaufen übersprungen.
+    """
+
+    def __init__(self, root, only=None):
+        self.settings = {}
+        for node in list(root.findall('CutSetting')) + list(root.findall('CutSetting_Img')):
+            index = _child_value(node, 'index')
+            if index is None:
+                continue
+            self.settings[index] = {
+                'name': _child_value(node, 'name') or (f'C{int(index):02d}' if index.isdigit() else index),
+                'type': node.get('type') or ('Image' if node.tag == 'CutSetting_Img' else 'Cut'),
+                'color': layer_color(index),
+            }
+        self.styles = {str(i): f'stroke:{color};fill:none' for i, color in enumerate(LIGHTBURN_PALETTE)}
+        for index, setting in self.settings.items():
+            self.styles[index] = f"stroke:{setting['color']};fill:none"
+        self.selected = None if only is None else self.resolve(only, root)
+
+    def resolve(self, only, root=None):
+        """Ebenen-Auswahl ('0,2,C05' oder Liste) in eine Menge von CutIndex-Werten übersetzen.
+
+        Gültig sind die Ebenen aus der CutSetting-Tabelle und die CutIndex-Werte der Shapes
+        in root; ValueError bei allem anderen.
+        """
+        if isinstance(only, str):
+            only = only.split(',')
+        by_name = {s['name'].lower(): index for index, s in self.settings.items()}
+        used = set(self.settings)
+        if root is not None:
+            used.update(e.get('CutIndex') for e in root.iter() if e.get('CutIndex') is not None)
+        selected = set()
+        for token in (t.strip() for t in only):
+            if not token:
+                continue
+            if token.isdigit() and str(int(token)) in used:
+                selected.add(str(int(token)))
+            elif token.lower() in by_name:
+                selected.add(by_name[token.lower()])
+            else:
+                known = ', '.join(f"{i} ({self.settings[i]['name']})" if i in self.settings else i
+                                  for i in sorted(used, key=lambda i: (not i.isdigit(), i.zfill(4))))
+                raise ValueError(f"Unbekannte Ebene '{token}', vorhanden: {known or 'keine'}")
+        return selected
+
+    def wanted(self, elem):
+        """False, wenn das Element auf einer nicht ausgewählten Ebene liegt."""
+        if self.selected is None:
+            return True
+        index = elem.get('CutIndex')
+        return index is None or index in self.selected
+
+    def style(self, elem):
+        """Vorberechneter Ebenen-Stil; Elemente mit eigener Farbe/Füllung wie bisher."""
+        index = elem.get('CutIndex')
+        if index is not None and elem.get('Color') is None and elem.get('Fill') is None \
+                and elem.get('StrokeWidth') is None:
+            style = self.styles.get(index)
+            if style is not None:
+                return style
+        return add_style_from_cutsettings(elem)
+
+def _child_value(node, tag):
+    child = node.find(tag)
+    return child.get('Value') if child is not None else None
+
+def layer_color(index):
+    """Farbe einer Ebene aus der LightBurn-Palette (T1/T2 und Unbekanntes: Grau)."""
+    try:
+        return LIGHTBURN_PALETTE[int(index)]
+    except (ValueError, IndexError):
+        return '#808080'
+
+def rect_attrs(elem):
+    """(x, y, Breite, Höhe) eines Rechtecks als Text, wie sie ins SVG übernommen werden."""
     x = elem.get('X') or elem.get('x') or elem.findtext('X') or '0'
     y = elem.get('Y') or elem.get('y') or elem.findtext('Y') or '0'
     w = elem.get('Width') or elem.get('Width') or elem.findtext('Width') or elem.get('W') or '0'
     h = elem.get('Height') or elem.get('Height') or elem.findtext('Height') or elem.get('H') or '0'
-    style = add_style_from_cutsettings(elem)
-    t = parse_matrix(elem)
-    tr = f' transform="{t}"' if t else ''
-    return f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}"{tr} />'
+    return x, y, w, h
 
-def svg_ellipse_from_elem(elem):
+def ellipse_attrs(elem):
+    """(cx, cy, rx, ry) einer Ellipse als Text."""
     cx = elem.get('CX') or elem.get('cx') or elem.findtext('CX') or '0'
     cy = elem.get('CY') or elem.get('cy') or elem.findtext('CY') or '0'
     rx = elem.get('RX') or elem.get('rx') or elem.findtext('RX') or elem.get('RadiusX') or '0'
     ry = elem.get('RY') or elem.get('ry') or elem.findtext('RY') or elem.get('RadiusY') or '0'
-    style = add_style_from_cutsettings(elem)
+    return cx, cy, rx, ry
+
+def svg_rect_from_elem(elem, style=None):
+    x, y, w, h = rect_attrs(elem)
+    style = style or add_style_from_cutsettings(elem)
+    t = parse_matrix(elem)
+    tr = f' transform="{t}"' if t else ''
+    return f'<rect x="{x}" y="{y}" width="{w}" height="{h}" style="{style}"{tr} />'
+
+def svg_ellipse_from_elem(elem, style=None):
+    cx, cy, rx, ry = ellipse_attrs(elem)
+    style = style or add_style_from_cutsettings(elem)
     t = parse_matrix(elem)
     tr = f' transform="{t}"' if t else ''
     return f'<ellipse cx="{cx}" cy="{cy}" rx="{rx}" ry="{ry}" style="{style}"{tr} />'
 
-def svg_path_from_d(d, elem):
-    style = add_style_from_cutsettings(elem)
+def svg_path_from_d(d, elem, style=None):
+    style = style or add_style_from_cutsettings(elem)
     t = parse_matrix(elem)
     tr = f' transform="{t}"' if t else ''
     return f'<path d="{escape(d)}" style="{style}"{tr} />'
@@ -113,125 +247,220 @@ def points_to_path(points_text):
         d += ' Z'
     return d
 
-def embed_image(elem, out_dir: Path, idx=0):
-    # Try to extract embedded Data (base64)
-    data_text = elem.get('Data') or elem.findtext('Data')
-    if not data_text:
-        return None
+@functools.lru_cache(maxsize=32)
+def bitmap_info(data_text):
+    """(id, data-URI) für einen eingebetteten Bitmap-Blob.
 
+    Gecacht über den Blob-Text: Kopien desselben Bilds (Arrays) und dasselbe Bild in
+    weiteren Dateien eines Batches werden nur einmal bereinigt, gehasht und erkannt.
+    """
     b64 = ''.join(data_text.split())
-
-    # try to decode to guess format
+    # Für die Formaterkennung reichen die ersten Bytes, kein Dekodieren des ganzen Bilds
     try:
-        raw = base64.b64decode(b64, validate=True)
-        if raw.startswith(b'\x89PNG'):
-            mime = 'image/png'
-        elif raw[:3] == b'\xff\xd8\xff':
-            mime = 'image/jpeg'
-        else:
-            mime = 'image/png'  # fallback
-    except Exception:
-        mime = 'image/png' # fallback
-
-    data_uri = f"data:{mime};base64,{b64}"
+        head = base64.b64decode(b64[:16], validate=True)
+    except (binascii.Error, ValueError):
+        head = b''
+    mime = 'image/jpeg' if head[:3] == b'\xff\xd8\xff' else 'image/png'
+    digest = hashlib.blake2b(b64.encode('ascii', 'replace'), digest_size=8).hexdigest()
+    return f'img-{digest}', f"data:{mime};base64,{b64}"
+
+def _num(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
 
+def image_attrs(elem):
+    """(x, y, Breite, Höhe) eines Bitmaps als Text, Größe 'auto' wenn unbekannt."""
     x = elem.get('X') or '0'
     y = elem.get('Y') or '0'
     w = elem.get('Width') or elem.findtext('Width') or 'auto'
     h = elem.get('Height') or elem.findtext('Height') or 'auto'
+    return x, y, w, h
+
+def embed_image(elem, out_dir: Path, idx=0, defs=None):
+    """<image> für ein eingebettetes Bitmap.
+
+    Mit defs landet jedes Bild nur einmal (per Hash) in <defs>, die Instanz wird per
+    <use> mit transform platziert und auf ihre eigene Breite/Höhe skaliert.
+    """
+    # Try to extract embedded Data (base64)
+    data_text = elem.get('Data') or elem.findtext('Data')
+    if not data_text:
+        return None
+
+    ref_id, data_uri = bitmap_info(data_text)
+
+    x, y, w, h = image_attrs(elem)
     t = parse_matrix(elem)
-    tr = f' transform="{t}"' if t else ''
-    return f'<image href="{data_uri}" x="{x}" y="{y}" width="{w}" height="{h}"{tr} />'
+    if defs is None:
+        tr = f' transform="{t}"' if t else ''
+        return f'<image href="{data_uri}" x="{x}" y="{y}" width="{w}" height="{h}"{tr} />'
+
+    if ref_id not in defs:
+        defs[ref_id] = f'<image id="{ref_id}" xlink:href="{data_uri}" width="{w}" height="{h}" />'
+    # Größe der ersten Instanz steht in <defs>, weitere Kopien werden relativ dazu skaliert
+    base_w, base_h = _IMAGE_SIZE.search(defs[ref_id]).groups()
+    parts = [t] if t else []
+    if x != '0' or y != '0':
+        parts.append(f'translate({x} {y})')
+    sx, sy = _num(w), _num(h)
+    bw, bh = _num(base_w), _num(base_h)
+    if (w, h) != (base_w, base_h):
+        if not (sx and sy and bw and bh) or abs(sx * bh - sy * bw) > 1e-9 * sx * bh:
+            # Anderes Seitenverhältnis: Skalieren würde das Bild verzerren statt es einzupassen
+            tr = f' transform="{t}"' if t else ''
+            return f'<image href="{data_uri}" x="{x}" y="{y}" width="{w}" height="{h}"{tr} />'
+        parts.append(f'scale({sx / bw:g} {sy / bh:g})')
+    tr = ' transform="%s"' % ' '.join(parts) if parts else ''
+    return f'<use xlink:href="#{ref_id}"{tr} />'
+
+def svg_text_paths(elem, text, defs, style=None):
+    """Text-Shape als Glyphen-Pfade, None wenn fontTools oder die Schrift fehlt."""
+    try:
+        size = float(elem.get('H') or 0)
+    except ValueError:
+        return None
+    try:
+        import glyphs
+        return glyphs.text_to_svg(text, elem.get('Font'), size, style or add_style_from_cutsettings(elem),
+                                  parse_matrix(elem), defs, elem)
+    except Exception as e:
+        print(f"Text als Pfad nicht möglich ({e}), verwende <text>")
+        return None
 
-def process_element(elem, out_dir, images_counter):
-    tag = elem.tag.split('}')[-1]  # strip namespace
-    svgs = []
+def shape_kind(elem):
+    """(Art, Daten) eines einzelnen LightBurn-Elements, ohne Kinder; (None, None) wenn es nichts zeichnet.
+
+    Arten: 'rect', 'ellipse', 'bitmap', 'path' (Daten: SVG-Pfad), 'text' (Shape mit Str)
+    und 'label' (älteres <Text>-Element mit X/Y). Gemeinsame Grundlage für process_element
+    und die Statistik (stats.py).
+    """
+    tag = elem.tag.split('}')[-1].lower()  # strip namespace
 
     # Handle <Shape Type="..."> elements
-    if tag.lower() == 'shape':
+    if tag == 'shape':
         shape_type = elem.get('Type', '').lower()
         if shape_type in ('rect', 'rectangle'):
-            svgs.append(svg_rect_from_elem(elem))
-        elif shape_type in ('ellipse', 'circle'):
-            svgs.append(svg_ellipse_from_elem(elem))
-        elif shape_type == 'text':
+            return 'rect', None
+        if shape_type in ('ellipse', 'circle'):
+            return 'ellipse', None
+        if shape_type == 'text':
             text = elem.get('Str', '')
-            if text:
-                style = add_style_from_cutsettings(elem)
-                t = parse_matrix(elem)
-                tr = f' transform="{t}"' if t else ''
-                font_size = elem.get('H')
-                if font_size:
-                    style += f';font-size:{font_size}px'
-                font_family_attr = elem.get('Font')
-                if font_family_attr:
-                    font_family = font_family_attr.split(',')[0]
-                    style += f';font-family:{font_family}'
-                style += ';text-anchor:middle'
-                
-                lines = escape(text).split('\n')
-                text_svg = f'<text x="0" y="0" style="{style}"{tr}>'
-                for i, line in enumerate(lines):
-                    dy = '1.2em' if i > 0 else '0'
-                    text_svg += f'<tspan x="0" dy="{dy}">{line}</tspan>'
-                text_svg += '</text>'
-                svgs.append(text_svg)
-
-        elif shape_type == 'bitmap':
-            img_tag = embed_image(elem, out_dir, images_counter[0])
-            if img_tag:
-                svgs.append(img_tag)
-                images_counter[0] += 1
-        elif shape_type == 'path':
+            return ('text', text) if text else (None, None)
+        if shape_type == 'bitmap':
+            return 'bitmap', None
+        if shape_type == 'path':
             d = elem.get('D') or elem.get('d')
-            if d:
-                svgs.append(svg_path_from_d(d, elem))
+            return ('path', d) if d else (None, None)
+        return None, None
 
     # Legacy handling for other formats
-    elif tag.lower() in ('path', 'svgpath', 'shape', 'item'):
+    if tag in ('path', 'svgpath', 'item'):
         d = elem.get('D') or elem.get('d') or elem.findtext('D') or elem.findtext('d') or elem.findtext('Path')
         if d:
-            svgs.append(svg_path_from_d(d, elem))
-        else:
-            pts = elem.get('Points') or elem.findtext('Points')
-            if pts:
-                d2 = points_to_path(pts)
-                if d2:
-                    svgs.append(svg_path_from_d(d2, elem))
-    elif tag.lower() in ('polygon','polyline'):
+            return 'path', d
+    if tag in ('path', 'svgpath', 'item', 'polygon', 'polyline'):
         pts = elem.get('Points') or elem.findtext('Points')
-        if pts:
-            d2 = points_to_path(pts)
-            if d2:
-                svgs.append(svg_path_from_d(d2, elem))
-    elif tag.lower() in ('rectangle','rect'):
-        svgs.append(svg_rect_from_elem(elem))
-    elif tag.lower() in ('ellipse','circle'):
-        svgs.append(svg_ellipse_from_elem(elem))
-    elif tag.lower() == 'text':
-        text = elem.get('Text') or elem.findtext('Text') or ''
+        d2 = points_to_path(pts) if pts else ''
+        return ('path', d2) if d2 else (None, None)
+    if tag in ('rectangle', 'rect'):
+        return 'rect', None
+    if tag in ('ellipse', 'circle'):
+        return 'ellipse', None
+    if tag == 'text':
+        return 'label', elem.get('Text') or elem.findtext('Text') or ''
+    if tag == 'image':
+        return 'bitmap', None
+    return None, None
+
+def process_element(elem, out_dir, images_counter, defs=None, text_as_paths=False, layers=None):
+    """SVG-Elemente für ein LightBurn-Element und seine Kinder.
+
+    defs sammelt gemeinsam genutzte Elemente (z.B. Glyphen) für <defs>.
+    layers (LayerTable): Stil je Ebene und Ebenen-Auswahl.
+    """
+    kind, data = shape_kind(elem)
+    svgs = []
+    style = None
+    if kind is not None and layers is not None:
+        # Ebenen-Auswahl schon beim Durchlaufen: ausgelassene Shapes erzeugen kein SVG
+        if layers.wanted(elem):
+            style = layers.style(elem)
+        else:
+            kind = None
+
+    if kind == 'rect':
+        svgs.append(svg_rect_from_elem(elem, style))
+    elif kind == 'ellipse':
+        svgs.append(svg_ellipse_from_elem(elem, style))
+    elif kind == 'path':
+        svgs.append(svg_path_from_d(data, elem, style))
+    elif kind == 'bitmap':
+        img_tag = embed_image(elem, out_dir, images_counter[0], defs)
+        if img_tag:
+            svgs.append(img_tag)
+            images_counter[0] += 1
+    elif kind == 'text':
+        text = data
+        glyph_svg = None
+        if text_as_paths and defs is not None:
+            # Umriss-Pfade aus der Schriftdatei, unabhängig von den installierten Schriften des Renderers
+            glyph_svg = svg_text_paths(elem, text, defs, style)
+            # '' = Text ohne sichtbare Glyphen: zählt nicht als gezeichnetes Element
+            if glyph_svg:
+                svgs.append(glyph_svg)
+        if glyph_svg is None:
+            style = style or add_style_from_cutsettings(elem)
+            t = parse_matrix(elem)
+            tr = f' transform="{t}"' if t else ''
+            font_size = elem.get('H')
+            if font_size:
+                style += f';font-size:{font_size}px'
+            font_family_attr = elem.get('Font')
+            if font_family_attr:
+                font_family = font_family_attr.split(',')[0]
+                style += f';font-family:{font_family}'
+            style += ';text-anchor:middle'
+
+            lines = escape(text).split('\n')
+            text_svg = f'<text x="0" y="0" style="{style}"{tr}>'
+            for i, line in enumerate(lines):
+                dy = '1.2em' if i > 0 else '0'
+                text_svg += f'<tspan x="0" dy="{dy}">{line}</tspan>'
+            text_svg += '</text>'
+            svgs.append(text_svg)
+    elif kind == 'label':
         x = elem.get('X') or elem.findtext('X') or '0'
         y = elem.get('Y') or elem.findtext('Y') or '0'
-        style = add_style_from_cutsettings(elem)
+        style = style or add_style_from_cutsettings(elem)
         t = parse_matrix(elem)
         tr = f' transform="{t}"' if t else ''
-        svgs.append(f'<text x="{x}" y="{y}" style="{style}"{tr}>{escape(text)}</text>')
-    elif tag.lower() == 'image':
-        img_tag = embed_image(elem, out_dir, images_counter[0])
-        if img_tag:
-            svgs.append(img_tag)
-            images_counter[0] += 1
-    
+        svgs.append(f'<text x="{x}" y="{y}" style="{style}"{tr}>{escape(data)}</text>')
+
     # Recurse into children
     for c in list(elem):
-        svgs.extend(process_element(c, out_dir, images_counter))
-        
+        svgs.extend(process_element(c, out_dir, images_counter, defs, text_as_paths, layers))
+
     return svgs
 
-def build_svg(infile: Path, out_dir: Path) -> tuple[str, bool, str | None]:
+def shape_containers(root):
+    """Knoten, unter denen die Shapes liegen (<Shapes>, <Items>, ...), sonst die Wurzel."""
+    candidates = []
+    for candidate_name in ('Shapes','Items','Children','Objects','Root','Document'):
+        for node in root.findall('.//' + candidate_name):
+            candidates.append(node)
+    return candidates or [root]
+
+def build_svg(infile: Path, out_dir: Path, text_as_paths=True, layers=None,
+              precision=None) -> tuple[str, bool, str | None]:
     """Parst die LightBurn-Datei und gibt den SVG-Text zurück.
 
     Eingebettete Bitmaps (falls vorhanden) werden in out_dir geschrieben und im SVG relativ referenziert.
+    text_as_paths: Text als Glyphen-Pfade (glyphs.py, braucht fontTools), sonst als <text>.
+    layers: nur diese Ebenen rendern (CutIndex oder Name, z.B. '0,2' oder ['C05']);
+    ValueError bei unbekannter Ebene.
+    precision: kompakte Ausgabe (compact.py) mit so vielen Nachkommastellen, None: unverändert.
     """
     # parse XML (LightBurn .lbrn / .lbrn2)
     tree = ET.parse(infile)
@@ -244,159 +473,306 @@ def build_svg(infile: Path, out_dir: Path) -> tuple[str, bool, str | None]:
     original_height = float(height_str)
 
     # Scale the output PNG size up to a minimum dimension
-    scaled_width = original_width
-    scaled_height = original_height
-    min_size = 1080
-    if scaled_width > scaled_height:
-        if scaled_width < min_size:
-            scale = min_size / scaled_width
-            scaled_width = min_size
-            scaled_height *= scale
-    else:
-        if scaled_height < min_size:
-            scale = min_size / scaled_height
-            scaled_height = min_size
-            scaled_width *= scale
+    scaled_width, scaled_height = scale_to_min(original_width, original_height)
 
     svg_elems = []
     images_counter = [0]
+    defs = {}
+    # Ebenen-Tabelle einmal lesen, Stile vorberechnet
+    layer_table = LayerTable(root, layers)
 
     # Search for likely containers: <Shapes>, <Items>, <Children>, etc.
-    candidates = []
-    for candidate_name in ('Shapes','Items','Children','Objects','Root','Document'):
-        for node in root.findall('.//' + candidate_name):
-            candidates.append(node)
-    if not candidates:
-        candidates = [root]
-
-    for node in candidates:
-        svg_elems.extend(process_element(node, out_dir, images_counter))
+    for node in shape_containers(root):
+        svg_elems.extend(process_element(node, out_dir, images_counter, defs, text_as_paths, layer_table))
 
     # Use a fixed viewBox based on the original canvas size
     viewbox_str = f'0 0 {original_width} {original_height}'
 
     # Sort elements to draw images behind vectors
-    image_elems = [s for s in svg_elems if s.strip().startswith('<image')]
-    vector_elems = [s for s in svg_elems if not s.strip().startswith('<image')]
+    is_image = lambda s: s.startswith(('<image', '<use xlink:href="#img-'))
+    image_elems = [s for s in svg_elems if is_image(s)]
+    vector_elems = [s for s in svg_elems if not is_image(s)]
     sorted_elems = image_elems + vector_elems
     svg_body = '\n  '.join(sorted_elems)
+    if defs:
+        svg_body = '<defs>\n    ' + '\n    '.join(defs.values()) + '\n  </defs>\n  ' + svg_body
 
     # Build SVG
     svg_text = (
         SVG_HEADER
-        + f'<svg xmlns="http://www.w3.org/2000/svg" width="{scaled_width}" height="{scaled_height}" viewBox="{viewbox_str}">\n'
+        + f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" width="{scaled_width}" height="{scaled_height}" viewBox="{viewbox_str}">\n'
         + f'  {svg_body}\n'
         + '</svg>\n'
     )
-    
+    if precision is not None:
+        import compact
+        svg_text = compact.compact_svg(svg_text, precision)
+
     # Discover embedded thumbnail (PNG) as a fallback if no vector shapes were recognized
     thumb_b64 = None
     thumb_node = root.find('.//Thumbnail')
-    if thumb_node is not None:
+    # Das Thumbnail zeigt alle Ebenen, passt also nicht zu einer Auswahl
+    if thumb_node is not None and layers is None:
         thumb_b64 = thumb_node.get('Source')
     return svg_text, (len(svg_elems) > 0), thumb_b64
 
-def write_png(svg_text: str, out_path: Path, base_dir: Path):
-    """Schreibt PNG aus SVG-Text.
+def load_qt():
+    """PySide6-Klassen für Rendern und Thumbnails, einmal importiert.
+
+    Legt bei Bedarf die QGuiApplication an. Wirft ImportError, wenn PySide6 fehlt.
+    """
+    global _qt, _qt_error
+    if _qt is None and _qt_error is None:
+        try:
+            from types import SimpleNamespace
+            from PySide6.QtSvg import QSvgRenderer
+            from PySide6.QtGui import QImage, QPainter, QGuiApplication
+            from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QSize
+
+            _qt = SimpleNamespace(QSvgRenderer=QSvgRenderer, QImage=QImage, QPainter=QPainter,
+                                  QGuiApplication=QGuiApplication, QByteArray=QByteArray, QSize=QSize,
+                                  QBuffer=QBuffer, QIODevice=QIODevice,
+                                  app=QGuiApplication.instance() or QGuiApplication([]))
+        except Exception as e:
+            _qt_error = str(e)
+    if _qt is None:
+        raise ImportError(_qt_error)
+    return _qt
+
+def load_cairosvg():
+    """cairosvg, einmal importiert. Wirft ImportError, wenn es fehlt."""
+    global _cairosvg, _cairosvg_error
+    if _cairosvg is None and _cairosvg_error is None:
+        try:
+            import cairosvg
+            _cairosvg = cairosvg
+        except Exception as e:
+            _cairosvg_error = str(e)
+    if _cairosvg is None:
+        raise ImportError(_cairosvg_error)
+    return _cairosvg
+
+def qt_png_bytes(qt, image):
+    """QImage als PNG-Bytes (im Speicher, ohne Datei)."""
+    data = qt.QByteArray()
+    buffer = qt.QBuffer(data)
+    buffer.open(qt.QIODevice.WriteOnly)
+    ok = image.save(buffer, 'PNG')
+    buffer.close()
+    if not ok:
+        raise RuntimeError("Konnte PNG nicht kodieren")
+    return data.data()
+
+def render_png(svg_text: str, base_dir: Path):
+    """Rendert SVG-Text zu PNG-Bytes, gibt (Bytes, Backend-Name) zurück.
 
     Primär via Qt (PySide6); falls nicht verfügbar, verwende CairoSVG als Fallback.
+    Wirft RuntimeError mit beiden Fehlermeldungen, wenn keins rendern kann.
     """
     # 1) Versuch: Qt (PySide6)
     try:
-        from PySide6.QtSvg import QSvgRenderer
-        from PySide6.QtGui import QImage, QPainter, QGuiApplication
-        from PySide6.QtCore import QByteArray, QSize
-
-        app = QGuiApplication.instance() or QGuiApplication([])
-        renderer = QSvgRenderer(QByteArray(svg_text.encode('utf-8')))
+        qt = load_qt()
+        renderer = qt.QSvgRenderer(qt.QByteArray(svg_text.encode('utf-8')))
         size = renderer.defaultSize()
         if not size.isValid():
             # Fallback-Größe, falls SVG keine Size anbietet
-            size = QSize(1000, 1000)
-        image = QImage(size, QImage.Format_ARGB32)
+            size = qt.QSize(1000, 1000)
+        image = qt.QImage(size, qt.QImage.Format_ARGB32)
         image.fill(0x00000000)
-        painter = QPainter(image)
+        painter = qt.QPainter(image)
         renderer.render(painter)
         painter.end()
-        if not image.save(str(out_path)):
-            raise RuntimeError("Konnte PNG nicht speichern")
-        print(f"PNG exportiert (Qt): {out_path}")
-        return
+        return qt_png_bytes(qt, image), 'Qt'
     except Exception as e_qt:
         # 2) Fallback: CairoSVG
         try:
-            import cairosvg
+            cairosvg = load_cairosvg()
             base_dir.mkdir(parents=True, exist_ok=True)
             abs_base = base_dir.resolve()
             base_url = abs_base.as_uri()
-            cairosvg.svg2png(bytestring=svg_text.encode('utf-8'), write_to=str(out_path), url=base_url)
-            print(f"PNG exportiert (CairoSVG-Fallback): {out_path}")
-            return
+            png = cairosvg.svg2png(bytestring=svg_text.encode('utf-8'), url=base_url)
+            return png, 'CairoSVG-Fallback'
         except Exception as e_cairo:
-            print("Fehlender PNG-Export: Weder Qt noch 'cairosvg' konnten das Bild rendern.")
-            print(f"Qt-Fehler: {e_qt}")
-            print(f"CairoSVG-Fehler: {e_cairo}")
-            print("Installiere entweder 'PySide6' oder 'cairosvg'.")
-            sys.exit(2)
+            raise RuntimeError(f"Qt-Fehler: {e_qt}\nCairoSVG-Fehler: {e_cairo}") from e_cairo
 
-def main(infile, outfile=None):
+def write_png(svg_text: str, out_path: Path, base_dir: Path):
+    """Schreibt PNG aus SVG-Text (siehe render_png)."""
+    try:
+        png, backend = render_png(svg_text, base_dir)
+    except RuntimeError as e:
+        print("Fehlender PNG-Export: Weder Qt noch 'cairosvg' konnten das Bild rendern.")
+        print(e)
+        print("Installiere entweder 'PySide6' oder 'cairosvg'.")
+        sys.exit(2)
+    out_path.write_bytes(png)
+    print(f"PNG exportiert ({backend}): {out_path}")
+
+def write_svg(svg_text: str, out_path: Path):
+    """Schreibt den SVG-Text, bei Endung .svgz gzip-komprimiert."""
+    data = svg_text.encode('utf-8')
+    if out_path.suffix.lower() == '.svgz':
+        # mtime=0: gleiche Eingabe ergibt dieselbe Datei (Caches, ETags)
+        data = gzip.compress(data, compresslevel=9, mtime=0)
+    out_path.write_bytes(data)
+    print(f"SVG exportiert ({len(data) / 1024:.1f} KB): {out_path}")
+
+def png_size(raw):
+    """(Breite, Höhe) aus dem IHDR-Kopf eines PNG, None für andere Formate."""
+    if raw[:8] == b'\x89PNG\r\n\x1a\n' and raw[12:16] == b'IHDR':
+        return struct.unpack('>II', raw[16:24])
+    return None
+
+def thumbnail_png(raw, min_size=MIN_SIZE):
+    """Thumbnail (PNG-Bytes) wie die PNG-Ausgabe auf min_size skaliert, gibt (Bytes, Größe) zurück.
+
+    Ist das Bild schon groß genug, bleiben die Bytes unverändert - ohne Dekodieren.
+    Zum Skalieren wird Qt gebraucht; fehlt es, bleibt das Original.
+    """
+    size = png_size(raw)
+    if size is not None:
+        target = scale_to_min(*size, min_size)
+        target = (int(target[0]), int(target[1]))
+        if target == tuple(size):
+            return raw, size
+    try:
+        qt = load_qt()
+    except ImportError:
+        if size is None:
+            raise
+        return raw, size
+    image = qt.QImage()
+    if not image.loadFromData(raw):
+        raise RuntimeError("Thumbnail ist kein lesbares Bild")
+    width, height = scale_to_min(image.width(), image.height(), min_size)
+    image = image.scaled(qt.QSize(int(width), int(height)))
+    return qt_png_bytes(qt, image), (image.width(), image.height())
+
+def write_thumbnail(raw, out_path: Path, min_size=MIN_SIZE):
+    """Thumbnail schreiben (siehe thumbnail_png), gibt die geschriebene Größe zurück."""
+    png, size = thumbnail_png(raw, min_size)
+    out_path.write_bytes(png)
+    return size
+
+def scan_thumbnail(infile: Path):
+    """Thumbnail und Arbeitsfläche per Byte-Suche, ohne die XML-Datei zu parsen.
+
+    Gibt (PNG-Bytes oder None, (Breite, Höhe) der Arbeitsfläche) zurück. Die Datei wird
+    per mmap gelesen; dekodiert wird direkt aus der gemappten Datei.
+    """
+    with open(infile, 'rb') as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return None, (1000.0, 1000.0)  # Leere Datei
+        with data:
+            return find_thumbnail(data)
+
+def find_thumbnail(data):
+    """Wie scan_thumbnail, aber für einen Puffer (bytes oder mmap) mit dem Dateiinhalt."""
+    width = height = 1000.0
+    root = _ROOT_TAG.search(data, 0, 4096)
+    if root is not None:
+        attrs = dict(_SIZE_ATTR.findall(root.group(0)))
+        try:
+            width = float(attrs.get(b'Width', width))
+            height = float(attrs.get(b'Height', height))
+        except ValueError:
+            pass
+    # find() ist deutlich schneller als eine Regex-Suche über die ganze Datei
+    pos = data.find(b'<Thumbnail')
+    match = _THUMB_SOURCE.match(data, pos) if pos >= 0 else None
+    if match is None:
+        return None, (width, height)
+    start = match.end()
+    end = data.find(match.group(1), start)
+    if end < 0:
+        return None, (width, height)
+    with memoryview(data) as view:
+        # a2b_base64 überspringt Zeilenumbrüche/Leerzeichen selbst
+        raw = binascii.a2b_base64(view[start:end])
+    return raw, (width, height)
+
+def export_thumbnail(infile, outfile=None):
+    """--thumbnail-only: nur das eingebettete Vorschaubild als PNG schreiben."""
+    in_path = Path(infile)
+    out_path = Path(outfile) if outfile else in_path.with_suffix('.png')
+    if out_path.suffix.lower() != '.png':
+        out_path = out_path.with_suffix('.png')
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        raw, canvas = scan_thumbnail(in_path)
+    except (binascii.Error, ValueError) as e:
+        print(f"Thumbnail ist beschädigt (kein gültiges Base64): {e}")
+        return False
+    if not raw:
+        print(f"Kein Thumbnail gefunden: {in_path}")
+        return False
+    try:
+        size = write_thumbnail(raw, out_path)
+    except ImportError as e:
+        print(f"Thumbnail ist kein PNG, zum Umwandeln wird PySide6 benötigt: {e}")
+        return False
+    except RuntimeError as e:
+        print(f"Konnte Thumbnail nicht schreiben oder skalieren: {e}")
+        return False
+    print(f"Thumbnail exportiert ({size[0]}x{size[1]}, Arbeitsfläche {canvas[0]:g}x{canvas[1]:g}): {out_path}")
+    return True
+
+def save_glyph_cache():
+    """Neu erzeugte Glyphen in den Platten-Cache schreiben (falls Text als Pfad gerendert wurde)."""
+    glyphs = sys.modules.get('glyphs')
+    if glyphs is not None:
+        glyphs.save_cache()
+
+def list_layers(infile):
+    """--list-layers: Ebenen-Tabelle mit Anzahl Shapes je Ebene ausgeben."""
+    root = ET.parse(infile).getroot()
+    table = LayerTable(root)
+    counts = {}
+    for elem in root.iter():
+        index = elem.get('CutIndex')
+        if index is not None:
+            counts[index] = counts.get(index, 0) + 1
+    indices = sorted(set(table.settings) | set(counts), key=lambda i: (not i.isdigit(), int(i) if i.isdigit() else 0, i))
+    for index in indices:
+        setting = table.settings.get(index, {'name': '-', 'type': '-', 'color': layer_color(index)})
+        print(f"{index:>3}  {setting['name']:<16} {setting['type']:<8} {setting['color']}  {counts.get(index, 0)} Shapes")
+
+def main(infile, outfile=None, text_as_paths=True, layers=None, precision=None):
     in_path = Path(infile)
     # Wenn kein Output angegeben, verwende Eingabenamen mit .png in gleichem Ordner
     if outfile is None:
         out_path = in_path.with_suffix('.png')
     else:
         out_path = Path(outfile)
-    # Erzwinge PNG-Endung
-    if out_path.suffix.lower() != '.png':
+    # Erzwinge PNG-Endung, außer bei SVG-Ausgabe
+    as_svg = out_path.suffix.lower() in ('.svg', '.svgz')
+    if out_path.suffix.lower() != '.png' and not as_svg:
         out_path = out_path.with_suffix('.png')
 
     out_dir = out_path.parent
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    svg_text, has_elems, thumb_b64 = build_svg(in_path, out_dir)
-
-    if has_elems:
+    try:
+        svg_text, has_elems, thumb_b64 = build_svg(in_path, out_dir, text_as_paths, layers, precision)
+    except ValueError as e:
+        print(e)
+        sys.exit(2)
+    save_glyph_cache()
+
+    if as_svg:
+        if not has_elems:
+            print("Keine erkennbaren Vektorelemente gefunden.")
+            sys.exit(3)
+        write_svg(svg_text, out_path)
+    elif has_elems:
         write_png(svg_text, out_path, out_dir)
     elif thumb_b64:
         # Fallback: schreibe eingebettetes LightBurn-Thumbnail PNG
         try:
-            from PySide6.QtGui import QImage, QGuiApplication
-            from PySide6.QtCore import QSize
-
-            app = QGuiApplication.instance() or QGuiApplication([])
-            
             raw = base64.b64decode(''.join(thumb_b64.split()))
-            image = QImage()
-            image.loadFromData(raw)
-
-            width = image.width()
-            height = image.height()
-            
-            min_size = 1080
-
-            if width > height:
-                if width < min_size:
-                    scale = min_size / width
-                    new_width = min_size
-                    new_height = int(height * scale)
-                else:
-                    new_width = width
-                    new_height = height
-            else:
-                if height < min_size:
-                    scale = min_size / height
-                    new_height = min_size
-                    new_width = int(width * scale)
-                else:
-                    new_width = width
-                    new_height = height
-            
-            resized_image = image.scaled(QSize(new_width, new_height))
-            
-            if not resized_image.save(str(out_path)):
-                raise RuntimeError("Konnte skaliertes Thumbnail nicht speichern")
-
-            print(f"PNG exportiert (skaliertes Thumbnail): {out_path}")
+            size = write_thumbnail(raw, out_path)
+            print(f"PNG exportiert (Thumbnail {size[0]}x{size[1]}): {out_path}")
         except Exception as e:
             print(f"Konnte Thumbnail nicht schreiben oder skalieren: {e}")
             print("Keine erkennbaren Vektorelemente gefunden.")
@@ -405,11 +781,43 @@ def main(infile, outfile=None):
         print("Keine erkennbaren Vektorelemente und kein Thumbnail gefunden.")
         sys.exit(3)
 
+def parse_args(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Konvertiert eine LightBurn .lbrn / .lbrn2 Datei in PNG.",
+        epilog="Ohne output wird automatisch input.png neben der Eingabedatei erzeugt.")
+    parser.add_argument('input', help="LightBurn-Datei (.lbrn / .lbrn2)")
+    parser.add_argument('output', nargs='?', help="Ziel-PNG, oder .svg / .svgz (gzip) für SVG")
+    parser.add_argument('--compact', action='store_true',
+                        help="Kompaktes SVG: gerundete Koordinaten, CSS-Klassen, relative Pfade")
+    parser.add_argument('--precision', type=int, default=3,
+                        help="Nachkommastellen mit --compact (Standard: 3)")
+    parser.add_argument('--layers',
+                        help="Nur diese Ebenen rendern: CutIndex oder Name, z.B. 0,2 oder C05")
+    parser.add_argument('--list-layers', action='store_true',
+                        help="Ebenen der Datei (Index, Name, Art, Farbe, Anzahl Shapes) ausgeben")
+    parser.add_argument('--thumbnail-only', action='store_true',
+                        help="Nur das eingebettete Vorschaubild exportieren (schnell, ohne XML-Parser)")
+    parser.add_argument('--text', choices=('paths', 'text'), default='paths',
+                        help="Text als Glyphen-Pfade (Standard, braucht fontTools) oder als <text>")
+    parser.add_argument('--font-dir', action='append', default=[],
+                        help="Zusätzlicher Schriftordner (mehrfach möglich)")
+    parser.add_argument('--glyph-cache',
+                        help="Ordner für den Glyphen-Cache auf der Platte (Standard: $LIGHTBURN_GLYPH_CACHE, sonst Cache-Ordner des Benutzers)")
+    args = parser.parse_args(argv)
+    if args.precision < 0:
+        parser.error("--precision darf nicht negativ sein")
+    return args
+
 if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Verwendung:\n  python script.py input.lbrn2 [output.png]\n\nOhne output wird automatisch input.png erzeugt.")
-        sys.exit(1)
-    if len(sys.argv) == 2:
-        main(sys.argv[1])
-    else:
-        main(sys.argv[1], sys.argv[2])
\ No newline at end of file
+    args = parse_args()
+    if args.list_layers:
+        list_layers(args.input)
+        sys.exit(0)
+    if args.thumbnail_only:
+        sys.exit(0 if export_thumbnail(args.input, args.output) else 3)
+    if args.text == 'paths' and (args.font_dir or args.glyph_cache):
+        import glyphs
+        glyphs.configure(font_dirs=args.font_dir, cache_dir=args.glyph_cache)
+    main(args.input, args.output, text_as_paths=args.text == 'paths', layers=args.layers,
+         precision=args.precision if args.compact else None)
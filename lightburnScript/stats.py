@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Kennzahlen einer LightBurn-Datei für Angebote, ohne zu rendern.
+
+Geht die Shapes genauso durch wie script.py (shape_kind / shape_containers) und
+berechnet mit NumPy über alle Segmente auf einmal:
+- Begrenzungsrahmen nach Anwendung der Transformationen (exakt, auch für Bézier-Kurven)
+- Schnittlänge: Linien, Bézier-Kurven (Gauß-Legendre), Bögen (als Bézier je ≤ 22,5°), Ellipsen (Ramanujan)
+- Summen je CutIndex (Ebene): Anzahl Shapes je Art, Länge, Rahmen
+
+Text wird über die Glyphen-Umrisse gemessen (glyphs.py, braucht fontTools); ohne
+Schrift zählt er nur als Shape (text_unmeasured). Bitmaps zählen zum Rahmen, nicht zur Länge.
+
+Aufruf:
+    python stats.py auftrag.lbrn2
+    python stats.py ordner/ --jobs 8 --json > stats.json
+"""
+
+import argparse
+import functools
+import json
+import math
+import re
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+import script
+
+_TOKEN = re.compile(r'([MmZzLlHhVvCcSsQqTtAa])|([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)')
+_ARGS = {'M': 2, 'L': 2, 'H': 1, 'V': 1, 'C': 6, 'S': 4, 'Q': 4, 'T': 2, 'A': 7, 'Z': 0}
+
+# Gauß-Legendre-Stützstellen auf [0, 1] für die Länge der Bézier-Kurven
+_GL_T, _GL_W = np.polynomial.legendre.leggauss(16)
+_GL_T = (_GL_T + 1) / 2
+_GL_W = _GL_W / 2
+
+IDENTITY = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _arc_to_cubics(x0, y0, rx, ry, phi, large, sweep, x1, y1):
+    """SVG-Bogen (Endpunkt-Form) als Liste kubischer Bézier-Segmente (je höchstens 22,5°).
+
+    Der Fehler der Bézier-Näherung wächst mit der 6. Potenz des Winkels: bei 90° ist die
+    Länge eines Kreises um ~1e-4 zu lang, bei 22,5° liegt sie unter 1e-7.
+    """
+    if rx == 0 or ry == 0:
+        return None  # Gerade Linie laut SVG-Spezifikation
+    rx, ry = abs(rx), abs(ry)
+    cos_p, sin_p = math.cos(math.radians(phi)), math.sin(math.radians(phi))
+    dx, dy = (x0 - x1) / 2, (y0 - y1) / 2
+    x1p = cos_p * dx + sin_p * dy
+    y1p = -sin_p * dx + cos_p * dy
+    scale = (x1p / rx) ** 2 + (y1p / ry) ** 2
+    if scale > 1:
+        rx, ry = rx * math.sqrt(scale), ry * math.sqrt(scale)
+    num = rx * rx * ry * ry - rx * rx * y1p * y1p - ry * ry * x1p * x1p
+    den = rx * rx * y1p * y1p + ry * ry * x1p * x1p
+    coef = math.sqrt(max(0.0, num / den)) if den else 0.0
+    if large == sweep:
+        coef = -coef
+    cxp, cyp = coef * rx * y1p / ry, -coef * ry * x1p / rx
+    cx = cos_p * cxp - sin_p * cyp + (x0 + x1) / 2
+    cy = sin_p * cxp + cos_p * cyp + (y0 + y1) / 2
+    theta = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    delta = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx) - theta
+    if sweep and delta < 0:
+        delta += 2 * math.pi
+    elif not sweep and delta > 0:
+        delta -= 2 * math.pi
+
+    count = max(1, math.ceil(abs(delta) / (math.pi / 8) - 1e-9))
+    step = delta / count
+    k = 4 / 3 * math.tan(step / 4)
+    point = lambda a: (cx + rx * math.cos(a) * cos_p - ry * math.sin(a) * sin_p,
+                       cy + rx * math.cos(a) * sin_p + ry * math.sin(a) * cos_p)
+    deriv = lambda a: (-rx * math.sin(a) * cos_p - ry * math.cos(a) * sin_p,
+                       -rx * math.sin(a) * sin_p + ry * math.cos(a) * cos_p)
+    cubics = []
+    for i in range(count):
+        a0, a1 = theta + i * step, theta + (i + 1) * step
+        p0, p3 = point(a0), point(a1)
+        d0, d1 = deriv(a0), deriv(a1)
+        cubics.append((p0[0], p0[1], p0[0] + k * d0[0], p0[1] + k * d0[1],
+                       p3[0] - k * d1[0], p3[1] - k * d1[1], p3[0], p3[1]))
+    return cubics
+
+
+@functools.lru_cache(maxsize=4096)
+def path_segments(d):
+    """SVG-Pfad als (Linien (n, 4), Kubische Bézier (m, 8)) in absoluten Koordinaten.
+
+    Quadratische Kurven werden exakt zu kubischen, Bögen zu kubischen Segmenten.
+    Gecacht, weil Glyphen und kopierte Pfade dieselben Daten mehrfach liefern.
+    """
+    lines, cubics = [], []
+    x = y = start_x = start_y = 0.0
+    last_ctrl = None  # (Befehl, x, y) des letzten Kontrollpunkts für S/T
+    command = None
+    numbers = []
+
+    def flush(cmd, args):
+        nonlocal x, y, start_x, start_y, last_ctrl
+        rel = cmd.islower()
+        op = cmd.upper()
+        ox, oy = (x, y) if rel else (0.0, 0.0)
+        if op == 'M':
+            x, y = args[0] + ox, args[1] + oy
+            start_x, start_y = x, y
+            last_ctrl = None
+        elif op in ('L', 'H', 'V'):
+            if op == 'L':
+                nx, ny = args[0] + ox, args[1] + oy
+            elif op == 'H':
+                nx, ny = args[0] + ox, y
+            else:
+                nx, ny = x, args[0] + oy
+            lines.append((x, y, nx, ny))
+            x, y = nx, ny
+            last_ctrl = None
+        elif op in ('C', 'S'):
+            if op == 'C':
+                c1 = (args[0] + ox, args[1] + oy)
+                c2 = (args[2] + ox, args[3] + oy)
+                end = (args[4] + ox, args[5] + oy)
+            else:
+                c1 = (2 * x - last_ctrl[1], 2 * y - last_ctrl[2]) if last_ctrl and last_ctrl[0] == 'C' else (x, y)
+                c2 = (args[0] + ox, args[1] + oy)
+                end = (args[2] + ox, args[3] + oy)
+            cubics.append((x, y, *c1, *c2, *end))
+            last_ctrl = ('C', *c2)
+            x, y = end
+        elif op in ('Q', 'T'):
+            if op == 'Q':
+                q = (args[0] + ox, args[1] + oy)
+                end = (args[2] + ox, args[3] + oy)
+            else:
+                q = (2 * x - last_ctrl[1], 2 * y - last_ctrl[2]) if last_ctrl and last_ctrl[0] == 'Q' else (x, y)
+                end = (args[0] + ox, args[1] + oy)
+            cubics.append((x, y, x + 2 / 3 * (q[0] - x), y + 2 / 3 * (q[1] - y),
+                           end[0] + 2 / 3 * (q[0] - end[0]), end[1] + 2 / 3 * (q[1] - end[1]), *end))
+            last_ctrl = ('Q', *q)
+            x, y = end
+        elif op == 'A':
+            end = (args[5] + ox, args[6] + oy)
+            arc = _arc_to_cubics(x, y, args[0], args[1], args[2], bool(args[3]), bool(args[4]), *end)
+            if arc is None:
+                lines.append((x, y, *end))
+            else:
+                cubics.extend(arc)
+            x, y = end
+            last_ctrl = None
+        elif op == 'Z':
+            if (x, y) != (start_x, start_y):
+                lines.append((x, y, start_x, start_y))
+            x, y = start_x, start_y
+            last_ctrl = None
+
+    for cmd, num in _TOKEN.findall(d):
+        if cmd:
+            command = cmd
+            numbers = []
+            if cmd in 'Zz':
+                flush(cmd, ())
+                command = None
+            continue
+        if command is None:
+            continue
+        numbers.append(float(num))
+        count = _ARGS[command.upper()]
+        if len(numbers) == count:
+            flush(command, numbers)
+            numbers = []
+            # Weitere Koordinatenpaare nach M sind implizite L-Befehle
+            if command in 'Mm':
+                command = 'l' if command == 'm' else 'L'
+
+    return (np.array(lines, dtype=float).reshape(-1, 4),
+            np.array(cubics, dtype=float).reshape(-1, 8))
+
+
+def matrix_values(elem):
+    """Transformationsmatrix (a, b, c, d, e, f) eines Elements wie im SVG, sonst Identität."""
+    t = script.parse_matrix(elem)
+    if not t:
+        return IDENTITY
+    try:
+        values = tuple(float(v) for v in t[len('matrix('):-1].split())
+    except ValueError:
+        return IDENTITY
+    return values if len(values) == 6 else IDENTITY
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Collector:
+    """Sammelt die Geometrie aller Shapes als Listen, ausgewertet wird in einem Schritt."""
+
+    def __init__(self, text=True, layer_table=None):
+        self.text = text
+        self.layer_table = layer_table
+        self.layers = {}          # CutIndex -> laufende Nummer
+        self.matrices = []        # je Shape
+        self.shape_layer = []     # je Shape
+        self.types = []           # Counter je Ebene
+        self.lines = []           # (Shape-Nr., Array (n, 4))
+        self.cubics = []          # (Shape-Nr., Array (m, 8))
+        self.rects = []           # (Shape-Nr., x, y, Breite, Höhe)
+        self.ellipses = []        # (Shape-Nr., cx, cy, rx, ry)
+        self.points = []          # (Shape-Nr., x, y) nur für den Rahmen (Bitmaps)
+        self.text_unmeasured = 0
+        self.seen = set()
+
+    def add_shape(self, elem, kind, matrix=None):
+        layer = self.layers.setdefault(elem.get('CutIndex'), len(self.layers))
+        if layer == len(self.types):
+            self.types.append(Counter())
+        self.types[layer][kind] += 1
+        self.matrices.append(matrix or matrix_values(elem))
+        self.shape_layer.append(layer)
+        return len(self.matrices) - 1
+
+    def walk(self, elem):
+        # Verschachtelte Container (Gruppen) würden sonst doppelt gezählt
+        if id(elem) in self.seen:
+            return
+        self.seen.add(id(elem))
+        kind, data = script.shape_kind(elem)
+        if kind is not None and self.layer_table is not None and not self.layer_table.wanted(elem):
+            kind = None
+        if kind == 'rect':
+            self.rects.append((self.add_shape(elem, kind), *(_float(v) or 0.0 for v in script.rect_attrs(elem))))
+        elif kind == 'ellipse':
+            cx, cy, rx, ry = (_float(v) or 0.0 for v in script.ellipse_attrs(elem))
+            self.ellipses.append((self.add_shape(elem, kind), cx, cy, rx, ry))
+        elif kind == 'path':
+            lines, cubics = path_segments(data)
+            index = self.add_shape(elem, kind)
+            self.lines.append((index, lines))
+            self.cubics.append((index, cubics))
+        elif kind == 'bitmap':
+            index = self.add_shape(elem, kind)
+            x, y, w, h = (_float(v) for v in script.image_attrs(elem))
+            if None not in (x, y, w, h):
+                self.points.extend((index, px, py) for px in (x, x + w) for py in (y, y + h))
+        elif kind == 'text':
+            self.add_text(elem, data)
+        elif kind == 'label':
+            self.add_shape(elem, kind)
+            self.text_unmeasured += 1
+        for child in elem:
+            self.walk(child)
+
+    def add_text(self, elem, text):
+        layout = None
+        if self.text:
+            try:
+                size = float(elem.get('H') or 0)
+                import glyphs
+                layout = glyphs.layout_text(text, elem.get('Font'), size, elem)
+            except Exception:
+                layout = None
+        index = self.add_shape(elem, 'text')
+        if layout is None:
+            self.text_unmeasured += 1
+            return
+        for _char, d, gx, gy in layout[1]:
+            lines, cubics = path_segments(d)
+            offset = np.array([gx, gy])
+            self.lines.append((index, lines + np.tile(offset, 2)))
+            self.cubics.append((index, cubics + np.tile(offset, 4)))
+
+    def result(self):
+        """Kennzahlen als Dictionary (vektorisiert über alle Segmente)."""
+        matrices = np.array(self.matrices, dtype=float).reshape(-1, 6)
+        shape_layer = np.array(self.shape_layer, dtype=np.intp)
+        n_layers = len(self.layers)
+
+        def stack(items, width):
+            arrays = [a for _, a in items if len(a)]
+            if not arrays:
+                return np.empty((0, width)), np.empty(0, dtype=np.intp)
+            owners = np.concatenate([np.full(len(a), i, dtype=np.intp) for i, a in items if len(a)])
+            return np.concatenate(arrays), owners
+
+        def apply(m, xs, ys):
+            # SVG matrix(a b c d e f): x' = a x + c y + e, y' = b x + d y + f
+            return (m[:, 0:1] * xs + m[:, 2:3] * ys + m[:, 4:5],
+                    m[:, 1:2] * xs + m[:, 3:4] * ys + m[:, 5:6])
+
+        length = np.zeros(n_layers)
+        low = np.full((n_layers, 2), np.inf)
+        high = np.full((n_layers, 2), -np.inf)
+
+        def extend(layer, xs, ys):
+            """Rahmen je Ebene um Punkte (k, j) erweitern"""
+            for axis, values in ((0, xs), (1, ys)):
+                np.minimum.at(low[:, axis], layer, values.min(axis=1))
+                np.maximum.at(high[:, axis], layer, values.max(axis=1))
+
+        # Linien, Rechtecke als je vier Linien
+        segments, owners = stack(self.lines, 4)
+        if self.rects:
+            r = np.array(self.rects, dtype=float)
+            x0, y0 = r[:, 1], r[:, 2]
+            x1, y1 = x0 + r[:, 3], y0 + r[:, 4]
+            edges = np.stack([np.stack(e, axis=1) for e in ((x0, y0, x1, y0), (x1, y0, x1, y1),
+                                                            (x1, y1, x0, y1), (x0, y1, x0, y0))], axis=1)
+            segments = np.concatenate([segments, edges.reshape(-1, 4)])
+            owners = np.concatenate([owners, np.repeat(r[:, 0].astype(np.intp), 4)])
+        if len(segments):
+            xs, ys = apply(matrices[owners], segments[:, 0::2], segments[:, 1::2])
+            layer = shape_layer[owners]
+            length += np.bincount(layer, np.hypot(xs[:, 1] - xs[:, 0], ys[:, 1] - ys[:, 0]), n_layers)
+            extend(layer, xs, ys)
+
+        # Kubische Bézier-Kurven (affin transformiert bleiben sie Bézier-Kurven)
+        segments, owners = stack(self.cubics, 8)
+        if len(segments):
+            xs, ys = apply(matrices[owners], segments[:, 0::2], segments[:, 1::2])
+            layer = shape_layer[owners]
+            t = _GL_T[None, :]
+            u = 1 - t
+            speed = np.hypot(*(3 * (u * u * (p[:, 1:2] - p[:, 0:1]) + 2 * u * t * (p[:, 2:3] - p[:, 1:2])
+                                    + t * t * (p[:, 3:4] - p[:, 2:3])) for p in (xs, ys)))
+            length += np.bincount(layer, speed @ _GL_W, n_layers)
+            extend(layer, _cubic_extrema(xs), _cubic_extrema(ys))
+
+        # Ellipsen: Bild unter der Transformation ist wieder eine Ellipse
+        if self.ellipses:
+            e = np.array(self.ellipses, dtype=float)
+            owners = e[:, 0].astype(np.intp)
+            m = matrices[owners]
+            layer = shape_layer[owners]
+            axes = np.empty((len(e), 2, 2))
+            axes[:, 0, 0] = m[:, 0] * e[:, 3]
+            axes[:, 0, 1] = m[:, 2] * e[:, 4]
+            axes[:, 1, 0] = m[:, 1] * e[:, 3]
+            axes[:, 1, 1] = m[:, 3] * e[:, 4]
+            a, b = np.linalg.svd(axes, compute_uv=False).T
+            length += np.bincount(layer, math.pi * (3 * (a + b) - np.sqrt((3 * a + b) * (a + 3 * b))), n_layers)
+            cx, cy = apply(m, e[:, 1:2], e[:, 2:3])
+            half_x = np.hypot(axes[:, 0, 0], axes[:, 0, 1])[:, None]
+            half_y = np.hypot(axes[:, 1, 0], axes[:, 1, 1])[:, None]
+            extend(layer, np.hstack([cx - half_x, cx + half_x]), np.hstack([cy - half_y, cy + half_y]))
+
+        # Bitmaps: nur Rahmen
+        if self.points:
+            p = np.array(self.points, dtype=float)
+            owners = p[:, 0].astype(np.intp)
+            xs, ys = apply(matrices[owners], p[:, 1:2], p[:, 2:3])
+            extend(shape_layer[owners], xs, ys)
+
+        def box(lo, hi):
+            if not np.all(np.isfinite(lo)):
+                return None
+            return [float(lo[0]), float(lo[1]), float(hi[0]), float(hi[1])]
+
+        layers = {}
+        settings = self.layer_table.settings if self.layer_table is not None else {}
+        for cut_index, number in sorted(self.layers.items(), key=lambda item: _sort_key(item[0])):
+            layers['-' if cut_index is None else cut_index] = {
+                'name': settings.get(cut_index, {}).get('name'),
+                'shapes': sum(self.types[number].values()),
+                'types': dict(self.types[number]),
+                'length': float(length[number]),
+                'bounds': box(low[number], high[number]),
+            }
+        total_low = low.min(axis=0) if n_layers else np.full(2, np.inf)
+        total_high = high.max(axis=0) if n_layers else np.full(2, -np.inf)
+        bounds = box(total_low, total_high)
+        return {
+            'bounds': bounds,
+            'size': [bounds[2] - bounds[0], bounds[3] - bounds[1]] if bounds else None,
+            'shapes': len(self.matrices),
+            'length': float(length.sum()),
+            'text_unmeasured': self.text_unmeasured,
+            'layers': layers,
+        }
+
+
+def _sort_key(cut_index):
+    if cut_index is None:
+        return (2, 0, '')
+    try:
+        return (0, int(cut_index), '')
+    except ValueError:
+        return (1, 0, cut_index)
+
+
+def _cubic_extrema(p):
+    """Je Kurve (Zeile in p mit 4 Kontrollwerten) Endpunkte und innere Extremstellen einer Achse."""
+    p0, p1, p2, p3 = p.T
+    # Ableitung / 3: a t² + b t + c
+    a = -p0 + 3 * p1 - 3 * p2 + p3
+    b = 2 * (p0 - 2 * p1 + p2)
+    c = p1 - p0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        disc = np.sqrt(np.maximum(b * b - 4 * a * c, 0.0))
+        quadratic = np.abs(a) > 1e-12
+        t1 = np.where(quadratic, (-b + disc) / (2 * a), -c / b)
+        t2 = np.where(quadratic, (-b - disc) / (2 * a), -c / b)
+    values = [p0, p3]
+    for t in (t1, t2):
+        t = np.where(np.isfinite(t) & (t > 0) & (t < 1), t, 0.0)
+        u = 1 - t
+        values.append(u ** 3 * p0 + 3 * u * u * t * p1 + 3 * u * t * t * p2 + t ** 3 * p3)
+    return np.stack(values, axis=1)
+
+
+def job_stats(infile, text=True, layers=None):
+    """Kennzahlen einer LightBurn-Datei (Pfad oder Dateiobjekt) als Dictionary.
+
+    text: Text über die Glyphen-Umrisse messen (braucht fontTools und die Schrift).
+    layers: nur diese Ebenen (wie script.build_svg), ValueError bei unbekannter Ebene.
+    """
+    root = ET.parse(infile).getroot()
+    collector = _Collector(text, script.LayerTable(root, layers))
+    for node in script.shape_containers(root):
+        collector.walk(node)
+    result = collector.result()
+    result['canvas'] = [float(root.get('Width') or root.findtext('Width') or 1000),
+                        float(root.get('Height') or root.findtext('Height') or 1000)]
+    return result
+
+
+def _file_stats(path, text=True, layers=None):
+    try:
+        return {'file': str(path), **job_stats(path, text, layers)}
+    except (OSError, ET.ParseError, ValueError) as e:
+        return {'file': str(path), 'error': str(e)}
+
+
+def iter_files(paths):
+    """Dateien und Ordner (rekursiv nach .lbrn / .lbrn2) in Reihenfolge."""
+    for p in map(Path, paths):
+        if p.is_dir():
+            yield from sorted(f for f in p.rglob('*') if f.suffix.lower() in ('.lbrn', '.lbrn2'))
+        else:
+            yield p
+
+
+def print_stats(stats):
+    if 'error' in stats:
+        print(f"{stats['file']}: Fehler: {stats['error']}")
+        return
+    size = stats['size']
+    size_text = f"{size[0]:.2f} x {size[1]:.2f}" if size else "leer"
+    print(f"{stats['file']}: {size_text}, {stats['shapes']} Shapes, Länge {stats['length']:.1f}")
+    for cut_index, layer in stats['layers'].items():
+        types = ', '.join(f"{n} {kind}" for kind, n in sorted(layer['types'].items()))
+        name = f" {layer['name']}" if layer['name'] else ''
+        print(f"  Ebene {cut_index:>3}{name}: Länge {layer['length']:10.1f}  ({types})")
+    if stats['text_unmeasured']:
+        print(f"  {stats['text_unmeasured']} Text(e) nicht gemessen (Schrift fehlt oder älteres <Text>), nicht in der Länge enthalten")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rahmen, Schnittlänge und Ebenen-Summen von LightBurn-Dateien")
+    parser.add_argument('paths', nargs='+', help="LightBurn-Dateien oder Ordner")
+    parser.add_argument('--json', action='store_true', help="Ergebnis als JSON-Liste ausgeben")
+    parser.add_argument('--jobs', type=int, default=1, help="Parallele Prozesse für viele Dateien")
+    parser.add_argument('--no-text', action='store_true', help="Text nicht über die Glyphen messen (schneller)")
+    parser.add_argument('--layers', help="Nur diese Ebenen: CutIndex oder Name, z.B. 0,2 oder C05")
+    args = parser.parse_args(argv)
+
+    files = list(iter_files(args.paths))
+    measure = functools.partial(_file_stats, text=not args.no_text, layers=args.layers)
+    if args.jobs > 1 and len(files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(args.jobs) as pool:
+            results = list(pool.map(measure, files, chunksize=16))
+    else:
+        results = [measure(f) for f in files]
+
+    if args.json:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        for stats in results:
+            print_stats(stats)
+    return 0 if all('error' not in s for s in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())